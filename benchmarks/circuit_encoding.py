@@ -0,0 +1,104 @@
+r"""
+Benchmark the QuiC bytecode against the QuiC string on random circuits
+of the native gates of the contract.
+
+The string has numQubits characters for every layer, the bytecode has
+3 bytes for every gate. The benchmark reports the size of the ABI
+encoded calldata of a batched call and, with --gas, the gas estimated
+by the local provider for runQScriptShots and runQBytecodeShots.
+
+    python benchmarks/circuit_encoding.py --qubits 6 --gates 200 --gas
+"""
+import argparse
+
+from eth_abi import encode
+import numpy as np
+
+import qiskit_pqcee_provider as qpp
+from qiskit_pqcee_provider.quic import QuiCBackend
+from qiskit_pqcee_provider.quic import QuiCGate
+
+from layer_packing import random_native_circuit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--qubits", type=int, default=6)
+    parser.add_argument("--gates", type=int, default=200)
+    parser.add_argument("--circuits", type=int, default=10)
+    parser.add_argument("--shots", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--gas",
+        action="store_true",
+        help="estimate the gas of the batched calls on the local provider"
+    )
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+    quic_backend = QuiCBackend(QuiCGate.get_gates_quic_name())
+    contract_functions = None
+    if args.gas:
+        contract_functions = qpp.LocalPqceeProvider().get_backend(
+            'pqcee_simulator'
+        ).web3_contract.functions
+    seeds = list(range(args.shots))
+    totals = dict(
+        string=dict(calldata=0, gas=0),
+        bytecode=dict(calldata=0, gas=0)
+    )
+    for _ in range(args.circuits):
+        qc = random_native_circuit(args.qubits, args.gates, rng)
+        transpiled_circuit = quic_backend.transpile_circuit(qc)
+        quic_string = quic_backend.get_quic_circuit_string(
+            transpiled_circuit,
+            transpile=False
+        )
+        circuit_code = quic_backend.get_quic_circuit_bytecode(
+            transpiled_circuit,
+            transpile=False
+        )
+        num_qubits = quic_backend.get_quic_string_num_qubits(quic_string)
+        # the 4 bytes of the selector and the arguments
+        totals['string']['calldata'] += 4 + len(encode(
+            ['uint8', 'string', 'uint256[]'],
+            [num_qubits, quic_string, seeds]
+        ))
+        totals['bytecode']['calldata'] += 4 + len(encode(
+            ['bytes', 'uint256[]'],
+            [circuit_code, seeds]
+        ))
+        if contract_functions is not None:
+            totals['string']['gas'] += contract_functions.runQScriptShots(
+                num_qubits,
+                quic_string,
+                seeds
+            ).estimate_gas()
+            totals['bytecode']['gas'] += contract_functions.runQBytecodeShots(
+                circuit_code,
+                seeds
+            ).estimate_gas()
+    print(
+        "%d random circuits of %d qubits and %d gates, %d shots per call" %
+        (args.circuits, args.qubits, args.gates, args.shots)
+    )
+    for encoding, total in totals.items():
+        print(
+            "%-8s calldata %8.1f bytes%s" % (
+                encoding,
+                total['calldata'] / args.circuits,
+                "  gas %12.0f" % (total['gas'] / args.circuits)
+                if contract_functions is not None else ""
+            )
+        )
+    string, bytecode = totals['string'], totals['bytecode']
+    print(
+        "reduction: calldata %.1f%%%s" % (
+            100 * (1 - bytecode['calldata'] / string['calldata']),
+            ", gas %.1f%%" % (100 * (1 - bytecode['gas'] / string['gas']))
+            if contract_functions is not None else ""
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
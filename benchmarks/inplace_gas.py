@@ -0,0 +1,95 @@
+r"""
+Benchmark the backend contract updating the amplitudes in place against
+the backend contract with two buffers, on random circuits of the native
+gates of the contract.
+
+The local provider deploys the two backends, the variant updating the
+amplitudes in place on request. The benchmark checks that they return
+the same outcomes and reports the gas estimated for runQScriptShots, on
+the packed QuiC string, and runQBytecodeShots.
+
+    python benchmarks/inplace_gas.py --qubits 6 --gates 100
+"""
+import argparse
+
+import numpy as np
+
+import qiskit_pqcee_provider as qpp
+
+from layer_packing import random_native_circuit
+
+BACKEND_NAMES = ('pqcee_simulator', 'pqcee_inplace_simulator')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--qubits", type=int, default=6)
+    parser.add_argument("--gates", type=int, default=100)
+    parser.add_argument("--circuits", type=int, default=10)
+    parser.add_argument("--shots", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+    local_pqcee_provider = qpp.LocalPqceeProvider(deploy_inplace_backend=True)
+    backends = [
+        local_pqcee_provider.get_backend(backend_name)
+        for backend_name in BACKEND_NAMES
+    ]
+    seeds = list(range(args.shots))
+    totals = {
+        backend_name: dict(string=0, bytecode=0)
+        for backend_name in BACKEND_NAMES
+    }
+    for _ in range(args.circuits):
+        qc = random_native_circuit(args.qubits, args.gates, rng)
+        transpiled_circuit = backends[0].transpile_circuit(qc)
+        quic_string = backends[0].get_quic_circuit_string(
+            transpiled_circuit,
+            transpile=False,
+            pack_layers=True
+        )
+        circuit_code = backends[0].get_quic_circuit_bytecode(
+            transpiled_circuit,
+            transpile=False
+        )
+        num_qubits = backends[0].get_quic_string_num_qubits(quic_string)
+        outcomes = list()
+        for backend in backends:
+            contract_functions = backend.web3_contract.functions
+            string_call = contract_functions.runQScriptShots(
+                num_qubits,
+                quic_string,
+                seeds
+            )
+            bytecode_call = contract_functions.runQBytecodeShots(
+                circuit_code,
+                seeds
+            )
+            outcomes.append(string_call.call())
+            totals[backend.name]['string'] += string_call.estimate_gas()
+            totals[backend.name]['bytecode'] += bytecode_call.estimate_gas()
+        if outcomes[0] != outcomes[1]:
+            raise RuntimeError("The backends return different outcomes")
+    print(
+        "%d random circuits of %d qubits and %d gates, %d shots per call" %
+        (args.circuits, args.qubits, args.gates, args.shots)
+    )
+    for backend_name, total in totals.items():
+        print(
+            "%-24s string gas %12.0f  bytecode gas %12.0f" % (
+                backend_name,
+                total['string'] / args.circuits,
+                total['bytecode'] / args.circuits
+            )
+        )
+    buffers, inplace = (totals[backend_name] for backend_name in BACKEND_NAMES)
+    print(
+        "reduction: string gas %.1f%%, bytecode gas %.1f%%" % (
+            100 * (1 - inplace['string'] / buffers['string']),
+            100 * (1 - inplace['bytecode'] / buffers['bytecode'])
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+r"""
+Benchmark the packing of the single qubit gates in shared QuiC layers
+on random circuits of the native gates of the contract.
+
+The contract runs numQubits passes over the 2^n amplitudes for every
+layer, so the cost of a script is the number of layers times the number
+of qubits. The benchmark reports the layers, the time of the emulator of
+the contract and, with --gas, the gas estimated by the local provider.
+
+    python benchmarks/layer_packing.py --qubits 4 --gates 60 --gas
+"""
+import argparse
+import time
+
+import numpy as np
+import qiskit
+
+import qiskit_pqcee_provider as qpp
+from qiskit_pqcee_provider.emulator import QScriptEmulator
+from qiskit_pqcee_provider.quic import QuiCBackend
+from qiskit_pqcee_provider.quic import QuiCGate
+
+
+def random_native_circuit(
+    num_qubits: int,
+    num_gates: int,
+    rng: np.random.Generator
+) -> qiskit.QuantumCircuit:
+    r"""
+    Make a random circuit of the native gates of the contract.
+
+    Args:
+        num_qubits: The number of qubits.
+        num_gates: The number of gates.
+        rng: The random generator.
+
+    Returns:
+        The circuit.
+    """
+    qc = qiskit.QuantumCircuit(num_qubits)
+    single_qubit_gates = (qc.h, qc.x, qc.z, qc.t, qc.tdg)
+    for _ in range(num_gates):
+        qubits = [int(qubit) for qubit in rng.permutation(num_qubits)]
+        # one gate out of five is a cnot
+        if num_qubits > 1 and rng.random() < 0.2:
+            qc.cx(qubits[0], qubits[1])
+        else:
+            single_qubit_gates[rng.integers(len(single_qubit_gates))](
+                qubits[0]
+            )
+    return qc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--qubits", type=int, default=4)
+    parser.add_argument("--gates", type=int, default=60)
+    parser.add_argument("--circuits", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--gas",
+        action="store_true",
+        help="estimate the gas of runQScript on the local provider"
+    )
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+    quic_backend = QuiCBackend(QuiCGate.get_gates_quic_name())
+    contract_functions = None
+    if args.gas:
+        contract_functions = qpp.LocalPqceeProvider().get_backend(
+            'pqcee_simulator'
+        ).web3_contract.functions
+    totals = {
+        pack_layers: dict(layers=0, seconds=0.0, gas=0)
+        for pack_layers in (False, True)
+    }
+    for _ in range(args.circuits):
+        qc = random_native_circuit(args.qubits, args.gates, rng)
+        transpiled_circuit = quic_backend.transpile_circuit(qc)
+        for pack_layers, total in totals.items():
+            quic_string = quic_backend.get_quic_circuit_string(
+                transpiled_circuit,
+                transpile=False,
+                pack_layers=pack_layers
+            )
+            num_qubits = quic_backend.get_quic_string_num_qubits(quic_string)
+            total['layers'] += quic_string.count(",") + 1
+            start = time.perf_counter()
+            QScriptEmulator(num_qubits, quic_string).get_statevector()
+            total['seconds'] += time.perf_counter() - start
+            if contract_functions is not None:
+                total['gas'] += contract_functions.runQScript(
+                    num_qubits,
+                    quic_string,
+                    0
+                ).estimate_gas()
+    print(
+        "%d random circuits of %d qubits and %d gates" %
+        (args.circuits, args.qubits, args.gates)
+    )
+    for pack_layers, total in totals.items():
+        print(
+            "%-8s layers %8.1f  emulator %8.2f ms%s" % (
+                "packed" if pack_layers else "unpacked",
+                total['layers'] / args.circuits,
+                1000 * total['seconds'] / args.circuits,
+                "  gas %12.0f" % (total['gas'] / args.circuits)
+                if contract_functions is not None else ""
+            )
+        )
+    unpacked, packed = totals[False], totals[True]
+    print(
+        "reduction: layers %.1f%%, emulator %.1f%%%s" % (
+            100 * (1 - packed['layers'] / unpacked['layers']),
+            100 * (1 - packed['seconds'] / unpacked['seconds']),
+            ", gas %.1f%%" % (100 * (1 - packed['gas'] / unpacked['gas']))
+            if contract_functions is not None else ""
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
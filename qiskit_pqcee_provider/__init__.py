@@ -3,6 +3,8 @@ from .provider import LocalPqceeProvider
 from .provider import PqceeProvider
 from .backend import BlockchainBackend
 from .job import BlockcahinJob
+from .async_job import AsyncBlockchainJob
+from .emulator import PqceeEmulatorBackend
 
 __author__ = "Stefan-Dan Ciocirlan (sdcioc)"
 __copyright__ = "Copyright 2023, Singapore Blockchain Innovation Programme"
@@ -17,8 +19,10 @@ __all__ = [
     "BlockchainProvider",
     "BlockchainBackend",
     "BlockcahinJob",
+    "AsyncBlockchainJob",
     "LocalPqceeProvider",
     "PqceeProvider",
+    "PqceeEmulatorBackend",
 
 ]
 
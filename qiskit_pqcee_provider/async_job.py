@@ -0,0 +1,421 @@
+from qiskit.providers import JobError
+from qiskit.providers import JobTimeoutError
+from qiskit.providers.jobstatus import JobStatus
+from qiskit.result import Result
+from web3.exceptions import ContractLogicError
+from typing import Any, Awaitable, Callable
+import asyncio
+import functools
+import logging
+import time
+
+from .job import BlockcahinJob
+from .job import CALL_GAS
+from .job import _get_circuit_arguments
+from .job import _get_shots_per_gas
+from .rpc import _acquire_rate_limit_async
+from .rpc import call_with_retries_async
+from .rpc import get_endpoint_uris
+from .rpc import rate_limit
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBlockchainJob(BlockcahinJob):
+    r"""
+    A job that runs on the blockchain from an asyncio event loop, with
+    the calls sent through an async web3 provider.
+    """
+
+    def __init__(self, backend, job_handle, job_json, circuits):
+        r"""
+        Args:
+            backend: The backend the job is running on.
+            job_handle: The handle for the job on the async web3 provider.
+            job_json: The job json.
+            circuits: The circuits to run.
+        """
+        super().__init__(backend, job_handle, job_json, circuits)
+        for option in (
+            'rpc_batch_size',
+            'cache_path',
+            'early_stopping',
+            'checkpoint_dir'
+        ):
+            if job_json.get(option) is not None:
+                logger.warning(
+                    "Option %s is not used by the async jobs",
+                    option
+                )
+        self._checkpoint_store = None
+        self._task = None
+        # bounds the calls in flight of the job
+        self._semaphore = None
+
+    def submit(self):
+        # the job runs as a task of the running event loop
+        self._semaphore = asyncio.Semaphore(
+            max(1, int(self.job_json.get('max_inflight_calls', 1)))
+        )
+        self.job_status = JobStatus.QUEUED
+        self._task = asyncio.get_running_loop().create_task(
+            self._run_async()
+        )
+
+    def result(self, timeout=None, wait=5):
+        r"""
+        Wait for the result of the job from a thread without a running
+        event loop.
+
+        Args:
+            timeout: The seconds to wait for the result.
+            wait: Not used, kept for compatibility.
+
+        Returns:
+            The result of the job.
+
+        Raises:
+            JobError: If an event loop is running in the calling
+                thread, the job only runs on that loop so waiting
+                for it there would never return.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return super().result(timeout, wait)
+        raise JobError(
+            "The result of an async job can not be waited for from a "
+            "running event loop, use await job or job.result_async()"
+        )
+
+    async def result_async(self, timeout=None) -> Result:
+        r"""
+        Wait for the result of the job.
+
+        Args:
+            timeout: The seconds to wait for the result.
+
+        Returns:
+            The result of the job.
+
+        Raises:
+            JobTimeoutError: If the job is not done before the timeout.
+            JobError: If the job fails.
+        """
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except asyncio.TimeoutError as error:
+            raise JobTimeoutError('Timed out waiting for result') from error
+        result = self.status()
+        if result is JobStatus.ERROR:
+            raise JobError('Job error: %s' % self._error) from self._error
+        return self._make_result(result)
+
+    def __await__(self):
+        return self.result_async().__await__()
+
+    async def _run_async(self):
+        try:
+            # the rate limit of the job is removed when it is done
+            with rate_limit(
+                get_endpoint_uris(self.job_handle.w3),
+                self.job_json.get('max_requests_per_second')
+            ):
+                await self._run_experiments_async()
+        except Exception as error:
+            logger.exception("Job %s failed", self._job_id)
+            self._error = error
+            self.job_status = JobStatus.ERROR
+        finally:
+            self._set_timing_metadata()
+            with self._results_condition:
+                self._done_event.set()
+                self._results_condition.notify_all()
+
+    async def _run_experiments_async(self):
+        self.job_status = JobStatus.RUNNING
+        self._add_time('queue', time.perf_counter() - self._created_at)
+        loop = asyncio.get_running_loop()
+        circuits_first_indexes = self._get_circuits_first_indexes()
+        # the circuits are transpiled on the default executor of
+        # the loop, while the shots of the other circuits run
+        self._encoding_timings = [
+            dict() for _ in sorted(set(circuits_first_indexes))
+        ]
+        encodings = {
+            index: loop.run_in_executor(
+                None,
+                self._backend.encode_circuit,
+                self.circuits[index],
+                self.job_json,
+                encoding_timings
+            )
+            for index, encoding_timings in zip(
+                sorted(set(circuits_first_indexes)),
+                self._encoding_timings
+            )
+        }
+        if self.job_json.get('block_identifier') is not None:
+            self._set_pinned_block(
+                await self._call_with_retries_async(
+                    lambda: self.job_handle.w3.eth.get_block(
+                        self._get_block_identifier()
+                    )
+                )
+            )
+
+        async def run_group(first_index: int):
+            experiment = await encodings[first_index]
+            # the identical circuits run with the same calls
+            group = [
+                index
+                for index, circuit_first_index in enumerate(
+                    circuits_first_indexes
+                )
+                if circuit_first_index == first_index
+            ]
+            for index in group:
+                self.experiments[index] = experiment
+            await self._run_group_async(experiment, group)
+
+        await asyncio.gather(*[run_group(index) for index in encodings])
+        # set the job status to done
+        # after all the shots are done
+        self.job_status = JobStatus.DONE
+
+    async def _call_with_retries_async(
+        self,
+        call: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        r"""
+        Send a request within the rate limit of the endpoint, again
+        after its transient errors, with the rate and retry options
+        of the job.
+
+        Args:
+            call: The coroutine function sending the request.
+
+        Returns:
+            The result of the request.
+        """
+
+        async def rate_limited_call():
+            for endpoint_uri in get_endpoint_uris(self.job_handle.w3):
+                await _acquire_rate_limit_async(endpoint_uri)
+            return await call()
+
+        return await call_with_retries_async(
+            rate_limited_call,
+            max_retries=self.job_json.get('max_retries', 3),
+            backoff=self.job_json.get('retry_backoff', 0.5),
+            max_backoff=self.job_json.get('max_retry_backoff', 30.0)
+        )
+
+    async def _eth_call_async(self, calldata: bytes) -> bytes:
+        r"""
+        Send one eth_call to the backend contract, waiting while
+        max_inflight_calls calls are in flight, again after transient
+        errors.
+
+        Args:
+            calldata: The ABI encoded calldata.
+
+        Returns:
+            The raw result of the call.
+        """
+        async with self._semaphore:
+            return await self._call_with_retries_async(
+                lambda: self._send_eth_call_async(calldata)
+            )
+
+    async def _send_eth_call_async(self, calldata: bytes) -> bytes:
+        start = time.perf_counter()
+        try:
+            result = await self.job_handle.w3.eth.call(
+                {
+                    'to': self.job_handle.address,
+                    'data': '0x' + calldata.hex(),
+                    'gas': CALL_GAS
+                },
+                self._get_block_identifier()
+            )
+        except Exception as error:
+            self._record_request(time.perf_counter() - start, error)
+            raise
+        self._record_request(time.perf_counter() - start)
+        return bytes(result)
+
+    async def _call_contract_async(
+        self,
+        function_name: str,
+        arguments_list: list[tuple]
+    ) -> list[Any]:
+        r"""
+        Call a view function of the backend contract once for every
+        arguments, all the calls are sent concurrently.
+
+        Args:
+            function_name: The name of the function.
+            arguments_list: The arguments of every call.
+
+        Returns:
+            The decoded results of the calls in order.
+        """
+        output_types = [
+            output['type']
+            for output in self.job_handle.get_function_by_name(
+                function_name
+            ).abi['outputs']
+        ]
+        results = await asyncio.gather(*[
+            self._eth_call_async(calldata)
+            for calldata in self._encode_calls(function_name, arguments_list)
+        ])
+        start = time.perf_counter()
+        decoded_results = [
+            self._decode_result(output_types, result) for result in results
+        ]
+        self._add_time('decode', time.perf_counter() - start)
+        return decoded_results
+
+    async def _get_shots_per_call_async(
+        self,
+        experiment: dict,
+        function_name: str,
+        shot_seed: int
+    ) -> int:
+        r"""
+        Get the number of shots that fit in one call of a batched
+        entry point of the backend contract.
+
+        Args:
+            experiment: The encoded circuit.
+            function_name: The name of the batched entry point.
+            shot_seed: The random seed used to estimate the gas of a shot.
+
+        Returns:
+            The number of shots in a call.
+        """
+        if self.job_json.get('max_shots_per_call') is not None:
+            return max(1, int(self.job_json['max_shots_per_call']))
+        contract_function = self.job_handle.get_function_by_name(
+            function_name
+        )
+        try:
+            # estimate the gas of a call with one and with two shots
+            one_shot_gas, two_shots_gas = await asyncio.gather(*[
+                self._call_with_retries_async(functools.partial(
+                    contract_function(
+                        *_get_circuit_arguments(experiment, function_name),
+                        [shot_seed] * shots
+                    ).estimate_gas,
+                    {'gas': CALL_GAS}
+                ))
+                for shots in (1, 2)
+            ])
+        except (ValueError, ContractLogicError) as error:
+            logger.warning(
+                "Gas estimation failed, running one shot per call: %s",
+                error
+            )
+            return 1
+        self._estimated_gas[(
+            experiment['num_qubits'],
+            experiment['circuit_str'],
+            function_name
+        )] = (one_shot_gas, two_shots_gas)
+        return _get_shots_per_gas(one_shot_gas, two_shots_gas)
+
+    async def _run_group_async(self, experiment: dict, group: list[int]):
+        r"""
+        Run the shots of a group of experiments with the same encoded
+        circuit together.
+
+        Args:
+            experiment: The encoded circuit of the group.
+            group: The indexes of the circuits of the group.
+        """
+        # sample locally from the final state when all the
+        # measurements are terminal
+        if (self.job_json.get('execution_mode') == 'local' and
+                experiment['sample_final_state'] and
+                self._backend.supports_function('getStatevector')):
+            async with self._semaphore:
+                real_state, imaginary_state = (
+                    await self._call_with_retries_async(functools.partial(
+                        self.job_handle.functions.getStatevector(
+                            experiment['num_qubits'],
+                            experiment['circuit_str'],
+                            0
+                        ).call,
+                        {'gas': CALL_GAS},
+                        self._get_block_identifier()
+                    ))
+                )
+            weights = [
+                abs(real + imaginary)
+                for real, imaginary in zip(real_state, imaginary_state)
+            ]
+            if sum(weights) == 0:
+                raise ValueError("The final state has no amplitudes")
+            for index in group:
+                self._add_shots_results(
+                    index,
+                    self._sample_weights(
+                        weights,
+                        self._get_random_seed(index)
+                    )
+                )
+            return
+        # the seeds of every experiment come from its own random
+        # generator, as for the jobs run on threads
+        shots_seeds = [
+            shot_seed
+            for index in group
+            for shot_seed in self._get_random_seed(index).randint(
+                low=0,
+                high=65535,
+                size=self.job_json['shots']
+            ).tolist()
+        ]
+        function_name = self._select_entry_point(experiment)
+        if function_name == 'runQScript':
+            shots_results = await self._call_contract_async(
+                function_name,
+                [
+                    (
+                        experiment['num_qubits'],
+                        experiment['circuit_str'],
+                        shot_seed
+                    )
+                    for shot_seed in shots_seeds
+                ]
+            )
+        else:
+            shots_per_call = await self._get_shots_per_call_async(
+                experiment,
+                function_name,
+                shots_seeds[0]
+            )
+            self._set_estimated_gas(experiment, function_name, group)
+            chunks_results = await self._call_contract_async(
+                function_name,
+                [
+                    (
+                        *_get_circuit_arguments(experiment, function_name),
+                        shots_seeds[index:index + shots_per_call]
+                    )
+                    for index in range(0, len(shots_seeds), shots_per_call)
+                ]
+            )
+            shots_results = [
+                shot_result
+                for chunk_results in chunks_results
+                for shot_result in chunk_results
+            ]
+        shots = self.job_json['shots']
+        for offset, index in enumerate(group):
+            self._add_shots_results(
+                index,
+                shots_results[offset * shots:(offset + 1) * shots]
+            )
@@ -3,17 +3,59 @@ from qiskit.providers import ProviderV1 as Provider
 from qiskit.providers import Options
 # from qiskit.circuit.gate import Gate
 import numpy as np
+import asyncio
+import concurrent.futures
+import functools
 import logging
+import math
+import threading
+import time
 
 import web3
 import pathlib
 from solcx import compile_source
+from eth_utils import function_abi_to_4byte_selector
+from eth_utils import keccak
 
+from .async_job import AsyncBlockchainJob
+from .executor import JobExecutor
 from .job import BlockcahinJob
+from .metrics import get_metrics_registry
 from .quic import QuiCBackend
 
 logger = logging.getLogger(__name__)
 
+TRANSPILE_SECONDS = get_metrics_registry().histogram(
+    "pqcee_transpile_seconds",
+    "The seconds to transpile a circuit, by number of qubits."
+)
+
+# the maximum number of shots when the shots run on the contract
+MAX_CONTRACT_SHOTS = 4096
+# the maximum number of shots when the shots are sampled locally
+# from the final state returned by the contract
+MAX_LOCAL_SHOTS = 2**30
+# the lowest rate limit of the requests, one request every 1000 seconds
+MIN_REQUESTS_PER_SECOND = 0.001
+
+
+@functools.lru_cache(maxsize=None)
+def get_backend_interface_abi() -> list:
+    r"""
+    Get the abi of the backend interface, compiled once.
+
+    Returns:
+        The abi of the backend smart contract interface.
+    """
+    mod_path = pathlib.Path(__file__).parent.absolute()
+    absolute_path = (
+        mod_path / "contracts" / "QuantumBackendInterface.sol"
+    ).resolve()
+    sc_interface_code = absolute_path.read_text()
+    compiled_sol = compile_source(sc_interface_code, output_values=['abi'])
+    contract_id, contract_interface = compiled_sol.popitem()
+    return contract_interface['abi']
+
 
 class BlockchainBackend(QuiCBackend):
     r"""
@@ -28,6 +70,27 @@ class BlockchainBackend(QuiCBackend):
     r"""
     The seed random state
     """
+    contract_code: bytes = None
+    r"""
+    The runtime bytecode of the backend smart contract.
+    """
+    job_executor: JobExecutor = None
+    r"""
+    The workers running the jobs of the backend.
+    """
+    contract_code_hash: bytes = None
+    r"""
+    The hash of the runtime bytecode, used in the keys of the shot cache.
+    """
+    async_web3_contract: web3.contract.AsyncContract = None
+    r"""
+    The backend smart contract on the async web3 provider.
+    """
+    circuit_ids: dict[bytes, bytes] = None
+    r"""
+    The ids of the circuits registered on the backend contract, by the
+    hash of their bytecode.
+    """
 
     def __init__(
             self,
@@ -38,36 +101,61 @@ class BlockchainBackend(QuiCBackend):
             backend_seed: int = 0,
             approximation_depth: int = 0,
             approximation_recursion_degree: int = 0,
+            async_web3_provider: web3.AsyncWeb3 = None,
+            backend_info: dict = None
     ):
         r"""
         Args:
             provider: The qiskit provider of the backend.
-            web3_provider: The web3 provider for the blockchain.
+            web3_provider: The web3 provider for the blockchain, or None
+                for a backend running only with the async web3 provider.
             backend_address: The address of the backend smart contract.
             is_local: If the backend is local or not.
             backend_seed: The seed for the backend.
             approximation_depth: The depth of the basic approximation.
             approximation_recursion_degree: The recursion degree for the Solovay-Kitaev
+            async_web3_provider: The async web3 provider for the blockchain.
+            backend_info: The name, the number of qubits, the gates names
+                and the code of the backend contract, if already fetched.
         """
         # get the backend interface for the abi
-        mod_path = pathlib.Path(__file__).parent.absolute()
-        absolute_path = (
-            mod_path / "contracts" / "QuantumBackendInterface.sol"
-        ).resolve()
-        sc_interface_code = absolute_path.read_text()
-        compiled_sol = compile_source(sc_interface_code, output_values=['abi'])
-        contract_id, contract_interface = compiled_sol.popitem()
-        abi = contract_interface['abi']
+        abi = get_backend_interface_abi()
         # connect to backend contract
-        self.web3_contract = web3_provider.eth.contract(
-            address=backend_address,
-            abi=abi
-        )
-        # getting the backend information from the backend contract
-        name = self.web3_contract.functions.getName().call()
-        num_qubits = self.web3_contract.functions.getNumberOfQubits().call()
-        # is_simulator = self.web3_contract.functions.isSimulator().call()
-        gates_names = self.web3_contract.functions.getGatesNames().call()
+        if web3_provider is not None:
+            self.web3_contract = web3_provider.eth.contract(
+                address=backend_address,
+                abi=abi
+            )
+        if async_web3_provider is not None:
+            self.async_web3_contract = async_web3_provider.eth.contract(
+                address=backend_address,
+                abi=abi
+            )
+        if backend_info is None:
+            # getting the backend information from the backend contract
+            backend_info = dict(
+                name=self.web3_contract.functions.getName().call(),
+                num_qubits=(
+                    self.web3_contract.functions.getNumberOfQubits().call()
+                ),
+                # is_simulator = self.web3_contract.functions.isSimulator().call()
+                gates_names=(
+                    self.web3_contract.functions.getGatesNames().call()
+                ),
+                contract_code=web3_provider.eth.get_code(backend_address)
+            )
+        name = backend_info['name']
+        num_qubits = backend_info['num_qubits']
+        gates_names = backend_info['gates_names']
+        # the deployed code is used to detect the functions
+        # implemented by older deployments of the contract
+        self.contract_code = bytes(backend_info['contract_code'])
+        self.contract_code_hash = keccak(self.contract_code)
+        self.circuit_ids = dict()
+        self._circuit_ids_lock = threading.Lock()
+        self._circuit_registrations: dict[
+            bytes, concurrent.futures.Future
+        ] = dict()
 
         super().__init__(
             quic_basis_gates=gates_names,
@@ -81,6 +169,19 @@ class BlockchainBackend(QuiCBackend):
 
         # self._configuration.simulator = is_simulator
 
+        # the shots are almost free when sampled locally, the shots
+        # of the other execution modes are checked by set_options
+        self.options.set_validator("shots", (1, MAX_LOCAL_SHOTS))
+        self.options.set_validator("execution_mode", ["contract", "local"])
+        self.options.set_validator("cache_max_entries", (1, 2**62))
+        self.options.set_validator("max_concurrent_jobs", (1, 1024))
+        self.options.set_validator("max_queued_jobs", (0, 2**31))
+        self.options.set_validator("max_retries", (0, 100))
+        self.options.set_validator(
+            "max_requests_per_second",
+            (MIN_REQUESTS_PER_SECOND, math.inf)
+        )
+
         # create the random seed
         self.state_seed = np.random.RandomState(
             np.random.MT19937(
@@ -88,46 +189,486 @@ class BlockchainBackend(QuiCBackend):
             )
         )
 
+    @classmethod
+    async def create_async(
+        cls,
+        provider: Provider,
+        async_web3_provider: web3.AsyncWeb3,
+        backend_address: str,
+        is_local: bool = False,
+        backend_seed: int = 0,
+        approximation_depth: int = 0,
+        approximation_recursion_degree: int = 0
+    ):
+        r"""
+        Create a backend running with an async web3 provider, fetching
+        the backend information concurrently.
+
+        Args:
+            provider: The qiskit provider of the backend.
+            async_web3_provider: The async web3 provider for the blockchain.
+            backend_address: The address of the backend smart contract.
+            is_local: If the backend is local or not.
+            backend_seed: The seed for the backend.
+            approximation_depth: The depth of the basic approximation.
+            approximation_recursion_degree: The recursion degree for the Solovay-Kitaev
+
+        Returns:
+            The backend.
+        """
+        async_web3_contract = async_web3_provider.eth.contract(
+            address=backend_address,
+            abi=get_backend_interface_abi()
+        )
+        name, num_qubits, gates_names, contract_code = await asyncio.gather(
+            async_web3_contract.functions.getName().call(),
+            async_web3_contract.functions.getNumberOfQubits().call(),
+            async_web3_contract.functions.getGatesNames().call(),
+            async_web3_provider.eth.get_code(backend_address)
+        )
+        return cls(
+            provider=provider,
+            web3_provider=None,
+            backend_address=backend_address,
+            is_local=is_local,
+            backend_seed=backend_seed,
+            approximation_depth=approximation_depth,
+            approximation_recursion_degree=approximation_recursion_degree,
+            async_web3_provider=async_web3_provider,
+            backend_info=dict(
+                name=name,
+                num_qubits=num_qubits,
+                gates_names=gates_names,
+                contract_code=contract_code
+            )
+        )
+
     @property
     def target(self):
         return self._target
 
     @property
     def max_circuits(self):
-        return 1
+        return None
 
     @classmethod
     def _default_options(cls):
-        return Options(shots=10)
+        return Options(
+            shots=10,
+            max_shots_per_call=None,
+            execution_mode="contract",
+            max_inflight_calls=1,
+            rpc_batch_size=None,
+            cache_path=None,
+            cache_max_entries=1000000,
+            block_identifier=None,
+            max_concurrent_jobs=4,
+            max_queued_jobs=1024,
+            shots_per_round=None,
+            shots_callback=None,
+            early_stopping=None,
+            max_requests_per_second=None,
+            max_retries=3,
+            retry_backoff=0.5,
+            max_retry_backoff=30.0,
+            checkpoint_dir=None,
+            memory=False,
+            # registering sends transactions from run, so it is
+            # only done on request
+            register_circuits=False
+        )
 
     @override
-    def run(self, circuits, **kwargs):
-        # serialize circuits submit to backend and create a job
+    def set_options(self, **fields):
+        self._check_shots(
+            fields.get('shots', self.options.shots),
+            fields.get('execution_mode', self.options.execution_mode)
+        )
+        # None is the default of the options without a limit, as
+        # max_requests_per_second, it is not checked by the validators
+        default_options = self._default_options()
+        for field in list(fields):
+            if (fields[field] is None and
+                    getattr(default_options, field, 0) is None):
+                setattr(self.options, field, fields.pop(field))
+        super().set_options(**fields)
+
+    def _check_shots(self, shots: int, execution_mode: str):
+        r"""
+        Check the number of shots for the execution mode, only the local
+        execution mode runs more than MAX_CONTRACT_SHOTS shots.
+
+        Args:
+            shots: The number of shots.
+            execution_mode: The execution mode.
+
+        Raises:
+            ValueError: If the number of shots is not valid for the
+                execution mode.
+        """
+        if not 1 <= shots <= MAX_LOCAL_SHOTS:
+            raise ValueError(
+                "The number of shots must be between 1 and %d" %
+                MAX_LOCAL_SHOTS
+            )
+        if shots > MAX_CONTRACT_SHOTS and execution_mode != "local":
+            raise ValueError(
+                "At most %d shots run on the contract, more shots "
+                "need the local execution mode" % MAX_CONTRACT_SHOTS
+            )
+
+    def get_job_executor(self) -> JobExecutor:
+        r"""
+        Get the workers running the jobs of the backend, sized with the
+        max_concurrent_jobs and max_queued_jobs options.
+
+        Returns:
+            The job executor of the backend.
+        """
+        if self.job_executor is None:
+            self.job_executor = JobExecutor(
+                max_workers=self.options.max_concurrent_jobs,
+                max_queued_jobs=self.options.max_queued_jobs
+            )
+        else:
+            self.job_executor.max_workers = self.options.max_concurrent_jobs
+            self.job_executor.max_queued_jobs = self.options.max_queued_jobs
+        return self.job_executor
+
+    def supports_function(self, function_name: str) -> bool:
+        r"""
+        Check if the deployed backend contract implements a function
+        of the backend interface.
+
+        Args:
+            function_name: The name of the function in the interface.
+
+        Returns:
+            True if the function selector is found in the contract code.
+        """
+        for abi_entry in get_backend_interface_abi():
+            if (abi_entry.get('type') == 'function' and
+                    abi_entry.get('name') == function_name):
+                # the solidity dispatcher pushes every selector
+                # with a PUSH4 (0x63) instruction
+                selector = function_abi_to_4byte_selector(abi_entry)
+                return (b'\x63' + selector) in self.contract_code
+        return False
+
+    def can_register_circuits(self) -> bool:
+        r"""
+        Check if the backend can register circuits on the backend
+        contract, the contract runs circuits by id and the web3 provider
+        has a default account to send the transactions.
+
+        Returns:
+            True if the circuits can be registered.
+        """
+        return (self.web3_contract is not None and
+                bool(self.web3_contract.w3.eth.default_account) and
+                self.supports_function('registerCircuit') and
+                self.supports_function('runByIdShots'))
+
+    def register_circuit(self, circuit_code: bytes) -> bytes:
+        r"""
+        Register the bytecode of a circuit on the backend contract, once
+        for every bytecode, so the shots only send its id.
+
+        Args:
+            circuit_code: The bytecode of the circuit.
+
+        Returns:
+            The id of the circuit on the backend contract.
+
+        Raises:
+            ValueError: If the registration transaction failed.
+        """
+        circuit_hash = keccak(circuit_code)
+        # the lock is only held to look up and update the ids, the
+        # concurrent jobs of a circuit wait for its registration in
+        # flight instead of registering it twice
+        with self._circuit_ids_lock:
+            if circuit_hash in self.circuit_ids:
+                return self.circuit_ids[circuit_hash]
+            registration = self._circuit_registrations.get(circuit_hash)
+            registers = registration is None
+            if registers:
+                registration = concurrent.futures.Future()
+                self._circuit_registrations[circuit_hash] = registration
+        if not registers:
+            return registration.result()
+        try:
+            circuit_id = self._send_circuit_registration(circuit_code)
+        except BaseException as error:
+            # the next job of the circuit tries to register it again
+            with self._circuit_ids_lock:
+                del self._circuit_registrations[circuit_hash]
+            registration.set_exception(error)
+            raise
+        with self._circuit_ids_lock:
+            self.circuit_ids[circuit_hash] = circuit_id
+            del self._circuit_registrations[circuit_hash]
+        registration.set_result(circuit_id)
+        return circuit_id
+
+    def _send_circuit_registration(self, circuit_code: bytes) -> bytes:
+        r"""
+        Send the transaction registering the bytecode of a circuit on the
+        backend contract and wait for its receipt.
+
+        Args:
+            circuit_code: The bytecode of the circuit.
+
+        Returns:
+            The id of the circuit on the backend contract.
+
+        Raises:
+            ValueError: If the registration transaction failed.
+        """
+        register_function = self.web3_contract.functions.registerCircuit(
+            circuit_code
+        )
+        # the call checks the bytecode before paying for it
+        circuit_id = bytes(register_function.call())
+        # the circuit may be registered by another client
+        if not self.web3_contract.functions.isCircuitRegistered(
+            circuit_id
+        ).call():
+            tx_hash = register_function.transact()
+            w3 = self.web3_contract.w3
+            tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+            if tx_receipt['status'] != 1:
+                raise ValueError("The registration of the circuit failed")
+            logger.debug(
+                "Registered the circuit 0x%s with %d gas",
+                circuit_id.hex(),
+                tx_receipt['gasUsed']
+            )
+        return circuit_id
+
+    def encode_circuit(
+        self,
+        circuit,
+        options: dict,
+        timings: dict = None
+    ) -> dict:
+        r"""
+        Transpile and encode a circuit for the backend contract.
+
+        Args:
+            circuit: The quantum circuit.
+            options: The options of the job.
+            timings: The dict the seconds spent in transpile_circuit and
+                in the encodings, as get_quic_circuit_string, are added
+                to, if any.
+
+        Returns:
+            The circuit string and bytecode on the qubits with gates,
+            their number, the index in the circuit of every one of them,
+            the number of qubits of the outcomes and if the final state
+            can be sampled for every shot.
+
+        Raises:
+            ValueError: If the shots are more than MAX_CONTRACT_SHOTS
+                and the final state can not be sampled locally.
+        """
+        start = time.perf_counter()
+        transpiled_circuit = self.transpile_circuit(circuit)
+        # the outcomes are mapped back to the qubits of the circuit
+        circuit_num_qubits, _ = self._get_quic_gates(transpiled_circuit)
+        transpiled_circuit, qubits = self.compact_qubits(transpiled_circuit)
+        transpiled = time.perf_counter()
+        circuit_str: str = self.get_quic_circuit_string(
+            transpiled_circuit,
+            transpile=False
+        )
+        circuit_code: bytes = self.get_quic_circuit_bytecode(
+            transpiled_circuit,
+            transpile=False
+        )
+        encoded = time.perf_counter()
+        TRANSPILE_SECONDS.observe(
+            transpiled - start,
+            num_qubits=circuit.num_qubits
+        )
+        logger.debug(
+            "Encoded %s in %.3f s, %.3f s to transpile",
+            circuit.name,
+            encoded - start,
+            transpiled - start
+        )
+        if timings is not None:
+            timings['transpile_circuit'] = (
+                timings.get('transpile_circuit', 0.0) + transpiled - start
+            )
+            timings['get_quic_circuit_string'] = (
+                timings.get('get_quic_circuit_string', 0.0) +
+                encoded - transpiled
+            )
+        num_qubits: int = self.get_quic_string_num_qubits(circuit_str)
+        # without mid-circuit measurements the final state is the
+        # same for every shot and it can be sampled many times
+        sample_final_state = (
+            self.has_only_terminal_measurements(circuit) and
+            'm' not in circuit_str
+        )
+        if options['execution_mode'] == "local" and not sample_final_state:
+            logger.warning(
+                "Local sampling needs terminal measurements, "
+                "running the shots of %s on the contract",
+                circuit.name
+            )
+        if options['shots'] > MAX_CONTRACT_SHOTS and not sample_final_state:
+            raise ValueError(
+                "At most %d shots run on the contract, %s can not be "
+                "sampled locally" % (MAX_CONTRACT_SHOTS, circuit.name)
+            )
+        return dict(
+            circuit_str=circuit_str,
+            circuit_code=circuit_code,
+            num_qubits=num_qubits,
+            qubits=qubits,
+            circuit_num_qubits=circuit_num_qubits,
+            sample_final_state=sample_final_state
+        )
+
+    def _get_run_options(self, kwargs: dict) -> dict:
+        r"""
+        Get the options of a job from the options of the backend and
+        the keyword arguments of run.
+
+        Args:
+            kwargs: The keyword arguments of run.
+
+        Returns:
+            The options of the job.
+        """
         for kwarg in kwargs:
             if not hasattr(self.options, kwarg):
                 logger.warn(
                     "Option %s is not used by this backend" % kwarg,
                     UserWarning, stacklevel=2)
         options = {
-            'shots': kwargs.get('shots', self.options.shots)
+            option: kwargs.get(option, getattr(self.options, option))
+            for option in (
+                'shots',
+                'max_shots_per_call',
+                'execution_mode',
+                'max_inflight_calls',
+                'rpc_batch_size',
+                'cache_path',
+                'cache_max_entries',
+                'block_identifier',
+                'shots_per_round',
+                'shots_callback',
+                'early_stopping',
+                'max_requests_per_second',
+                'max_retries',
+                'retry_backoff',
+                'max_retry_backoff',
+                'checkpoint_dir',
+                'memory',
+                'register_circuits'
+            )
         }
+        if options['execution_mode'] not in ("contract", "local"):
+            raise ValueError(
+                "Unknown execution mode %s" % options['execution_mode']
+            )
+        self._check_shots(options['shots'], options['execution_mode'])
+        if (options['max_requests_per_second'] is not None and
+                not options['max_requests_per_second'] >=
+                MIN_REQUESTS_PER_SECOND):
+            raise ValueError(
+                "The max_requests_per_second option must be at least %s" %
+                MIN_REQUESTS_PER_SECOND
+            )
+        return options
+
+    @override
+    def run(self, circuits, **kwargs):
+        if self.web3_contract is None:
+            raise ValueError(
+                "The backend has no web3 provider, use run_async"
+            )
+        # serialize circuits submit to backend and create a job
+        options = self._get_run_options(kwargs)
         # make a list of circuits
         if type(circuits) is not list:
             circuits = [circuits]
-        # job_json = convert_to_wire_format(circuits, options)
-        # job_handle = submit_to_backend(job_jsonb)
-        circuit_str: str = self.get_quic_circuit_string(circuits[0])
-        first_index = circuit_str.find(",")
-        if first_index == -1:
-            first_index = circuit_str.find(".")
-        if first_index <= 0:
-            raise ValueError("Invalid circuit string")
-        num_qubits: int = first_index
+        # the circuits are encoded by the job, while the shots
+        # of the previous circuits run
         job_json = dict(
-            circuit_str=circuit_str,
-            shots=options['shots'],
-            num_qubits=num_qubits,
-            random_seed=self.state_seed.randint(low=0, high=65535)
+            random_seed=self.state_seed.randint(low=0, high=65535),
+            **options
         )
         job_handle = self.web3_contract
-        return BlockcahinJob(self, job_handle, job_json, circuits)
+        job = BlockcahinJob(self, job_handle, job_json, circuits)
+        # the job waits in the queue of the backend for a worker
+        self.get_job_executor().submit(job)
+        return job
+
+    def resume_job(self, job_id: str, checkpoint: dict) -> BlockcahinJob:
+        r"""
+        Resume a checkpointed job of the backend, running only the shots
+        missing from the checkpoint with the same seeds.
+
+        Args:
+            job_id: The id of the job.
+            checkpoint: The checkpoint of the job, loaded from the
+                checkpoint store.
+
+        Returns:
+            The resumed job.
+        """
+        if self.web3_contract is None:
+            raise ValueError(
+                "The backend has no web3 provider, use run_async"
+            )
+        # the options that can not be serialized, as the callbacks,
+        # take the values of the backend options
+        job_json = dict(checkpoint['job_json'])
+        for option, value in self._get_run_options(dict()).items():
+            job_json.setdefault(option, value)
+        job = BlockcahinJob(
+            self,
+            self.web3_contract,
+            job_json,
+            checkpoint['circuits'],
+            job_id=job_id
+        )
+        job.resume(checkpoint['outcomes'], checkpoint['done_experiments'])
+        self.get_job_executor().submit(job)
+        return job
+
+    def run_async(self, circuits, **kwargs) -> AsyncBlockchainJob:
+        r"""
+        Run circuits on the running event loop with the async web3
+        provider of the backend, at most max_inflight_calls calls
+        in flight at the same time.
+
+        Args:
+            circuits: The circuit or the list of circuits to run.
+            kwargs: The options of the job.
+
+        Returns:
+            The job, awaiting it returns the result.
+        """
+        if self.async_web3_contract is None:
+            raise ValueError("The backend has no async web3 provider")
+        options = self._get_run_options(kwargs)
+        # make a list of circuits
+        if type(circuits) is not list:
+            circuits = [circuits]
+        job_json = dict(
+            random_seed=self.state_seed.randint(low=0, high=65535),
+            **options
+        )
+        job = AsyncBlockchainJob(
+            self,
+            self.async_web3_contract,
+            job_json,
+            circuits
+        )
+        job.submit()
+        return job
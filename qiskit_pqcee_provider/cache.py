@@ -0,0 +1,214 @@
+from eth_utils import keccak
+import itertools
+import logging
+import pathlib
+import sqlite3
+import threading
+import time
+
+from .metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+CACHE_HITS = get_metrics_registry().counter(
+    "pqcee_cache_hits_total",
+    "The shots found in the shot caches."
+)
+CACHE_MISSES = get_metrics_registry().counter(
+    "pqcee_cache_misses_total",
+    "The shots not found in the shot caches."
+)
+CACHE_EVICTIONS = get_metrics_registry().counter(
+    "pqcee_cache_evictions_total",
+    "The shots evicted from the shot caches."
+)
+
+
+class ShotCache:
+    r"""
+    A persistent cache of the shot outcomes of the backend contract,
+    stored in a SQLite database with a least recently used eviction.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1000000):
+        r"""
+        Args:
+            path: The path of the SQLite database.
+            max_entries: The maximum number of outcomes in the cache.
+        """
+        self.path = str(pathlib.Path(path).expanduser())
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # the access order of the entries
+        self._clock = itertools.count(time.time_ns())
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            self.path,
+            check_same_thread=False
+        )
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS shots ("
+                "key BLOB PRIMARY KEY, "
+                "outcome INTEGER NOT NULL, "
+                "last_used INTEGER NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS shots_last_used "
+                "ON shots (last_used)"
+            )
+
+    @staticmethod
+    def make_key(
+        code_hash: bytes,
+        num_qubits: int,
+        circuit_str: str,
+        random_seed: int,
+        block_hash: bytes
+    ) -> bytes:
+        r"""
+        Make the key of a shot outcome.
+
+        Args:
+            code_hash: The hash of the runtime bytecode of the contract.
+            num_qubits: The number of qubits of the circuit.
+            circuit_str: The circuit string.
+            random_seed: The random seed of the shot.
+            block_hash: The hash of the block the shot runs on.
+
+        Returns:
+            The key of the shot.
+        """
+        return keccak(
+            b"\x00".join([
+                bytes(code_hash),
+                str(num_qubits).encode(),
+                circuit_str.encode(),
+                str(random_seed).encode(),
+                bytes(block_hash)
+            ])
+        )
+
+    def get_many(self, keys: list[bytes]) -> dict[bytes, int]:
+        r"""
+        Get the cached outcomes of the shots.
+
+        Args:
+            keys: The keys of the shots.
+
+        Returns:
+            The outcome of every cached key.
+        """
+        unique_keys = list(dict.fromkeys(keys))
+        outcomes = dict()
+        with self._lock:
+            # sqlite limits the number of variables of a query
+            for index in range(0, len(unique_keys), 500):
+                chunk_keys = unique_keys[index:index + 500]
+                rows = self._connection.execute(
+                    "SELECT key, outcome FROM shots WHERE key IN (%s)" %
+                    ",".join("?" * len(chunk_keys)),
+                    chunk_keys
+                ).fetchall()
+                outcomes.update(
+                    (bytes(key), outcome) for key, outcome in rows
+                )
+            with self._connection:
+                self._connection.executemany(
+                    "UPDATE shots SET last_used = ? WHERE key = ?",
+                    [(next(self._clock), key) for key in outcomes]
+                )
+            hits = sum(1 for key in keys if key in outcomes)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        CACHE_HITS.inc(hits)
+        CACHE_MISSES.inc(len(keys) - hits)
+        return outcomes
+
+    def put_many(self, outcomes: dict[bytes, int]):
+        r"""
+        Add the outcomes of shots to the cache and evict the least
+        recently used outcomes above the maximum size.
+
+        Args:
+            outcomes: The outcome of every key.
+        """
+        with self._lock:
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO shots (key, outcome, last_used) "
+                    "VALUES (?, ?, ?)",
+                    [
+                        (key, int(outcome), next(self._clock))
+                        for key, outcome in outcomes.items()
+                    ]
+                )
+                entries = self._connection.execute(
+                    "SELECT COUNT(*) FROM shots"
+                ).fetchone()[0]
+                if entries > self.max_entries:
+                    self._connection.execute(
+                        "DELETE FROM shots WHERE key IN ("
+                        "SELECT key FROM shots ORDER BY last_used LIMIT ?)",
+                        (entries - self.max_entries,)
+                    )
+                    self.evictions += entries - self.max_entries
+                    CACHE_EVICTIONS.inc(entries - self.max_entries)
+                    logger.debug(
+                        "Evicted %d shots from the cache %s",
+                        entries - self.max_entries,
+                        self.path
+                    )
+
+    def stats(self) -> dict:
+        r"""
+        Get the statistics of the cache.
+
+        Returns:
+            The hits, misses, evictions and entries of the cache.
+        """
+        with self._lock:
+            entries = self._connection.execute(
+                "SELECT COUNT(*) FROM shots"
+            ).fetchone()[0]
+            return dict(
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                entries=entries
+            )
+
+    def clear(self):
+        r"""
+        Delete all the outcomes of the cache.
+        """
+        with self._lock:
+            with self._connection:
+                self._connection.execute("DELETE FROM shots")
+
+
+# one cache for every database of the process
+_shot_caches: dict[str, ShotCache] = dict()
+_shot_caches_lock = threading.Lock()
+
+
+def get_shot_cache(path: str, max_entries: int = 1000000) -> ShotCache:
+    r"""
+    Get the cache of a database, shared by all the backends.
+
+    Args:
+        path: The path of the SQLite database.
+        max_entries: The maximum number of outcomes in the cache.
+
+    Returns:
+        The shot cache.
+    """
+    path = str(pathlib.Path(path).expanduser().resolve())
+    with _shot_caches_lock:
+        if path not in _shot_caches:
+            _shot_caches[path] = ShotCache(path, max_entries)
+        shot_cache = _shot_caches[path]
+        shot_cache.max_entries = max_entries
+        return shot_cache
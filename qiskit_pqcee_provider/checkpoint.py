@@ -0,0 +1,227 @@
+from qiskit import qpy
+import io
+import json
+import logging
+import pathlib
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+# the name of the database in the checkpoint directory
+CHECKPOINT_DATABASE = "checkpoints.db"
+
+
+class CheckpointStore:
+    r"""
+    An on-disk store of the jobs and of the outcomes of their shots, in
+    a SQLite database, used to resume the jobs after a crash.
+    """
+
+    def __init__(self, checkpoint_dir: str):
+        r"""
+        Args:
+            checkpoint_dir: The directory of the checkpoints.
+        """
+        checkpoint_path = pathlib.Path(checkpoint_dir).expanduser()
+        checkpoint_path.mkdir(parents=True, exist_ok=True)
+        self.path = str(checkpoint_path / CHECKPOINT_DATABASE)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            self.path,
+            check_same_thread=False
+        )
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, "
+                "backend_name TEXT NOT NULL, "
+                "backend_address TEXT NOT NULL, "
+                "job_json TEXT NOT NULL, "
+                "circuits BLOB NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS shots ("
+                "job_id TEXT NOT NULL, "
+                "experiment INTEGER NOT NULL, "
+                "shot_index INTEGER NOT NULL, "
+                "outcome INTEGER NOT NULL, "
+                "PRIMARY KEY (job_id, experiment, shot_index))"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS experiments ("
+                "job_id TEXT NOT NULL, "
+                "experiment INTEGER NOT NULL, "
+                "early_stopped INTEGER NOT NULL, "
+                "PRIMARY KEY (job_id, experiment))"
+            )
+
+    def save_job(
+        self,
+        job_id: str,
+        backend_name: str,
+        backend_address: str,
+        job_json: dict,
+        circuits: list
+    ):
+        r"""
+        Save a job, the options that can not be serialized are dropped.
+
+        Args:
+            job_id: The id of the job.
+            backend_name: The name of the backend of the job.
+            backend_address: The address of the backend smart contract.
+            job_json: The job json.
+            circuits: The circuits of the job.
+        """
+        serializable_json = dict()
+        for key, value in job_json.items():
+            try:
+                json.dumps(value)
+            except TypeError:
+                continue
+            serializable_json[key] = value
+        circuits_file = io.BytesIO()
+        qpy.dump(circuits, circuits_file)
+        with self._lock:
+            with self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?)",
+                    (
+                        job_id,
+                        backend_name,
+                        backend_address,
+                        json.dumps(serializable_json),
+                        circuits_file.getvalue()
+                    )
+                )
+
+    def add_shots(
+        self,
+        job_id: str,
+        experiment: int,
+        start_index: int,
+        outcomes: list[int]
+    ):
+        r"""
+        Save the outcomes of consecutive shots of an experiment.
+
+        Args:
+            job_id: The id of the job.
+            experiment: The index of the circuit in the job.
+            start_index: The index of the first shot.
+            outcomes: The outcomes of the shots.
+        """
+        with self._lock:
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO shots VALUES (?, ?, ?, ?)",
+                    [
+                        (job_id, experiment, start_index + offset, int(outcome))
+                        for offset, outcome in enumerate(outcomes)
+                    ]
+                )
+
+    def set_experiment_done(
+        self,
+        job_id: str,
+        experiment: int,
+        early_stopped: bool = False
+    ):
+        r"""
+        Mark all the shots of an experiment as done.
+
+        Args:
+            job_id: The id of the job.
+            experiment: The index of the circuit in the job.
+            early_stopped: If the experiment stopped early.
+        """
+        with self._lock:
+            with self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO experiments VALUES (?, ?, ?)",
+                    (job_id, experiment, int(early_stopped))
+                )
+
+    def load_job(self, job_id: str) -> dict:
+        r"""
+        Load a job and the outcomes of its shots.
+
+        Args:
+            job_id: The id of the job.
+
+        Returns:
+            The backend name and address, the job json, the circuits,
+            the outcomes of the consecutive shots done by experiment and
+            the done experiments with their early stop, or None if the
+            job is not in the store.
+        """
+        with self._lock:
+            job_row = self._connection.execute(
+                "SELECT backend_name, backend_address, job_json, circuits "
+                "FROM jobs WHERE job_id = ?",
+                (job_id,)
+            ).fetchone()
+            if job_row is None:
+                return None
+            shots_rows = self._connection.execute(
+                "SELECT experiment, shot_index, outcome FROM shots "
+                "WHERE job_id = ? ORDER BY experiment, shot_index",
+                (job_id,)
+            ).fetchall()
+            experiments_rows = self._connection.execute(
+                "SELECT experiment, early_stopped FROM experiments "
+                "WHERE job_id = ?",
+                (job_id,)
+            ).fetchall()
+        backend_name, backend_address, job_json, circuits = job_row
+        outcomes = dict()
+        for experiment, shot_index, outcome in shots_rows:
+            experiment_outcomes = outcomes.setdefault(experiment, list())
+            # only the consecutive shots from the first one are kept,
+            # the other shots run again
+            if shot_index == len(experiment_outcomes):
+                experiment_outcomes.append(outcome)
+        logger.debug(
+            "Loaded %d shots of job %s from %s",
+            sum(len(outcomes) for outcomes in outcomes.values()),
+            job_id,
+            self.path
+        )
+        return dict(
+            backend_name=backend_name,
+            backend_address=backend_address,
+            job_json=json.loads(job_json),
+            circuits=qpy.load(io.BytesIO(circuits)),
+            outcomes=outcomes,
+            done_experiments={
+                experiment: bool(early_stopped)
+                for experiment, early_stopped in experiments_rows
+            }
+        )
+
+
+# one store for every checkpoint directory of the process
+_checkpoint_stores: dict[str, CheckpointStore] = dict()
+_checkpoint_stores_lock = threading.Lock()
+
+
+def get_checkpoint_store(checkpoint_dir: str) -> CheckpointStore:
+    r"""
+    Get the store of a checkpoint directory, shared by all the jobs.
+
+    Args:
+        checkpoint_dir: The directory of the checkpoints.
+
+    Returns:
+        The checkpoint store.
+    """
+    checkpoint_dir = str(
+        pathlib.Path(checkpoint_dir).expanduser().resolve()
+    )
+    with _checkpoint_stores_lock:
+        if checkpoint_dir not in _checkpoint_stores:
+            _checkpoint_stores[checkpoint_dir] = CheckpointStore(
+                checkpoint_dir
+            )
+        return _checkpoint_stores[checkpoint_dir]
@@ -78,14 +78,22 @@ contract QuantumBackendContract is IQuantumBackend
 	bytes1 constant GATE_m      = 'm';
 	bytes1 constant DELIM_NEXT  = ',';
 	bytes1 constant DELIM_END   = '.';
+	bytes1 constant BYTECODE_VERSION = 0x01;
 
 	// "S","s","CS","Cs"
 	string[] public gatesNames = ["H","I","CN","CCN","X","Y","Z","P","p","T","t","CP","Cp","CT","Ct","m"];
 	
+	// the bytecode of the registered circuits by their id, the hash
+	// of the bytecode
+	mapping(bytes32 => bytes) private circuits;
+
+	event CircuitRegistered(bytes32 indexed id, address indexed sender);
+
 	struct Qubit
 	{
 		int256[2][MAX_IDX] rQubits;  // instance count in real 
 		int256[2][MAX_IDX] iQubits;  // instance count in imaginary 
+		uint8[MAX_IDX] phaseDone;    // scratch flags for the T rescaling
 	}
 
 	// event Qc_Y(uint256 mask, uint256 currState, Qubit q, uint8 Qidx);
@@ -96,7 +104,7 @@ contract QuantumBackendContract is IQuantumBackend
 		owner = msg.sender;
 	}
 
-	function getRandom(uint256 range, uint256 randomSeed) private view returns (uint) 
+	function getRandom(uint256 range, uint256 randomSeed) internal view returns (uint) 
 	{
 		uint randomHash = uint(keccak256(abi.encode(block.number, block.timestamp, randomSeed)));
 		return randomHash % range;
@@ -329,208 +337,200 @@ contract QuantumBackendContract is IQuantumBackend
 		return ret;
 	}
 
-	function qc_exec(uint8 numQubits, bytes1[] memory qAlgo, Qubit memory q, uint256 randomSeed) internal view returns (uint8)
+	function qc_exec(uint8 numQubits, bytes1[] memory qAlgo, Qubit memory q, uint256 randomSeed) internal view virtual returns (uint8)
 	{
 		uint256 mask;
+		uint256 cMask = 0;
 		uint256 i;
 		uint256 j;
 		uint8 Qidx = 0;
 
-		uint256 maxj=(2**numQubits);
+		// the control qubits of a layer control all its gates
+		mask = 1;
+		mask <<= numQubits - 1;
+		for (j=0;j<numQubits;j++)
+		{
+			if (qAlgo[j] == GATE_C)
+				cMask += mask;
+			mask >>= 1;
+		}
 		mask = 1;
 		mask <<= numQubits - 1;
 		for (i=0;i<numQubits;i++)
 		{
-			uint8 nQidx;
+			qc_gate(numQubits, qAlgo[i], mask, cMask, q, Qidx, randomSeed);
+			mask >>=1;
+			Qidx = (Qidx == 0)?1:0;
+		}
+		if (Qidx == 1)
+			qc_copy(numQubits, q);
+				
+		return numQubits;
+	}
+
+	function qc_copy(uint8 numQubits, Qubit memory q) internal pure
+	{
+		uint256 j;
 
-			nQidx = (Qidx == 0)?1:0;
-			for (j=0;j<maxj;j++)
+		for (j=0;j<2**numQubits;j++)
+		{
+			q.rQubits[j][0] = q.rQubits[j][1];
+			q.iQubits[j][0] = q.iQubits[j][1];
+		}
+	}
+
+	function qc_gate(uint8 numQubits, bytes1 gate, uint256 mask, uint256 cMask, Qubit memory q, uint8 Qidx, uint256 randomSeed) internal view
+	{
+		// apply one gate on the target qubit of the mask, from the
+		// state Qidx to the other state
+		uint256 j;
+		uint256 maxj=(2**numQubits);
+		uint8 nQidx = (Qidx == 0)?1:0;
+
+		for (j=0;j<maxj;j++)
+		{
+			q.rQubits[j][nQidx] = q.iQubits[j][nQidx] = 0;
+		}
+		if (gate == GATE_H)
+		{
+			for(j=0;j<maxj;j++)
 			{
-				q.rQubits[j][nQidx] = q.iQubits[j][nQidx] = 0;
+				if ((q.rQubits[j][Qidx]!=0) || (q.iQubits[j][Qidx] != 0))
+					qc_H(mask,j,q,Qidx);
 			}
-			if (qAlgo[i] == GATE_H)
+		}
+		else if ((gate == GATE_I) || (gate == GATE_C))
+		{
+			for(j=0;j<maxj;j++)
 			{
-				for(j=0;j<maxj;j++)
-				{
-					if ((q.rQubits[j][Qidx]!=0) || (q.iQubits[j][Qidx] != 0))
-						qc_H(mask,j,q,Qidx);
-				}
+				if ((q.rQubits[j][Qidx]!=0) || (q.iQubits[j][Qidx] != 0))
+					qc_I(j,q,Qidx);
 			}
-			else if ((qAlgo[i] == GATE_I) || (qAlgo[i] == GATE_C))
+		}
+		else if (gate == GATE_X)
+		{
+			for(j=0;j<maxj;j++)
 			{
-				for(j=0;j<maxj;j++)
-				{
-					if ((q.rQubits[j][Qidx]!=0) || (q.iQubits[j][Qidx] != 0))
-						qc_I(j,q,Qidx);
-				}
+				if ((q.rQubits[j][Qidx]!=0) || (q.iQubits[j][Qidx] != 0))
+					qc_X(mask,j,q,Qidx);
 			}
-			else if (qAlgo[i] == GATE_X)
+		}
+		else if (gate == GATE_Y)
+		{
+			for(j=0;j<maxj;j++)
 			{
-				for(j=0;j<maxj;j++)
-				{
-					if ((q.rQubits[j][Qidx]!=0) || (q.iQubits[j][Qidx] != 0))
-						qc_X(mask,j,q,Qidx);
-				}
+				if ((q.rQubits[j][Qidx]!=0) || (q.iQubits[j][Qidx] != 0))
+					qc_Y(mask,j,q,Qidx);
+			}
+		}
+		else if (gate == GATE_Z)
+		{
+			for(j=0;j<maxj;j++)
+			{
+				if ((q.rQubits[j][Qidx]!=0) || (q.iQubits[j][Qidx] != 0))
+					qc_Z(mask,j,q,Qidx);
 			}
-			else if (qAlgo[i] == GATE_Y)
+		}
+		else if (gate == GATE_m)
+		{
+			uint256 k = 0;
+			for (j = 0; j < maxj; j++)
+			{
+				q.rQubits[j][nQidx] = q.rQubits[j][Qidx];
+				if (q.rQubits[j][nQidx] < 0)
+					q.rQubits[j][nQidx] = 0 - q.rQubits[j][nQidx];
+				q.iQubits[j][nQidx] = q.iQubits[j][Qidx];
+				if (q.iQubits[j][nQidx] < 0)
+					q.iQubits[j][nQidx] = 0 - q.iQubits[j][nQidx];
+				q.rQubits[j][nQidx] += q.iQubits[j][nQidx];
+
+				k += uint(q.rQubits[j][nQidx]);
+			}
+			j = getRandom(k,randomSeed)+1;
+			k = 0;
+			while (j > uint(q.rQubits[k][nQidx]))
+			{
+				j -= uint(q.rQubits[k++][nQidx]);
+			}	
+			for (j = 0; j < maxj; j++)
+			{
+				q.rQubits[j][nQidx] = q.iQubits[j][nQidx] = 0;
+			}
+			if ((k & mask) == 0)
 			{
 				for(j=0;j<maxj;j++)
 				{
 					if ((q.rQubits[j][Qidx]!=0) || (q.iQubits[j][Qidx] != 0))
-						qc_Y(mask,j,q,Qidx);
+						qc_0(mask,j,q,Qidx);
 				}
 			}
-			else if (qAlgo[i] == GATE_Z)
+			else
 			{
 				for(j=0;j<maxj;j++)
 				{
 					if ((q.rQubits[j][Qidx]!=0) || (q.iQubits[j][Qidx] != 0))
-						qc_Z(mask,j,q,Qidx);
+						qc_1(mask,j,q,Qidx);
 				}
 			}
-			else if (qAlgo[i] == GATE_m)
+		}
+		else if (gate == GATE_N)
+		{
+			for(j=0;j<maxj;j++)
 			{
-				uint256 k = 0;
-				//nQidx = (Qidx == 0)?1:0;
-				for (j = 0; j < maxj; j++)
-				{
-					q.rQubits[j][nQidx] = q.rQubits[j][Qidx];
-					if (q.rQubits[j][nQidx] < 0)
-						q.rQubits[j][nQidx] = 0 - q.rQubits[j][nQidx];
-					q.iQubits[j][nQidx] = q.iQubits[j][Qidx];
-					if (q.iQubits[j][nQidx] < 0)
-						q.iQubits[j][nQidx] = 0 - q.iQubits[j][nQidx];
-					q.rQubits[j][nQidx] += q.iQubits[j][nQidx];
-
-					k += uint(q.rQubits[j][nQidx]);
-				}
-				j = getRandom(k,randomSeed)+1;
-				k = 0;
-				while (j > uint(q.rQubits[k][nQidx]))
-				{
-					j -= uint(q.rQubits[k++][nQidx]);
-				}	
-				for (j = 0; j < maxj; j++)
-				{
-					q.rQubits[j][nQidx] = q.iQubits[j][nQidx] = 0;
-				}
-				if ((k & mask) == 0)
-				{
-					for(j=0;j<maxj;j++)
-					{
-						if ((q.rQubits[j][Qidx]!=0) || (q.iQubits[j][Qidx] != 0))
-							qc_0(mask,j,q,Qidx);
-					}
-				}
-				else
-				{
-					for(j=0;j<maxj;j++)
-					{
-						if ((q.rQubits[j][Qidx]!=0) || (q.iQubits[j][Qidx] != 0))
-							qc_1(mask,j,q,Qidx);
-					}
-				}
+				if ((q.rQubits[j][Qidx]!=0) || (q.iQubits[j][Qidx] != 0))
+					qc_CN(cMask,mask,j,q,Qidx);
 			}
-			else if (qAlgo[i] == GATE_N)
+		}
+		else if ((gate == GATE_P) || (gate == GATE_p))
+		{
+			for(j=0;j<maxj;j++)
 			{
-				uint256 tempVal = 1;
-				tempVal <<= numQubits-1;
-				uint256 cMask = 0;
-
-				for (j=0;j<numQubits;j++)
+				if ((q.rQubits[j][Qidx]!=0) || (q.iQubits[j][Qidx] != 0))
 				{
-					if (qAlgo[j] == GATE_C)
-						cMask += tempVal;
-					tempVal>>=1;
-				}
-				for(j=0;j<maxj;j++)
-				{
-					if ((q.rQubits[j][Qidx]!=0) || (q.iQubits[j][Qidx] != 0))
-						qc_CN(cMask,mask,j,q,Qidx);
+					if (gate == GATE_P)
+						GATE_CP(cMask,mask,j,q,Qidx);
+					else
+						GATE_Cp(cMask,mask,j,q,Qidx);
 				}
 			}
-			else if ((qAlgo[i] == GATE_P) || (qAlgo[i] == GATE_p))
+		}
+		else if ((gate == GATE_T) || (gate == GATE_t))
+		{
+			bool phased = false;
+			for(j=0;j<maxj;j++)
 			{
-				uint256 tempVal = 1;
-				tempVal <<= numQubits-1;
-				uint256 cMask = 0;
-
-				for (j=0;j<numQubits;j++)
-				{
-					if (qAlgo[j] == GATE_C)
-						cMask += tempVal;
-					tempVal>>=1;
-				}
-				for(j=0;j<maxj;j++)
+				q.phaseDone[j] = 0;
+				if ((q.rQubits[j][Qidx]!=0) || (q.iQubits[j][Qidx] != 0))
 				{
-					if ((q.rQubits[j][Qidx]!=0) || (q.iQubits[j][Qidx] != 0))
-					{
-						if (qAlgo[i] == GATE_P)
-							GATE_CP(cMask,mask,j,q,Qidx);
-						else
-							GATE_Cp(cMask,mask,j,q,Qidx);
-					}
+					if (gate == GATE_T)
+						q.phaseDone[j] = qc_CT(cMask,mask,j,q,Qidx);
+					else
+						q.phaseDone[j] = qc_Ct(cMask,mask,j,q,Qidx);
+					if (q.phaseDone[j] > 0)
+						phased = true;
 				}
 			}
-			else if ((qAlgo[i] == GATE_T) || (qAlgo[i] == GATE_t))
+			if (phased)
 			{
-				uint256 tempVal = 1;
-				tempVal <<= numQubits-1;
-				uint256 cMask = 0;
-				uint8[MAX_IDX] memory phaseDone;
-				
-				for (j=0;j<numQubits;j++)
-				{
-					if (qAlgo[j] == GATE_C)
-						cMask += tempVal;
-					tempVal>>=1;
-				}
-				tempVal = 0;
 				for(j=0;j<maxj;j++)
 				{
-					phaseDone[j] = 0;
-					if ((q.rQubits[j][Qidx]!=0) || (q.iQubits[j][Qidx] != 0))
+					if (q.phaseDone[j]==0)
 					{
-						if (qAlgo[i] == GATE_T)
-							phaseDone[j] = qc_CT(cMask,mask,j,q,Qidx);
-						else
-							phaseDone[j] = qc_Ct(cMask,mask,j,q,Qidx);
-						if (phaseDone[j] > 0)
-							tempVal = 1;
+						q.rQubits[j][nQidx]*= 10;
+						q.iQubits[j][nQidx]*= 10;
 					}
-				}
-				if (tempVal > 0)
-				{
-					for(j=0;j<maxj;j++)
+					else
 					{
-						if (phaseDone[j]==0)
-						{
-							q.rQubits[j][nQidx]*= 10;
-							q.iQubits[j][nQidx]*= 10;
-						}
-						else
-						{
-							q.rQubits[j][nQidx]*= 7;
-							q.iQubits[j][nQidx]*= 7;
-						}
+						q.rQubits[j][nQidx]*= 7;
+						q.iQubits[j][nQidx]*= 7;
 					}
 				}
 			}
-			else
-			{
-				revert("Unknown or unsupported gate");
-			}
-			mask >>=1;
-			Qidx = nQidx;
 		}
-		if (Qidx == 1)
-			for (j=0;j<2**numQubits;j++)
-			{
-				q.rQubits[j][0] = q.rQubits[j][1];
-				q.iQubits[j][0] = q.iQubits[j][1];
-			}
-				
-		return numQubits;
+		else
+		{
+			revert("Unknown or unsupported gate");
+		}
 	}
 
 	function checkLicense(uint8 numQubits) internal pure returns (uint8)
@@ -543,8 +543,78 @@ contract QuantumBackendContract is IQuantumBackend
 	function runQScript(uint8 numQubits, string memory s, uint256 randomSeed) public view returns (uint256) 
 	{
 		Qubit memory q;
+		return qc_run(numQubits, s, randomSeed, q);
+	}
+
+	function runQScriptShots(uint8 numQubits, string memory s, uint256[] memory randomSeeds) public view returns (uint256[] memory) 
+	{
+		// the state buffers are allocated once and reused by every shot
+		// so the memory expansion cost is paid only once per call
+		Qubit memory q;
+		uint256[] memory ret = new uint256[](randomSeeds.length);
+		uint256 k;
+
+		for (k = 0; k < randomSeeds.length; k++)
+		{
+			ret[k] = qc_run(numQubits, s, randomSeeds[k], q);
+		}
+		return ret;
+	}
+
+	function qc_run(uint8 numQubits, string memory s, uint256 randomSeed, Qubit memory q) internal view returns (uint256) 
+	{
+		qc_evolve(numQubits, s, randomSeed, q);
+
+		// measure in the computational basis
+		return qc_sample(qc_weights(numQubits, q), randomSeed, q);
+	}
+
+	function runQScriptSample(uint8 numQubits, string memory s, uint256[] memory randomSeeds) public view returns (uint256[] memory) 
+	{
+		// the final state does not depend on the seed when there are
+		// no mid-circuit measurements, so it is computed only once and
+		// every shot is only a sample from the same amplitudes
+		Qubit memory q;
+		uint256[] memory ret = new uint256[](randomSeeds.length);
+		uint256 total;
+		uint256 k;
+
+		for (k = 0; k < bytes(s).length; k++)
+		{
+			if (bytes(s)[k] == GATE_m)
+				revert("Mid-circuit measurement");
+		}
+		qc_evolve(numQubits, s, 0, q);
+		total = qc_weights(numQubits, q);
+		for (k = 0; k < randomSeeds.length; k++)
+		{
+			ret[k] = qc_sample(total, randomSeeds[k], q);
+		}
+		return ret;
+	}
+
+	function getStatevector(uint8 numQubits, string memory s, uint256 randomSeed) public view returns (int256[] memory, int256[] memory) 
+	{
+		// the final integer amplitudes before the measurement, the
+		// seed is only used by mid-circuit measurements
+		Qubit memory q;
+		uint256 j;
+
+		qc_evolve(numQubits, s, randomSeed, q);
+		uint256 maxj = 2**numQubits;
+		int256[] memory rState = new int256[](maxj);
+		int256[] memory iState = new int256[](maxj);
+		for (j = 0; j < maxj; j++)
+		{
+			rState[j] = q.rQubits[j][0];
+			iState[j] = q.iQubits[j][0];
+		}
+		return (rState, iState);
+	}
+
+	function qc_evolve(uint8 numQubits, string memory s, uint256 randomSeed, Qubit memory q) internal view 
+	{
 		bytes1[] memory nextGate;
-		uint256 ret = 0;
 		bool done = false;
 		uint256 i = 0;
 		uint256 j;
@@ -599,27 +669,206 @@ contract QuantumBackendContract is IQuantumBackend
 
 			}
 		}
+	}
+
+	function runQBytecode(bytes memory code, uint256 randomSeed) public view returns (uint256) 
+	{
+		Qubit memory q;
+		return qb_run(code, randomSeed, q);
+	}
+
+	function runQBytecodeShots(bytes memory code, uint256[] memory randomSeeds) public view returns (uint256[] memory) 
+	{
+		Qubit memory q;
+		uint256[] memory ret = new uint256[](randomSeeds.length);
+		uint256 k;
+
+		for (k = 0; k < randomSeeds.length; k++)
+		{
+			ret[k] = qb_run(code, randomSeeds[k], q);
+		}
+		return ret;
+	}
+
+	function runQBytecodeSample(bytes memory code, uint256[] memory randomSeeds) public view returns (uint256[] memory) 
+	{
+		Qubit memory q;
+		uint256[] memory ret = new uint256[](randomSeeds.length);
+		uint256 total;
+		uint256 k;
+		uint256 size = qb_instruction_size(code);
+
+		for (k = 2; k < code.length; k += size)
+		{
+			if (code[k] == GATE_m)
+				revert("Mid-circuit measurement");
+		}
+		total = qc_weights(qb_evolve(code, 0, q), q);
+		for (k = 0; k < randomSeeds.length; k++)
+		{
+			ret[k] = qc_sample(total, randomSeeds[k], q);
+		}
+		return ret;
+	}
+
+	function qb_run(bytes memory code, uint256 randomSeed, Qubit memory q) internal view returns (uint256) 
+	{
+		uint8 numQubits = qb_evolve(code, randomSeed, q);
 
 		// measure in the computational basis
+		return qc_sample(qc_weights(numQubits, q), randomSeed, q);
+	}
+
+	function qb_instruction_size(bytes memory code) internal pure returns (uint256) 
+	{
+		// the header is the version and the number of qubits, every
+		// instruction is the opcode, the bit of the target qubit and
+		// the big endian control mask
+		if ((code.length < 2) || (code[0] != BYTECODE_VERSION))
+			revert("Unsupported bytecode version");
+		uint256 size = 2 + (uint256(uint8(code[1])) + 7) / 8;
+		if (size < 3)
+			size = 3;
+		if ((code.length - 2) % size != 0)
+			revert("Truncated bytecode");
+		return size;
+	}
+
+	function qb_evolve(bytes memory code, uint256 randomSeed, Qubit memory q) internal view virtual returns (uint8) 
+	{
+		// every instruction is a single pass over the amplitudes, without
+		// the identity passes of the other qubits of a QuiC layer
+		uint256 size = qb_instruction_size(code);
+		uint8 numQubits = uint8(code[1]);
+		uint256 cMask;
+		uint256 i;
+		uint8 Qidx = 0;
+
+		checkLicense(numQubits);
+		for (i=0;i<(2**numQubits);i++)
+		{
+			q.rQubits[i][0] = q.rQubits[i][1] = q.iQubits[i][0] = q.iQubits[i][1] = 0;
+		}
+		q.rQubits[0][0] = 1; // start with all qubits = 0;
+
+		for (i = 2; i < code.length; i += size)
+		{
+			if (uint8(code[i+1]) >= numQubits)
+				revert("Unknown target qubit");
+			cMask = qb_control_mask(code, i, size);
+			if ((cMask >> numQubits) != 0)
+				revert("Unknown control qubit");
+			qc_gate(numQubits, code[i], 1 << uint8(code[i+1]), cMask, q, Qidx, randomSeed);
+			Qidx = (Qidx == 0)?1:0;
+		}
+		if (Qidx == 1)
+			qc_copy(numQubits, q);
+		return numQubits;
+	}
+
+	function registerCircuit(bytes memory code) public returns (bytes32) 
+	{
+		// the circuits are stored once by the hash of their bytecode,
+		// so the shots only send the id in the calldata
+		bytes32 id = keccak256(code);
+
+		if (circuits[id].length == 0)
+		{
+			checkLicense(qb_validate(code));
+			circuits[id] = code;
+			emit CircuitRegistered(id, msg.sender);
+		}
+		return id;
+	}
+
+	function isCircuitRegistered(bytes32 id) public view returns (bool) 
+	{
+		return circuits[id].length > 0;
+	}
+
+	function runById(bytes32 id, uint256 randomSeed) public view returns (uint256) 
+	{
+		return runQBytecode(qb_load(id), randomSeed);
+	}
+
+	function runByIdShots(bytes32 id, uint256[] memory randomSeeds) public view returns (uint256[] memory) 
+	{
+		return runQBytecodeShots(qb_load(id), randomSeeds);
+	}
+
+	function runByIdSample(bytes32 id, uint256[] memory randomSeeds) public view returns (uint256[] memory) 
+	{
+		return runQBytecodeSample(qb_load(id), randomSeeds);
+	}
+
+	function qb_load(bytes32 id) internal view returns (bytes memory) 
+	{
+		bytes memory code = circuits[id];
+
+		if (code.length == 0)
+			revert("Unknown circuit");
+		return code;
+	}
+
+	function qb_validate(bytes memory code) internal pure returns (uint8) 
+	{
+		// check every instruction once, when the circuit is registered
+		uint256 size = qb_instruction_size(code);
+		uint8 numQubits = uint8(code[1]);
+		uint256 i;
+
+		for (i = 2; i < code.length; i += size)
+		{
+			if (uint8(code[i+1]) >= numQubits)
+				revert("Unknown target qubit");
+			if ((qb_control_mask(code, i, size) >> numQubits) != 0)
+				revert("Unknown control qubit");
+		}
+		return numQubits;
+	}
+
+	function qb_control_mask(bytes memory code, uint256 i, uint256 size) internal pure returns (uint256) 
+	{
+		// the big endian control mask after the opcode and the target
+		uint256 cMask = 0;
+		uint256 j;
+
+		for (j = i + 2; j < i + size; j++)
+		{
+			cMask = (cMask << 8) + uint8(code[j]);
+		}
+		return cMask;
+	}
+
+	function qc_weights(uint8 numQubits, Qubit memory q) internal pure returns (uint256) 
+	{
+		// the weight of every basis state is |r + i|, kept in place
+		// of the real part of the final state
+		uint256 total = 0;
+		uint256 j;
 
-		i = 0;
 		for (j = 0; j < (2**numQubits); j++)
 		{
 			q.rQubits[j][0] += q.iQubits[j][0];	
 			if (q.rQubits[j][0] < 0)
 				q.rQubits[j][0] = 0 - q.rQubits[j][0];
 
-			i += uint(q.rQubits[j][0]);
+			total += uint(q.rQubits[j][0]);
 		}
-		j = getRandom(i,randomSeed)+1;
-		ret = 0;
+		return total;
+	}
+
+	function qc_sample(uint256 total, uint256 randomSeed, Qubit memory q) internal view returns (uint256) 
+	{
+		uint256 j = getRandom(total,randomSeed)+1;
+		uint256 ret = 0;
+
 		while (j > uint(q.rQubits[ret][0]))
 		{
 			j -= uint(q.rQubits[ret++][0]);
 		}	
 
 		return ret;
-			
 	}
 
     function getGatesNames() external view returns (string[] memory) {
@@ -638,7 +887,7 @@ contract QuantumBackendContract is IQuantumBackend
 		return false;
 	}
 
-	function getName() external pure returns (string memory) {
+	function getName() external pure virtual returns (string memory) {
 		return "pqcee_simulator";
 	}
 
@@ -0,0 +1,334 @@
+// SPDX-License-Identifier: MIT with Commons Clause 
+/*
+
+Name: QuantumContract
+Description: An on-chain quantum emulator running in an EVM smart contract
+Author: Teik Guan Tan
+Date: Feb 2023
+
+MIT License
+
+Copyright (c) 2023 pQCee Pte Ltd 
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+ * “Commons Clause” License Condition v1.0
+ *
+ * The Software is provided to you by the Licensor under the License, as defined below, subject to the following
+ * condition.
+ *
+ * Without limiting other conditions in the License, the grant of rights under the License will not include, and
+ * the License does not grant to you, the right to Sell the Software.
+ *
+ * For purposes of the foregoing, “Sell” means practicing any or all of the rights granted to you under the License
+ * to provide to third parties, for a fee or other consideration (including without limitation fees for hosting or
+ * consulting/ support services related to the Software), a product or service whose value derives, entirely or
+ * substantially, from the functionality of the Software. Any license notice or attribution required by the License
+ * must also include this Commons Clause License Condition notice.
+ *
+ * Software: QuantumContract
+ *
+ * License: MIT 1.0
+ *
+ * Licensor: pQCee Pte Ltd
+
+modified by Stefan-Dan Ciocirlan (sdcioc) Date: 18.10.2023
+*/
+
+pragma solidity ^0.8.17;
+
+import "./QuantumBackendContract.sol";
+
+// the backend updating the amplitudes in place, with the same integer
+// arithmetic and so the same outcomes as QuantumBackendContract
+contract QuantumBackendInPlaceContract is QuantumBackendContract
+{
+	function qc_pair(uint256 p, uint256 mask) internal pure returns (uint256) 
+	{
+		// the p-th index with the bit of the mask clear
+		return ((p & ~(mask - 1)) << 1) | (p & (mask - 1));
+	}
+
+	function qc_H_in_place(uint8 numQubits, uint256 mask, Qubit memory q) internal pure 
+	{
+		// the imaginary part is added on both branches as in qc_H
+		uint256 p;
+		uint256 a;
+		uint256 b;
+		int256 r;
+
+		for (p = 0; p < (2**numQubits) >> 1; p++)
+		{
+			a = qc_pair(p, mask);
+			b = a | mask;
+			r = q.rQubits[a][0];
+			q.rQubits[a][0] = r + q.rQubits[b][0];
+			q.rQubits[b][0] = r - q.rQubits[b][0];
+			q.iQubits[a][0] += q.iQubits[b][0];
+			q.iQubits[b][0] = q.iQubits[a][0];
+		}
+	}
+
+	function qc_X_in_place(uint8 numQubits, uint256 cMask, uint256 mask, Qubit memory q) internal pure 
+	{
+		// swap the pairs, only where the controls are set for CN
+		uint256 p;
+		uint256 a;
+		uint256 b;
+
+		for (p = 0; p < (2**numQubits) >> 1; p++)
+		{
+			a = qc_pair(p, mask);
+			if ((a & cMask) == cMask)
+			{
+				b = a | mask;
+				(q.rQubits[a][0], q.rQubits[b][0]) = (q.rQubits[b][0], q.rQubits[a][0]);
+				(q.iQubits[a][0], q.iQubits[b][0]) = (q.iQubits[b][0], q.iQubits[a][0]);
+			}
+		}
+	}
+
+	function qc_Y_in_place(uint8 numQubits, uint256 mask, Qubit memory q) internal pure 
+	{
+		uint256 p;
+		uint256 a;
+		uint256 b;
+		int256 r;
+		int256 i;
+
+		for (p = 0; p < (2**numQubits) >> 1; p++)
+		{
+			a = qc_pair(p, mask);
+			b = a | mask;
+			r = q.rQubits[a][0];
+			i = q.iQubits[a][0];
+			q.rQubits[a][0] = q.iQubits[b][0];
+			q.iQubits[a][0] = 0 - q.rQubits[b][0];
+			q.rQubits[b][0] = 0 - i;
+			q.iQubits[b][0] = r;
+		}
+	}
+
+	function qc_Z_in_place(uint8 numQubits, uint256 mask, Qubit memory q) internal pure 
+	{
+		// diagonal, only the amplitudes with the target bit set change
+		uint256 p;
+		uint256 b;
+
+		for (p = 0; p < (2**numQubits) >> 1; p++)
+		{
+			b = qc_pair(p, mask) | mask;
+			q.rQubits[b][0] = 0 - q.rQubits[b][0];
+			q.iQubits[b][0] = 0 - q.iQubits[b][0];
+		}
+	}
+
+	function qc_CP_in_place(uint8 numQubits, bytes1 gate, uint256 cMask, uint256 mask, Qubit memory q) internal pure 
+	{
+		// diagonal, multiply by i for P and by -i for p
+		uint256 p;
+		uint256 b;
+		int256 r;
+
+		for (p = 0; p < (2**numQubits) >> 1; p++)
+		{
+			b = qc_pair(p, mask) | mask;
+			if ((b & cMask) == cMask)
+			{
+				r = q.rQubits[b][0];
+				if (gate == GATE_P)
+				{
+					q.rQubits[b][0] = 0 - q.iQubits[b][0];
+					q.iQubits[b][0] = r;
+				}
+				else
+				{
+					q.rQubits[b][0] = q.iQubits[b][0];
+					q.iQubits[b][0] = 0 - r;
+				}
+			}
+		}
+	}
+
+	function qc_CT_in_place(uint8 numQubits, bytes1 gate, uint256 cMask, uint256 mask, Qubit memory q) internal pure 
+	{
+		// diagonal, the phased non zero amplitudes are scaled by 7 at
+		// once and, if any, all the others by 10 as in qc_gate
+		uint256 p;
+		uint256 b;
+		int256 r;
+		int256 i;
+		bool phased = false;
+
+		for (p = 0; p < (2**numQubits) >> 1; p++)
+		{
+			b = qc_pair(p, mask) | mask;
+			r = q.rQubits[b][0];
+			i = q.iQubits[b][0];
+			if (((b & cMask) == cMask) && ((r != 0) || (i != 0)))
+			{
+				if (gate == GATE_T)
+				{
+					q.rQubits[b][0] = (r - i) * 7;
+					q.iQubits[b][0] = (r + i) * 7;
+				}
+				else
+				{
+					q.rQubits[b][0] = (r + i) * 7;
+					q.iQubits[b][0] = (i - r) * 7;
+				}
+				phased = true;
+			}
+		}
+		if (phased)
+		{
+			// the zero amplitudes of the phased indexes stay zero
+			for (p = 0; p < 2**numQubits; p++)
+			{
+				if (((p & mask) == 0) || ((p & cMask) != cMask))
+				{
+					q.rQubits[p][0] *= 10;
+					q.iQubits[p][0] *= 10;
+				}
+			}
+		}
+	}
+
+	function qc_weight(uint256 j, Qubit memory q) internal pure returns (uint256) 
+	{
+		// the weight of a basis state for a mid-circuit measurement
+		int256 r = q.rQubits[j][0];
+		int256 i = q.iQubits[j][0];
+
+		if (r < 0)
+			r = 0 - r;
+		if (i < 0)
+			i = 0 - i;
+		return uint(r + i);
+	}
+
+	function qc_m_in_place(uint8 numQubits, uint256 mask, Qubit memory q, uint256 randomSeed) internal view 
+	{
+		uint256 j;
+		uint256 k = 0;
+
+		for (j = 0; j < 2**numQubits; j++)
+		{
+			k += qc_weight(j, q);
+		}
+		j = getRandom(k,randomSeed)+1;
+		k = 0;
+		while (j > qc_weight(k, q))
+		{
+			j -= qc_weight(k++, q);
+		}
+		// keep the amplitudes with the measured value of the target
+		for (j = 0; j < 2**numQubits; j++)
+		{
+			if ((j & mask) != (k & mask))
+				q.rQubits[j][0] = q.iQubits[j][0] = 0;
+		}
+	}
+
+	function qc_gate_in_place(uint8 numQubits, bytes1 gate, uint256 mask, uint256 cMask, Qubit memory q, uint256 randomSeed) internal view
+	{
+		// apply one gate on the target qubit of the mask on the single
+		// state, the identity and the control columns are skipped
+		if ((gate == GATE_I) || (gate == GATE_C))
+			return;
+		else if (gate == GATE_H)
+			qc_H_in_place(numQubits, mask, q);
+		else if (gate == GATE_X)
+			qc_X_in_place(numQubits, 0, mask, q);
+		else if (gate == GATE_Y)
+			qc_Y_in_place(numQubits, mask, q);
+		else if (gate == GATE_Z)
+			qc_Z_in_place(numQubits, mask, q);
+		else if (gate == GATE_m)
+			qc_m_in_place(numQubits, mask, q, randomSeed);
+		else if (gate == GATE_N)
+		{
+			// qc_CN is the identity without control qubits
+			if (cMask != 0)
+				qc_X_in_place(numQubits, cMask, mask, q);
+		}
+		else if ((gate == GATE_P) || (gate == GATE_p))
+			qc_CP_in_place(numQubits, gate, cMask, mask, q);
+		else if ((gate == GATE_T) || (gate == GATE_t))
+			qc_CT_in_place(numQubits, gate, cMask, mask, q);
+		else
+			revert("Unknown or unsupported gate");
+	}
+
+	function qc_exec(uint8 numQubits, bytes1[] memory qAlgo, Qubit memory q, uint256 randomSeed) internal view override returns (uint8)
+	{
+		uint256 mask;
+		uint256 cMask = 0;
+		uint256 i;
+
+		// the control qubits of a layer control all its gates
+		mask = 1;
+		mask <<= numQubits - 1;
+		for (i=0;i<numQubits;i++)
+		{
+			if (qAlgo[i] == GATE_C)
+				cMask += mask;
+			mask >>= 1;
+		}
+		mask = 1;
+		mask <<= numQubits - 1;
+		for (i=0;i<numQubits;i++)
+		{
+			qc_gate_in_place(numQubits, qAlgo[i], mask, cMask, q, randomSeed);
+			mask >>=1;
+		}
+		return numQubits;
+	}
+
+	function qb_evolve(bytes memory code, uint256 randomSeed, Qubit memory q) internal view override returns (uint8) 
+	{
+		uint256 size = qb_instruction_size(code);
+		uint8 numQubits = uint8(code[1]);
+		uint256 cMask;
+		uint256 i;
+
+		checkLicense(numQubits);
+		for (i=0;i<(2**numQubits);i++)
+		{
+			q.rQubits[i][0] = q.iQubits[i][0] = 0;
+		}
+		q.rQubits[0][0] = 1; // start with all qubits = 0;
+
+		for (i = 2; i < code.length; i += size)
+		{
+			if (uint8(code[i+1]) >= numQubits)
+				revert("Unknown target qubit");
+			cMask = qb_control_mask(code, i, size);
+			if ((cMask >> numQubits) != 0)
+				revert("Unknown control qubit");
+			qc_gate_in_place(numQubits, code[i], 1 << uint8(code[i+1]), cMask, q, randomSeed);
+		}
+		return numQubits;
+	}
+
+	function getName() external pure override returns (string memory) {
+		return "pqcee_inplace_simulator";
+	}
+
+}
@@ -27,4 +27,26 @@ interface IQuantumBackend
 
     function runQScript(uint8 numQubits, string memory s, uint256 randomSeed) external view returns (uint256);
 
+    function runQScriptShots(uint8 numQubits, string memory s, uint256[] memory randomSeeds) external view returns (uint256[] memory);
+
+    function runQScriptSample(uint8 numQubits, string memory s, uint256[] memory randomSeeds) external view returns (uint256[] memory);
+
+    function getStatevector(uint8 numQubits, string memory s, uint256 randomSeed) external view returns (int256[] memory, int256[] memory);
+
+    function runQBytecode(bytes memory code, uint256 randomSeed) external view returns (uint256);
+
+    function runQBytecodeShots(bytes memory code, uint256[] memory randomSeeds) external view returns (uint256[] memory);
+
+    function runQBytecodeSample(bytes memory code, uint256[] memory randomSeeds) external view returns (uint256[] memory);
+
+    function registerCircuit(bytes memory code) external returns (bytes32);
+
+    function isCircuitRegistered(bytes32 id) external view returns (bool);
+
+    function runById(bytes32 id, uint256 randomSeed) external view returns (uint256);
+
+    function runByIdShots(bytes32 id, uint256[] memory randomSeeds) external view returns (uint256[] memory);
+
+    function runByIdSample(bytes32 id, uint256[] memory randomSeeds) external view returns (uint256[] memory);
+
 }
@@ -0,0 +1,516 @@
+# future annotations
+from __future__ import annotations
+from qiskit.providers import JobV1 as Job
+from qiskit.providers import ProviderV1 as Provider
+from qiskit.providers import Options
+from qiskit.providers.jobstatus import JobStatus
+from qiskit.result import Result
+from qiskit.result.models import ExperimentResult, ExperimentResultData
+from qiskit.qobj import QobjExperimentHeader
+from eth_utils import keccak
+import numpy as np
+import logging
+import uuid
+
+from .job import _get_experiment_random_seed
+from .quic import QuiCBackend
+
+logger = logging.getLogger(__name__)
+
+# the maximum number of qubits of the backend contract
+MAX_QUBITS = 8
+# the gates of the backend contract
+GATES_NAMES = [
+    "H", "I", "CN", "CCN", "X", "Y", "Z", "P", "p",
+    "T", "t", "CP", "Cp", "CT", "Ct", "m"
+]
+# amplitudes above this bound could overflow int64 in one gate, the
+# largest growth of a gate is the T rescaling (2 * 10)
+INT64_SAFE_BOUND = 2**58
+# the bounds of the solidity checked arithmetic
+INT256_BOUND = 2**255
+UINT256_BOUND = 2**256
+# the number of shots evolved together when the circuit
+# has mid-circuit measurements
+SHOTS_CHUNK = 4096
+
+
+def get_random_hashes(
+    random_seeds: list[int],
+    block_number: int,
+    block_timestamp: int
+) -> list[int]:
+    r"""
+    Compute the random hash of getRandom in the backend contract,
+    keccak256(abi.encode(block.number, block.timestamp, randomSeed)).
+    The contract reduces the same hash modulo the range for every
+    measurement of a shot.
+
+    Args:
+        random_seeds: The random seeds of the shots.
+        block_number: The number of the block the shots run in.
+        block_timestamp: The timestamp of the block the shots run in.
+
+    Returns:
+        The random hash of every shot.
+    """
+    block_prefix = (
+        int(block_number).to_bytes(32, 'big') +
+        int(block_timestamp).to_bytes(32, 'big')
+    )
+    return [
+        int.from_bytes(
+            keccak(block_prefix + int(random_seed).to_bytes(32, 'big')),
+            'big'
+        )
+        for random_seed in random_seeds
+    ]
+
+
+def parse_qscript(num_qubits: int, script: str) -> list[str]:
+    r"""
+    Split a QuiC script in layers exactly like runQScript does.
+
+    Args:
+        num_qubits: The number of qubits of the script.
+        script: The QuiC script.
+
+    Returns:
+        The layers of the script.
+
+    Raises:
+        ValueError: If the contract would revert.
+    """
+    if num_qubits > MAX_QUBITS:
+        raise ValueError("Check subscription")
+    if num_qubits == 0:
+        raise ValueError("The script needs at least one qubit")
+    layers = list()
+    index = 0
+    while True:
+        if index + num_qubits > len(script):
+            # the contract reads the delimiter even if it is missing
+            if index >= len(script):
+                raise ValueError("Unexpected end of the script")
+            break
+        layers.append(script[index:index + num_qubits])
+        index += num_qubits
+        if index >= len(script) or script[index] == '.':
+            break
+        index += 1
+    return layers
+
+
+class QScriptEmulator:
+    r"""
+    A vectorized emulator of the integer amplitudes engine of the
+    backend contract. The state of every shot is a row of two
+    (shots, 2^n) arrays, the real and the imaginary amplitudes.
+    The arrays are int64 while the amplitudes are small and Python
+    integers (object arrays) afterwards, so the results are the same
+    as the int256 arithmetic of the EVM.
+    """
+
+    def __init__(self, num_qubits: int, script: str):
+        r"""
+        Args:
+            num_qubits: The number of qubits of the script.
+            script: The QuiC script.
+        """
+        self.num_qubits = num_qubits
+        self.script = script
+        self.layers = parse_qscript(num_qubits, script)
+        self.indexes = np.arange(2**num_qubits)
+        self.has_measurements = any('m' in layer for layer in self.layers)
+
+    def _initial_state(self, shots: int) -> tuple[np.ndarray, np.ndarray]:
+        real = np.zeros((shots, 2**self.num_qubits), dtype=np.int64)
+        imaginary = np.zeros((shots, 2**self.num_qubits), dtype=np.int64)
+        # start with all qubits = 0
+        real[:, 0] = 1
+        return real, imaginary
+
+    @staticmethod
+    def _check_bounds(
+        real: np.ndarray,
+        imaginary: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        r"""
+        Promote the amplitudes to Python integers before they can
+        overflow int64 and raise if they overflow int256.
+        """
+        largest = max(np.abs(real).max(), np.abs(imaginary).max())
+        if real.dtype != object and largest >= INT64_SAFE_BOUND:
+            return real.astype(object), imaginary.astype(object)
+        if largest >= INT256_BOUND:
+            raise OverflowError("The amplitudes overflow int256")
+        return real, imaginary
+
+    def _control_mask(self, layer: str) -> int:
+        control_mask = 0
+        for column, gate in enumerate(layer):
+            if gate == 'C':
+                control_mask |= 1 << (self.num_qubits - 1 - column)
+        return control_mask
+
+    def _apply_column(
+        self,
+        layer: str,
+        column: int,
+        real: np.ndarray,
+        imaginary: np.ndarray,
+        random_hashes: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        r"""
+        Apply the gate of one column of a layer, like one iteration
+        of the loop in qc_exec.
+        """
+        gate = layer[column]
+        mask = 1 << (self.num_qubits - 1 - column)
+        bit = (self.indexes & mask) != 0
+        partner = self.indexes ^ mask
+        # the control mask is the same for every column of a layer
+        control_mask = self._control_mask(layer)
+        control = (self.indexes & control_mask) == control_mask
+        if gate == 'H':
+            # the imaginary part is added on both branches in qc_H
+            partner_real = real[:, partner]
+            return (
+                np.where(bit, partner_real - real, real + partner_real),
+                imaginary + imaginary[:, partner]
+            )
+        if gate == 'I' or gate == 'C':
+            return real, imaginary
+        if gate == 'X':
+            return real[:, partner], imaginary[:, partner]
+        if gate == 'Y':
+            partner_real = real[:, partner]
+            partner_imaginary = imaginary[:, partner]
+            return (
+                np.where(bit, -partner_imaginary, partner_imaginary),
+                np.where(bit, partner_real, -partner_real)
+            )
+        if gate == 'Z':
+            return np.where(bit, -real, real), np.where(bit, -imaginary, imaginary)
+        if gate == 'N':
+            # qc_CN is the identity without control qubits
+            if control_mask == 0:
+                return real, imaginary
+            return (
+                np.where(control, real[:, partner], real),
+                np.where(control, imaginary[:, partner], imaginary)
+            )
+        if gate == 'P' or gate == 'p':
+            sign = 1 if gate == 'P' else -1
+            phase = control & bit
+            return (
+                np.where(phase, -sign * imaginary, real),
+                np.where(phase, sign * real, imaginary)
+            )
+        if gate == 'T' or gate == 't':
+            phase = control & bit
+            if gate == 'T':
+                new_real = np.where(phase, real - imaginary, real)
+                new_imaginary = np.where(phase, real + imaginary, imaginary)
+            else:
+                new_real = np.where(phase, real + imaginary, real)
+                new_imaginary = np.where(phase, imaginary - real, imaginary)
+            # the phase is only marked for the non zero amplitudes and
+            # the rescaling of 10/7 is done only if any phase was marked
+            phase_done = phase & ((real != 0) | (imaginary != 0))
+            rescaled = phase_done.any(axis=1, keepdims=True)
+            scale = np.where(
+                rescaled,
+                np.where(phase_done, 7, 10),
+                1
+            )
+            return new_real * scale, new_imaginary * scale
+        if gate == 'm':
+            weights = np.abs(real) + np.abs(imaginary)
+            outcomes = self._sample(weights, random_hashes)
+            keep = ((outcomes[:, None] & mask) != 0) == bit[None, :]
+            return (
+                np.where(keep, real, 0).astype(real.dtype),
+                np.where(keep, imaginary, 0).astype(imaginary.dtype)
+            )
+        raise ValueError("Unknown or unsupported gate")
+
+    @staticmethod
+    def _sample(weights: np.ndarray, random_hashes: np.ndarray) -> np.ndarray:
+        r"""
+        Draw one basis state for every hash like the contract, the first
+        state where the cumulative weight reaches hash % total + 1.
+        The weights have one row for every hash or one row shared by
+        all the hashes.
+        """
+        cumulative = np.cumsum(weights.astype(object), axis=1)
+        totals = cumulative[:, -1]
+        if any(total == 0 for total in totals):
+            raise ZeroDivisionError("The state has no amplitudes")
+        if any(total >= UINT256_BOUND for total in totals):
+            raise OverflowError("The weights overflow uint256")
+        if len(totals) == 1:
+            totals = np.repeat(totals, len(random_hashes))
+        draws = np.array(
+            [
+                int(random_hash) % int(total) + 1
+                for random_hash, total in zip(random_hashes, totals)
+            ],
+            dtype=object
+        )
+        if len(cumulative) == 1:
+            return np.searchsorted(
+                cumulative[0], draws, side='left'
+            ).astype(np.int64)
+        return (cumulative < draws[:, None]).sum(axis=1).astype(np.int64)
+
+    def evolve(
+        self,
+        random_hashes: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        r"""
+        Run all the layers of the script, like qc_evolve.
+
+        Args:
+            random_hashes: The random hash of every shot, one row
+                of the state is evolved for every hash.
+
+        Returns:
+            The real and imaginary amplitudes of every shot.
+        """
+        real, imaginary = self._initial_state(len(random_hashes))
+        for layer in self.layers:
+            for column in range(self.num_qubits):
+                real, imaginary = self._apply_column(
+                    layer, column, real, imaginary, random_hashes
+                )
+                real, imaginary = self._check_bounds(real, imaginary)
+        return real, imaginary
+
+    def get_statevector(
+        self,
+        random_hash: int = 0
+    ) -> tuple[list[int], list[int]]:
+        r"""
+        Get the final amplitudes of the script, like getStatevector.
+
+        Args:
+            random_hash: The random hash used by mid-circuit measurements.
+
+        Returns:
+            The real and imaginary amplitudes.
+        """
+        real, imaginary = self.evolve(np.array([random_hash], dtype=object))
+        return (
+            [int(value) for value in real[0]],
+            [int(value) for value in imaginary[0]]
+        )
+
+    def run(self, random_hashes: list[int]) -> np.ndarray:
+        r"""
+        Run one shot for every random hash, like runQScript.
+
+        Args:
+            random_hashes: The random hash of every shot.
+
+        Returns:
+            The measurement result of every shot.
+        """
+        random_hashes = np.array(random_hashes, dtype=object)
+        if len(random_hashes) == 0:
+            return np.zeros(0, dtype=np.int64)
+        if not self.has_measurements:
+            # the final state does not depend on the seed, evolve it
+            # once and only sample it for every shot
+            real, imaginary = self.evolve(random_hashes[:1])
+            return self._sample(np.abs(real + imaginary), random_hashes)
+        outcomes = list()
+        for index in range(0, len(random_hashes), SHOTS_CHUNK):
+            chunk_hashes = random_hashes[index:index + SHOTS_CHUNK]
+            real, imaginary = self.evolve(chunk_hashes)
+            outcomes.append(
+                self._sample(np.abs(real + imaginary), chunk_hashes)
+            )
+        return np.concatenate(outcomes)
+
+
+def run_qscript(
+    num_qubits: int,
+    script: str,
+    random_seeds: list[int],
+    block_number: int = 0,
+    block_timestamp: int = 0
+) -> np.ndarray:
+    r"""
+    Emulate runQScript of the backend contract for many seeds.
+
+    Args:
+        num_qubits: The number of qubits of the script.
+        script: The QuiC script.
+        random_seeds: The random seed of every shot.
+        block_number: The number of the block the shots run in.
+        block_timestamp: The timestamp of the block the shots run in.
+
+    Returns:
+        The measurement result of every shot.
+    """
+    return QScriptEmulator(num_qubits, script).run(
+        get_random_hashes(random_seeds, block_number, block_timestamp)
+    )
+
+
+class PqceeEmulatorJob(Job):
+    r"""
+    A job that runs on the emulator of the backend contract.
+    """
+
+    def __init__(self, backend, job_json, circuits, experiments):
+        r"""
+        Args:
+            backend: The emulator backend.
+            job_json: The job json.
+            circuits: The circuits to run.
+            experiments: The QuiC string and the number of qubits of
+                every circuit.
+        """
+        super().__init__(backend, str(uuid.uuid4()))
+        self._backend = backend
+        self.job_json = job_json
+        self.circuits = circuits
+        self.experiments = experiments
+        self.job_status = JobStatus.INITIALIZING
+        self.experiments_counts = [dict() for _ in circuits]
+
+    def submit(self):
+        self.job_status = JobStatus.RUNNING
+        for index, experiment in enumerate(self.experiments):
+            # the same seeds as the shots of the experiment in a
+            # BlockcahinJob
+            shots_seeds = _get_experiment_random_seed(
+                self.job_json['random_seed'],
+                index
+            ).randint(
+                low=0,
+                high=65535,
+                size=self.job_json['shots']
+            ).tolist()
+            shots_results = run_qscript(
+                experiment['num_qubits'],
+                experiment['circuit_str'],
+                shots_seeds,
+                self.job_json['block_number'],
+                self.job_json['block_timestamp']
+            )
+            values, counts = np.unique(shots_results, return_counts=True)
+            # reverse the bits to match the qiskit convention
+            self.experiments_counts[index] = {
+                format(int(value), 'b').zfill(
+                    experiment['num_qubits']
+                )[::-1]: int(count)
+                for value, count in zip(values, counts)
+            }
+        self.job_status = JobStatus.DONE
+
+    def result(self):
+        return Result(
+            backend_name=self._backend.name,
+            backend_version=self._backend.backend_version,
+            job_id=self._job_id,
+            qobj_id=', '.join(x.name for x in self.circuits),
+            success=self.job_status is JobStatus.DONE,
+            results=[
+                ExperimentResult(
+                    shots=self.job_json['shots'],
+                    success=self.job_status is JobStatus.DONE,
+                    data=ExperimentResultData(counts=counts),
+                    header=QobjExperimentHeader(name=circuit.name),
+                    seed=self.job_json['random_seed'],
+                )
+                for circuit, counts in zip(
+                    self.circuits,
+                    self.experiments_counts
+                )
+            ]
+        )
+
+    def status(self):
+        return self.job_status
+
+
+class PqceeEmulatorBackend(QuiCBackend):
+    r"""
+    A local backend that emulates bit by bit the backend contract,
+    for auditing on-chain results and for large shot counts.
+    """
+
+    state_seed: np.random.RandomState = None
+    r"""
+    The seed random state
+    """
+
+    def __init__(
+        self,
+        provider: Provider = None,
+        backend_seed: int = 0,
+        approximation_depth: int = 0,
+        approximation_recursion_degree: int = 0,
+    ):
+        r"""
+        Args:
+            provider: The qiskit provider of the backend.
+            backend_seed: The seed for the backend.
+            approximation_depth: The depth of the basic approximation.
+            approximation_recursion_degree: The recursion degree for the Solovay-Kitaev
+        """
+        super().__init__(
+            quic_basis_gates=GATES_NAMES,
+            num_qubits=MAX_QUBITS,
+            approximation_depth=approximation_depth,
+            approximation_recursion_degree=approximation_recursion_degree,
+            provider=provider,
+            name='pqcee_emulator',
+            description='emulator of the quantum backend on blockchain'
+        )
+        self.options.set_validator("shots", (1, 2**30))
+        # the same random seeds as a BlockchainBackend
+        self.state_seed = np.random.RandomState(
+            np.random.MT19937(
+                np.random.SeedSequence(backend_seed)
+            )
+        )
+
+    @classmethod
+    def _default_options(cls):
+        return Options(shots=10, block_number=0, block_timestamp=0)
+
+    def run(self, circuits, **kwargs):
+        for kwarg in kwargs:
+            if not hasattr(self.options, kwarg):
+                logger.warning(
+                    "Option %s is not used by this backend", kwarg
+                )
+        options = {
+            option: kwargs.get(option, getattr(self.options, option))
+            for option in ('shots', 'block_number', 'block_timestamp')
+        }
+        # make a list of circuits
+        if type(circuits) is not list:
+            circuits = [circuits]
+        # every circuit runs with the seeds of its experiment in a
+        # BlockcahinJob with the same random seed
+        experiments = list()
+        for circuit in circuits:
+            circuit_str: str = self.get_quic_circuit_string(circuit)
+            experiments.append(dict(
+                circuit_str=circuit_str,
+                num_qubits=self.get_quic_string_num_qubits(circuit_str)
+            ))
+        job_json = dict(
+            shots=options['shots'],
+            random_seed=self.state_seed.randint(low=0, high=65535),
+            block_number=options['block_number'],
+            block_timestamp=options['block_timestamp']
+        )
+        job = PqceeEmulatorJob(self, job_json, circuits, experiments)
+        job.submit()
+        return job
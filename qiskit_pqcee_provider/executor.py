@@ -0,0 +1,138 @@
+from qiskit.providers.jobstatus import JobStatus
+import logging
+import queue
+import threading
+
+from .metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+QUEUED_JOBS = get_metrics_registry().gauge(
+    "pqcee_queued_jobs",
+    "The jobs waiting for a worker."
+)
+RUNNING_JOBS = get_metrics_registry().gauge(
+    "pqcee_running_jobs",
+    "The jobs running on the workers."
+)
+
+
+class JobExecutor:
+    r"""
+    A pool of worker threads running the jobs of a backend, with a
+    bounded queue of the jobs waiting for a worker.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_queued_jobs: int = 1024,
+        idle_timeout: float = 1.0
+    ):
+        r"""
+        Args:
+            max_workers: The maximum number of jobs running at the
+                same time.
+            max_queued_jobs: The maximum number of jobs waiting for
+                a worker, submitting more jobs blocks. Zero for no bound.
+            idle_timeout: The seconds an idle worker waits for a job
+                before it stops.
+        """
+        self.max_workers = max_workers
+        self.idle_timeout = idle_timeout
+        self._queue = queue.Queue(maxsize=max_queued_jobs)
+        self._lock = threading.Lock()
+        # the number of worker threads alive
+        self._workers = 0
+        # the number of jobs running on the workers
+        self._inflight_jobs = 0
+
+    @property
+    def max_queued_jobs(self) -> int:
+        r"""
+        The maximum number of jobs waiting for a worker.
+        """
+        return self._queue.maxsize
+
+    @max_queued_jobs.setter
+    def max_queued_jobs(self, max_queued_jobs: int):
+        with self._queue.mutex:
+            self._queue.maxsize = max_queued_jobs
+
+    @property
+    def queue_depth(self) -> int:
+        r"""
+        The number of jobs waiting for a worker.
+        """
+        return self._queue.qsize()
+
+    @property
+    def inflight_jobs(self) -> int:
+        r"""
+        The number of jobs running on the workers.
+        """
+        with self._lock:
+            return self._inflight_jobs
+
+    @property
+    def workers(self) -> int:
+        r"""
+        The number of worker threads alive.
+        """
+        with self._lock:
+            return self._workers
+
+    def submit(self, job):
+        r"""
+        Queue a job to run on the workers, blocking while the queue is
+        full so a sweep of many jobs does not flood the endpoint.
+
+        Args:
+            job: The job to run, its submit method runs on a worker.
+        """
+        job.job_status = JobStatus.QUEUED
+        QUEUED_JOBS.inc()
+        self._queue.put(job)
+        with self._lock:
+            if self._workers < self.max_workers:
+                self._workers += 1
+                threading.Thread(
+                    target=self._work,
+                    name="pqcee-job-worker"
+                ).start()
+
+    def _work(self):
+        while True:
+            try:
+                job = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                with self._lock:
+                    # a job can be queued after the timeout
+                    if self._queue.empty():
+                        self._workers -= 1
+                        return
+                continue
+            with self._lock:
+                self._inflight_jobs += 1
+            QUEUED_JOBS.dec()
+            RUNNING_JOBS.inc()
+            try:
+                job.submit()
+            except Exception:
+                logger.exception("Job worker failed")
+            finally:
+                RUNNING_JOBS.dec()
+                self._queue.task_done()
+                with self._lock:
+                    self._inflight_jobs -= 1
+            with self._lock:
+                # the workers above the maximum stop after their job
+                if self._workers > self.max_workers:
+                    self._workers -= 1
+                    return
+
+    def join(self):
+        r"""
+        Wait until all the queued jobs are done.
+        """
+        self._queue.join()
@@ -4,128 +4,1742 @@ from qiskit.providers import JobTimeoutError
 from qiskit.providers.jobstatus import JobStatus
 from qiskit.result import Result
 from qiskit.result.models import ExperimentResult, ExperimentResultData
+from qiskit.qobj import QobjExperimentHeader
+from web3.exceptions import ContractLogicError
+from web3.exceptions import Web3Exception
+from hexbytes import HexBytes
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+import functools
+import math
+import logging
 import time
+import uuid
 
 import numpy as np
+import requests
 import threading
 
+from .rpc import RPCError
+from .rpc import call_with_retries
+from .rpc import get_endpoint_uri
+from .rpc import get_endpoint_uris
+from .rpc import make_batch_request
+from .rpc import make_request
+from .rpc import rate_limit
+from .cache import ShotCache
+from .cache import get_shot_cache
+from .checkpoint import get_checkpoint_store
+from .metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+RPC_REQUESTS = get_metrics_registry().counter(
+    "pqcee_rpc_requests_total",
+    "The requests sent to the endpoints by the jobs."
+)
+RPC_LATENCY = get_metrics_registry().histogram(
+    "pqcee_rpc_latency_seconds",
+    "The latency of the requests sent to the endpoints by the jobs."
+)
+REVERTS = get_metrics_registry().counter(
+    "pqcee_reverts_total",
+    "The calls of the backend contracts that reverted."
+)
+SHOTS = get_metrics_registry().counter(
+    "pqcee_shots_total",
+    "The shots done by the jobs."
+)
+SHOT_DURATION = get_metrics_registry().histogram(
+    "pqcee_shot_duration_seconds",
+    "The mean seconds of a shot of every round of shots."
+)
+INFLIGHT_SHOTS = get_metrics_registry().gauge(
+    "pqcee_inflight_shots",
+    "The shots running on the backend contracts."
+)
+
+# the gas given to every call of the backend contract
+CALL_GAS = 900000000
+# the maximum number of shots in one batched call
+MAX_SHOTS_PER_CALL = 4096
+# the maximum number of qubits of the circuits with a lookup table
+# of the bitstrings and an array of the counts of all the outcomes
+MAX_TABLE_QUBITS = 16
+# the entry points of the backend contract running the circuit bytecode
+BYTECODE_FUNCTIONS = (
+    'runQBytecode',
+    'runQBytecodeShots',
+    'runQBytecodeSample'
+)
+# the entry points of the backend contract running a registered circuit
+BY_ID_FUNCTIONS = ('runById', 'runByIdShots', 'runByIdSample')
+
 
 class BlockcahinJob(Job):
     r"""
     A job that runs on the blockchain.
     """
-    def __init__(self, backend, job_handle, job_json, circuits):
+    def __init__(self, backend, job_handle, job_json, circuits, job_id=None):
         r"""
         Args:
             backend: The backend the job is running on.
             job_handle: The handle for the job.
             job_json: The job json.
             circuits: The circuits to run.
+            job_id: The id of the job, set when a checkpointed job
+                is resumed.
         """
-        # create the job id as the concatenation of the address of the
-        # contract and the random seed
-        job_id = (
-            str(job_handle.address) +
-            "_" +
-            str(job_json['random_seed']) +
-            "_" +
-            str(job_json['shots'])
-        )
+        if job_id is None:
+            # create the job id as the concatenation of the address of
+            # the contract, the random seed and the shots, with a random
+            # suffix because the seeds repeat in every process and the
+            # checkpoints of the jobs are stored by id
+            job_id = (
+                str(job_handle.address) +
+                "_" +
+                str(job_json['random_seed']) +
+                "_" +
+                str(job_json['shots']) +
+                "_" +
+                uuid.uuid4().hex[:8]
+            )
         super().__init__(backend, job_id)
         self._backend = backend
         self.job_json = job_json
         self.job_handle = job_handle
         self.circuits = circuits
         self.job_status = JobStatus.INITIALIZING
-        # the results of the experiment in order of the shots
-        self.experiment_results = list()
-        # the result counts of the experiemnt
-        self.experiment_counts = dict()
-        # start the job on a different thread
-        threading.Thread(target=self.submit).start()
+        # the encoding of every circuit, set when it is transpiled
+        self.experiments = [None] * len(circuits)
+        # the outcomes of every experiment in order of the shots, in
+        # an array allocated when the first shots are done
+        self.experiment_outcomes = [None] * len(circuits)
+        # the number of shots done of every experiment
+        self.experiment_shots = [0] * len(circuits)
+        # the count of every outcome of every experiment, for the
+        # circuits with at most MAX_TABLE_QUBITS qubits
+        self._outcomes_counts = [None] * len(circuits)
+        # the metadata of every experiment
+        self.experiments_metadata = [dict() for _ in circuits]
+        # the hash of the block the shots run on, if it is pinned
+        self.block_hash = None
+        # the metadata of the result
+        self.metadata = dict()
+        # set when the job is done or failed
+        self._done_event = threading.Event()
+        # notified when new shots are done
+        self._results_condition = threading.Condition()
+        # the number of shots in a call, by circuit and entry point
+        self._shots_per_call = dict()
+        # the error raised while running the job
+        self._error = None
+        # the time the job was created, the job is queued until it runs
+        self._created_at = time.perf_counter()
+        # the seconds spent in every step of the job
+        self._timings = dict()
+        # the seconds spent by the encodings of every circuit
+        self._encoding_timings = list()
+        # the latency of every request sent to the endpoint
+        self._rpc_latencies = list()
+        self._timings_lock = threading.Lock()
+        # the estimated gas of a call with one and with two shots, by
+        # circuit and entry point
+        self._estimated_gas = dict()
+        # the store of the outcomes of the shots done, if checkpointed
+        self._checkpoint_store = None
+        if job_json.get('checkpoint_dir') is not None:
+            self._checkpoint_store = get_checkpoint_store(
+                job_json['checkpoint_dir']
+            )
+        # the outcomes of the shots done before the job was resumed
+        self._resumed_outcomes = dict()
+        # the experiments done before the job was resumed, with
+        # their early stop
+        self._resumed_experiments = dict()
 
     def _wait_for_result(self, timeout=None, wait=5):
-        start_time = time.time()
-        result = None
-        # verify is the timeout is met or the job is done
-        while True:
-            elapsed = time.time() - start_time
-            if timeout and elapsed >= timeout:
-                raise JobTimeoutError('Timed out waiting for result')
-            result = self.status()
-            if result is JobStatus.DONE:
-                break
-            if result is JobStatus.ERROR:
-                raise JobError('Job error')
-            time.sleep(wait)
+        # the wait interval is kept for compatibility, the job
+        # wakes up as soon as the shots are done
+        if not self._done_event.wait(timeout):
+            raise JobTimeoutError('Timed out waiting for result')
+        result = self.status()
+        if result is JobStatus.ERROR:
+            raise JobError('Job error: %s' % self._error) from self._error
         return result
 
     def result(self, timeout=None, wait=5):
         result = self._wait_for_result(timeout, wait)
+        return self._make_result(result)
+
+    def _make_result(self, result: JobStatus) -> Result:
+        results = list()
+        for index, circuit in enumerate(self.circuits):
+            # the bitstrings of every shot are built only when the
+            # memory is requested
+            data = dict(counts=self._get_counts(index))
+            if self.job_json.get('memory'):
+                data['memory'] = self._get_memory(index)
+            results.append(ExperimentResult(
+                shots=self.experiment_shots[index],
+                success=result is JobStatus.DONE,
+                data=ExperimentResultData(**data),
+                header=QobjExperimentHeader(name=circuit.name),
+                seed=self.job_json['random_seed'],
+                metadata=self.experiments_metadata[index]
+            ))
         return Result(
             backend_name=self._backend.name,
             backend_version=self._backend.backend_version,
             job_id=self._job_id,
             qobj_id=', '.join(x.name for x in self.circuits),
             success=result is JobStatus.DONE,
-            results=[
-                ExperimentResult(
-                    shots=self.job_json['shots'],
-                    success=result is JobStatus.DONE,
-                    data=ExperimentResultData(
-                        # memory=self.experiment_results
-                        counts=self.experiment_counts
-                    ),
-                    seed=self.job_json['random_seed'],
-                )
+            results=results,
+            metadata=self.metadata
+        )
+
+    @property
+    def experiment_results(self) -> list[list[str]]:
+        r"""
+        The measurement results of the shots of every experiment in
+        order of the shots, built from the outcomes on every access.
+        """
+        with self._results_condition:
+            return [
+                self._get_memory(index) for index in range(len(self.circuits))
             ]
+
+    @property
+    def experiment_counts(self) -> list[dict[str, int]]:
+        r"""
+        The result counts of every experiment, built from the outcomes
+        on every access.
+        """
+        with self._results_condition:
+            return [
+                self._get_counts(index) for index in range(len(self.circuits))
+            ]
+
+    def _format_outcomes(
+        self,
+        index: int,
+        outcomes: np.ndarray
+    ) -> list[str]:
+        r"""
+        Convert the outcomes of shots of an experiment to bitstrings.
+
+        Args:
+            index: The index of the circuit in the job.
+            outcomes: The outcomes of the shots.
+
+        Returns:
+            The measurement results of the shots.
+        """
+        if len(outcomes) == 0:
+            return []
+        experiment = self.experiments[index]
+        num_qubits = experiment['num_qubits']
+        # the outcomes of the compacted qubits are mapped back to the
+        # qubits of the circuit, the idle qubits are always 0
+        qubits = experiment.get('qubits')
+        circuit_num_qubits = experiment.get('circuit_num_qubits', num_qubits)
+        if num_qubits <= MAX_TABLE_QUBITS:
+            return _get_bitstrings(
+                num_qubits,
+                qubits,
+                circuit_num_qubits
+            )[outcomes].tolist()
+        return [
+            _format_outcome(outcome, num_qubits, qubits, circuit_num_qubits)
+            for outcome in outcomes
+        ]
+
+    def _get_memory(self, index: int) -> list[str]:
+        r"""
+        Get the measurement results of the shots of an experiment.
+
+        Args:
+            index: The index of the circuit in the job.
+
+        Returns:
+            The measurement results of the shots in order.
+        """
+        if self.experiment_shots[index] == 0:
+            return []
+        return self._format_outcomes(
+            index,
+            self.experiment_outcomes[index][:self.experiment_shots[index]]
         )
 
+    def _get_counts(self, index: int) -> dict[str, int]:
+        r"""
+        Get the result counts of an experiment.
+
+        Args:
+            index: The index of the circuit in the job.
+
+        Returns:
+            The count of every measurement result.
+        """
+        if self.experiment_shots[index] == 0:
+            return dict()
+        if self._outcomes_counts[index] is not None:
+            outcomes = np.flatnonzero(self._outcomes_counts[index])
+            counts = self._outcomes_counts[index][outcomes]
+        else:
+            outcomes, counts = np.unique(
+                self.experiment_outcomes[index][
+                    :self.experiment_shots[index]
+                ],
+                return_counts=True
+            )
+        return dict(zip(
+            self._format_outcomes(index, outcomes),
+            counts.tolist()
+        ))
+
     def status(self):
         return self.job_status
 
-    def submit(self):
-        experiment_results = list()
-        experiment_counts = dict()
-        # get a random generator from the random seed given
-        # the random generator will generate seed for our
-        # function
-        random_seed = np.random.RandomState(
-            np.random.MT19937(
-                np.random.SeedSequence(self.job_json['random_seed'])
+    def partial_counts(self, experiment: int = 0) -> dict[str, int]:
+        r"""
+        Get the counts of the shots done so far, while the job runs.
+
+        Args:
+            experiment: The index of the circuit in the job.
+
+        Returns:
+            A snapshot of the counts of the experiment.
+        """
+        with self._results_condition:
+            return self._get_counts(experiment)
+
+    def iter_shots(self, timeout=None, experiment: int = 0):
+        r"""
+        Iterate over the measurement results of the shots as they
+        are done, in order of the shots.
+
+        Args:
+            timeout: The seconds to wait for the next shots.
+            experiment: The index of the circuit in the job.
+
+        Yields:
+            The measurement result of every shot.
+
+        Raises:
+            JobTimeoutError: If no shot is done before the timeout.
+            JobError: If the job fails.
+        """
+        index = 0
+        while True:
+            with self._results_condition:
+                while (index >= self.experiment_shots[experiment] and
+                        not self._done_event.is_set()):
+                    if not self._results_condition.wait(timeout):
+                        raise JobTimeoutError('Timed out waiting for shots')
+                shots = self.experiment_shots[experiment]
+                outcomes = np.array([], dtype=np.uint16)
+                if shots > index:
+                    # the array is copied, it is reallocated if it grows
+                    outcomes = self.experiment_outcomes[experiment][
+                        index:shots
+                    ].copy()
+                done = self._done_event.is_set()
+            index += len(outcomes)
+            yield from self._format_outcomes(experiment, outcomes)
+            if done:
+                break
+        if self.status() is JobStatus.ERROR:
+            raise JobError('Job error: %s' % self._error) from self._error
+
+    def _encode_calls(
+        self,
+        function_name: str,
+        arguments_list: list[tuple]
+    ) -> list[bytes]:
+        r"""
+        ABI encode the calldata of every call of a function.
+
+        When the last argument is the uint256 seed, the calldata is
+        encoded only once and every call only patches the seed word,
+        because all the other arguments are the same for every shot.
+
+        Args:
+            function_name: The name of the function.
+            arguments_list: The arguments of every call.
+
+        Returns:
+            The calldata of every call.
+        """
+        if len(arguments_list) == 0:
+            return []
+        contract_function = self.job_handle.get_function_by_name(
+            function_name
+        )
+        inputs = contract_function.abi['inputs']
+        first_arguments = arguments_list[0]
+        if (inputs[-1]['type'] != 'uint256' or
+                any(
+                    arguments[:-1] != first_arguments[:-1]
+                    for arguments in arguments_list
+                )):
+            return [
+                bytes(HexBytes(self.job_handle.encodeABI(
+                    fn_name=function_name,
+                    args=list(arguments)
+                )))
+                for arguments in arguments_list
+            ]
+        calldata = bytearray(HexBytes(self.job_handle.encodeABI(
+            fn_name=function_name,
+            args=list(first_arguments)
+        )))
+        # every argument has one word in the head of the encoding,
+        # the seed is the last one after the 4 bytes selector
+        seed_offset = 4 + 32 * (len(inputs) - 1)
+        calldatas = list()
+        for arguments in arguments_list:
+            calldata[seed_offset:seed_offset + 32] = int(
+                arguments[-1]
+            ).to_bytes(32, 'big')
+            calldatas.append(bytes(calldata))
+        return calldatas
+
+    def _add_time(self, name: str, seconds: float):
+        r"""
+        Add the seconds spent in a step of the job.
+
+        Args:
+            name: The name of the step.
+            seconds: The seconds spent.
+        """
+        with self._timings_lock:
+            self._timings[name] = self._timings.get(name, 0.0) + seconds
+
+    def _time_request(self, request: Callable[[], Any]) -> Any:
+        r"""
+        Send a request to the endpoint and record its latency.
+
+        Args:
+            request: The function sending the request.
+
+        Returns:
+            The result of the function.
+        """
+        start = time.perf_counter()
+        try:
+            result = request()
+        except Exception as error:
+            self._record_request(time.perf_counter() - start, error)
+            raise
+        self._record_request(time.perf_counter() - start)
+        return result
+
+    def _record_request(self, latency: float, error: Exception = None):
+        r"""
+        Record the latency of a request in the timing of the job and in
+        the metrics of the process.
+
+        Args:
+            latency: The seconds of the request.
+            error: The error raised by the request, if any.
+        """
+        with self._timings_lock:
+            self._rpc_latencies.append(latency)
+        RPC_REQUESTS.inc(backend=self._backend.name)
+        RPC_LATENCY.observe(latency, backend=self._backend.name)
+        if error is not None and _is_revert(error):
+            REVERTS.inc(backend=self._backend.name)
+
+    def _set_timing_metadata(self):
+        r"""
+        Add the seconds spent in every step of the job and the latency
+        percentiles of the requests to the metadata of the result, and
+        log them.
+        """
+        with self._timings_lock:
+            timing = dict(self._timings)
+            latencies = np.array(self._rpc_latencies)
+        for encoding_timings in self._encoding_timings:
+            for name, seconds in encoding_timings.items():
+                timing[name] = timing.get(name, 0.0) + seconds
+        timing['total'] = time.perf_counter() - self._created_at
+        timing['rpc_requests'] = len(latencies)
+        if len(latencies) > 0:
+            timing['rpc_latency_p50'] = float(np.percentile(latencies, 50))
+            timing['rpc_latency_p95'] = float(np.percentile(latencies, 95))
+            timing['rpc_latency_max'] = float(latencies.max())
+        self.metadata['timing'] = timing
+        logger.info(
+            "Job %s timing: %s",
+            self._job_id,
+            ", ".join("%s %.4g" % item for item in timing.items())
+        )
+
+    def _set_estimated_gas(
+        self,
+        experiment: dict,
+        function_name: str,
+        group: list[int]
+    ):
+        r"""
+        Add the estimated gas of the circuit of a group of experiments
+        to their metadata, if it was estimated.
+
+        Args:
+            experiment: The encoded circuit of the group.
+            function_name: The name of the entry point.
+            group: The indexes of the circuits of the group.
+        """
+        estimated_gas = self._estimated_gas.get((
+            experiment['num_qubits'],
+            experiment['circuit_str'],
+            function_name
+        ))
+        if estimated_gas is None:
+            return
+        one_shot_gas, two_shots_gas = estimated_gas
+        logger.debug(
+            "Estimated gas of %s: %d for one shot, %d per shot",
+            function_name,
+            one_shot_gas,
+            two_shots_gas - one_shot_gas
+        )
+        for index in group:
+            self.experiments_metadata[index].update(
+                estimated_gas=one_shot_gas,
+                estimated_shot_gas=two_shots_gas - one_shot_gas
             )
+
+    def _decode_result(self, output_types: list[str], data: bytes) -> Any:
+        r"""
+        Decode the result of a call of the backend contract.
+
+        Args:
+            output_types: The ABI types of the outputs of the function.
+            data: The raw result of the call.
+
+        Returns:
+            The decoded result.
+        """
+        # the measurement result of a shot is one word
+        if output_types == ['uint256'] and len(data) == 32:
+            return int.from_bytes(data, 'big')
+        decoded = self.job_handle.w3.codec.decode(output_types, data)
+        return decoded[0] if len(decoded) == 1 else decoded
+
+    def _get_block_identifier(self, rpc_format: bool = False):
+        r"""
+        Get the block the calls of the job run on.
+
+        Args:
+            rpc_format: If the block number is formatted for a raw
+                JSON-RPC request.
+
+        Returns:
+            The block identifier.
+        """
+        block_identifier = self.job_json.get('block_identifier')
+        if block_identifier is None:
+            return 'latest'
+        if rpc_format and isinstance(block_identifier, int):
+            return hex(block_identifier)
+        return block_identifier
+
+    def _pin_block(self):
+        r"""
+        Pin all the calls of the job to the number of one block, so
+        the randomness of the contract, mixed with the number and
+        the timestamp of the block, is the same for every shot.
+        """
+        self._set_pinned_block(
+            self.job_handle.w3.eth.get_block(self._get_block_identifier())
         )
-        self.job_status = JobStatus.RUNNING
-        # run every shot
-        for shot in range(self.job_json['shots']):
-            # TODO: find a way to to run without gas
-            call_options = {'gas': 900000000}
-            # run the circuit with the contract implementation
-            # of the simulator. The parameters are the number
-            # of qubits, the circuit as a string and the random
-            # seed
-            shot_result = self.job_handle.functions.runQScript(
-                self.job_json['num_qubits'],
-                self.job_json['circuit_str'],
-                random_seed.randint(low=0, high=65535)
-            ).call(call_options)
-            # The result is an unsigned integer that represents
-            # the measurement result of the circuit. We need to
-            # convert it to binary and then pad it with zeros
-            # to the number of qubits. Also revers the order of
-            # the bits to match the qiskit convention
-            shot_result = format(shot_result, 'b').zfill(
-                self.job_json['num_qubits']
-            )[::-1]
-            # append the result to the experiment results
-            experiment_results.append(shot_result)
-            # add the result to the experiment counts
-            if shot_result in experiment_counts:
-                experiment_counts[shot_result] += 1
+
+    def _set_pinned_block(self, block: dict):
+        r"""
+        Set the block the calls of the job are pinned to.
+
+        Args:
+            block: The block.
+        """
+        self.job_json['block_identifier'] = block['number']
+        self.block_hash = bytes(block['hash'])
+        self.metadata.update(
+            block_number=block['number'],
+            block_hash='0x' + self.block_hash.hex()
+        )
+        logger.debug("Running the shots on block %d", block['number'])
+
+    def _call_with_retries(self, call: Callable[[], Any]) -> Any:
+        r"""
+        Send requests again after their transient errors, with the
+        retry options of the job.
+
+        Args:
+            call: The function sending the requests.
+
+        Returns:
+            The result of the function.
+        """
+        return call_with_retries(
+            call,
+            max_retries=self.job_json.get('max_retries', 3),
+            backoff=self.job_json.get('retry_backoff', 0.5),
+            max_backoff=self.job_json.get('max_retry_backoff', 30.0)
+        )
+
+    def _eth_call(self, calldata: bytes) -> bytes:
+        r"""
+        Send one raw eth_call to the backend contract, again after
+        transient errors. The calldata keeps the seeds of the shots.
+
+        Args:
+            calldata: The ABI encoded calldata.
+
+        Returns:
+            The raw result of the call.
+        """
+        return self._call_with_retries(
+            lambda: self._time_request(lambda: self._send_eth_call(calldata))
+        )
+
+    def _send_eth_call(self, calldata: bytes) -> bytes:
+        # TODO: find a way to to run without gas
+        if get_endpoint_uri(self.job_handle.w3) is not None:
+            # skip the middlewares of web3 on HTTP endpoints
+            return bytes(HexBytes(make_request(
+                self.job_handle.w3,
+                'eth_call',
+                [
+                    {
+                        'to': self.job_handle.address,
+                        'data': '0x' + calldata.hex(),
+                        'gas': hex(CALL_GAS)
+                    },
+                    self._get_block_identifier(rpc_format=True)
+                ]
+            )))
+        return bytes(self.job_handle.w3.eth.call(
+            {
+                'to': self.job_handle.address,
+                'data': '0x' + calldata.hex(),
+                'gas': CALL_GAS
+            },
+            self._get_block_identifier()
+        ))
+
+    def _call_batch(self, calldatas: list[bytes]) -> list[bytes]:
+        r"""
+        Send many eth_calls to the backend contract in one JSON-RPC
+        batch request.
+
+        Args:
+            calldatas: The calldata of every call.
+
+        Returns:
+            The raw results of the calls in order.
+        """
+        block_identifier = self._get_block_identifier(rpc_format=True)
+        rpc_requests = [
+            (
+                'eth_call',
+                [
+                    {
+                        'to': self.job_handle.address,
+                        'data': '0x' + calldata.hex(),
+                        'gas': hex(CALL_GAS)
+                    },
+                    block_identifier
+                ]
+            )
+            for calldata in calldatas
+        ]
+        try:
+            responses = self._call_with_retries(
+                lambda: self._time_request(
+                    lambda: make_batch_request(
+                        self.job_handle.w3,
+                        rpc_requests
+                    )
+                )
+            )
+        except (RPCError, requests.RequestException) as error:
+            logger.warning(
+                "Batch request failed, sending the calls one by one: %s",
+                error
+            )
+            responses = [RPCError(error)] * len(calldatas)
+        results = list()
+        for calldata, response in zip(calldatas, responses):
+            if isinstance(response, RPCError):
+                # a failed call is sent again alone, to raise the
+                # error of the contract or to recover from a
+                # transient failure of the endpoint
+                results.append(self._eth_call(calldata))
             else:
-                experiment_counts[shot_result] = 1
-        self.experiment_counts = experiment_counts
-        self.experiment_results = experiment_results
+                results.append(bytes(HexBytes(response)))
+        return results
+
+    def _call_contract(
+        self,
+        function_name: str,
+        arguments_list: list[tuple]
+    ) -> list[Any]:
+        r"""
+        Call a view function of the backend contract once for every
+        arguments, in JSON-RPC batches when the endpoint is HTTP and
+        rpc_batch_size is set.
+
+        Args:
+            function_name: The name of the function.
+            arguments_list: The arguments of every call.
+
+        Returns:
+            The decoded results of the calls in order.
+        """
+        output_types = [
+            output['type']
+            for output in self.job_handle.get_function_by_name(
+                function_name
+            ).abi['outputs']
+        ]
+        calldatas = self._encode_calls(function_name, arguments_list)
+        rpc_batch_size = self.job_json.get('rpc_batch_size')
+        if (rpc_batch_size and
+                get_endpoint_uri(self.job_handle.w3) is not None):
+            batches_results = self._dispatch_calls(
+                self._call_batch,
+                [
+                    calldatas[index:index + rpc_batch_size]
+                    for index in range(0, len(calldatas), rpc_batch_size)
+                ]
+            )
+            results = [
+                result
+                for batch_results in batches_results
+                for result in batch_results
+            ]
+        else:
+            results = self._dispatch_calls(self._eth_call, calldatas)
+        start = time.perf_counter()
+        decoded_results = [
+            self._decode_result(output_types, result) for result in results
+        ]
+        self._add_time('decode', time.perf_counter() - start)
+        return decoded_results
+
+    def _dispatch_calls(
+        self,
+        call: Callable[[Any], Any],
+        arguments: list[Any]
+    ) -> list[Any]:
+        r"""
+        Run the calls of the job with at most max_inflight_calls calls
+        in flight at the same time.
+
+        Args:
+            call: The call of the backend contract.
+            arguments: The argument of every call.
+
+        Returns:
+            The results of the calls in the order of the arguments.
+        """
+        max_inflight_calls = max(
+            1,
+            int(self.job_json.get('max_inflight_calls', 1))
+        )
+        if max_inflight_calls == 1 or len(arguments) <= 1:
+            return [call(argument) for argument in arguments]
+        # the results are collected in the order of the arguments,
+        # not in the order the calls complete
+        with ThreadPoolExecutor(
+            max_workers=min(max_inflight_calls, len(arguments))
+        ) as executor:
+            return list(executor.map(call, arguments))
+
+    def _get_shots_per_call(
+        self,
+        experiment: dict,
+        function_name: str,
+        shot_seed: int
+    ) -> int:
+        r"""
+        Get the number of shots that fit in one call of a batched
+        entry point of the backend contract.
+
+        Args:
+            experiment: The encoded circuit.
+            function_name: The name of the batched entry point.
+            shot_seed: The random seed used to estimate the gas of a shot.
+
+        Returns:
+            The number of shots in a call.
+        """
+        if self.job_json.get('max_shots_per_call') is not None:
+            return max(1, int(self.job_json['max_shots_per_call']))
+        call_key = (
+            experiment['num_qubits'],
+            experiment['circuit_str'],
+            function_name
+        )
+        if call_key in self._shots_per_call:
+            return self._shots_per_call[call_key]
+        # estimate the gas of a call with one and with two shots
+        contract_function = self.job_handle.get_function_by_name(
+            function_name
+        )
+        try:
+            one_shot_gas, two_shots_gas = [
+                contract_function(
+                    *_get_circuit_arguments(experiment, function_name),
+                    [shot_seed] * shots
+                ).estimate_gas({'gas': CALL_GAS})
+                for shots in (1, 2)
+            ]
+        except (ValueError, ContractLogicError) as error:
+            logger.warning(
+                "Gas estimation failed, running one shot per call: %s",
+                error
+            )
+            self._shots_per_call[call_key] = 1
+            return 1
+        self._estimated_gas[call_key] = (one_shot_gas, two_shots_gas)
+        self._shots_per_call[call_key] = _get_shots_per_gas(
+            one_shot_gas,
+            two_shots_gas
+        )
+        return self._shots_per_call[call_key]
+
+    def _run_batched_shots(
+        self,
+        experiment: dict,
+        function_name: str,
+        shots_seeds: list[int]
+    ) -> list[int]:
+        r"""
+        Run the shots in gas bounded chunks with a batched entry point
+        of the backend contract.
+
+        Args:
+            experiment: The encoded circuit.
+            function_name: The name of the batched entry point.
+            shots_seeds: The random seeds of the shots.
+
+        Returns:
+            The measurement results of the shots in order.
+        """
+        if len(shots_seeds) == 0:
+            return []
+        shots_per_call = self._get_shots_per_call(
+            experiment,
+            function_name,
+            shots_seeds[0]
+        )
+        # split the shots in at least one chunk for every call in flight
+        shots_per_call = min(
+            shots_per_call,
+            math.ceil(
+                len(shots_seeds) /
+                max(1, int(self.job_json.get('max_inflight_calls', 1)))
+            )
+        )
+        logger.debug(
+            "Running %d shots per call of %s",
+            shots_per_call,
+            function_name
+        )
+        chunks_results = self._call_contract(
+            function_name,
+            [
+                (
+                    *_get_circuit_arguments(experiment, function_name),
+                    shots_seeds[index:index + shots_per_call]
+                )
+                for index in range(0, len(shots_seeds), shots_per_call)
+            ]
+        )
+        return [
+            shot_result
+            for chunk_results in chunks_results
+            for shot_result in chunk_results
+        ]
+
+    def _get_final_weights(self, experiment: dict) -> list[int]:
+        r"""
+        Get the measurement weights of the final state of the circuit
+        with one call of the backend contract.
+
+        Args:
+            experiment: The encoded circuit.
+
+        Returns:
+            The weight of every state.
+        """
+        call_options = {'gas': CALL_GAS}
+        real_state, imaginary_state = (
+            self.job_handle.functions.getStatevector(
+                experiment['num_qubits'],
+                experiment['circuit_str'],
+                0
+            ).call(call_options, self._get_block_identifier())
+        )
+        # the same weights |r + i| as the final measurement
+        # in the contract
+        weights = [
+            abs(real + imaginary)
+            for real, imaginary in zip(real_state, imaginary_state)
+        ]
+        if sum(weights) == 0:
+            raise ValueError("The final state has no amplitudes")
+        return weights
+
+    def _sample_weights(
+        self,
+        weights: list[int],
+        random_seed: np.random.RandomState
+    ) -> np.ndarray:
+        r"""
+        Sample all the shots locally from the weights of the final state
+        of the circuit.
+
+        Args:
+            weights: The weight of every state.
+            random_seed: The random generator of the experiment.
+
+        Returns:
+            The measurement results of the shots in order.
+        """
+        total = sum(weights)
+        shots = self.job_json['shots']
+        if total < 2**63:
+            # exact integer sampling, the contract takes the first
+            # state where the cumulative weight reaches the draw + 1
+            cumulative = np.cumsum(np.array(weights, dtype=np.int64))
+            draws = random_seed.randint(
+                low=0,
+                high=total,
+                size=shots,
+                dtype=np.int64
+            )
+            return np.searchsorted(cumulative, draws, side='right')
+        probabilities = np.array([weight / total for weight in weights])
+        return random_seed.choice(
+            len(weights),
+            size=shots,
+            p=probabilities / probabilities.sum()
+        )
+
+    def _select_entry_point(self, experiment: dict) -> str:
+        r"""
+        Select the best entry point of the backend contract for the
+        shots of an experiment.
+
+        Args:
+            experiment: The encoded circuit.
+
+        Returns:
+            The name of the entry point.
+        """
+        # sample the final state computed once when all the
+        # measurements are terminal, in batches if the contract
+        # has the batched entry point, otherwise one call per
+        # shot for older deployments of the contract. The bytecode
+        # entry points are preferred, their calldata is smaller
+        # and they skip the identity passes of the layers. The
+        # registered circuits only send their id
+        if experiment.get('circuit_id') is not None:
+            if (experiment['sample_final_state'] and
+                    self._backend.supports_function('runByIdSample')):
+                return 'runByIdSample'
+            return 'runByIdShots'
+        if experiment.get('circuit_code') is not None:
+            if (experiment['sample_final_state'] and
+                    self._backend.supports_function('runQBytecodeSample')):
+                return 'runQBytecodeSample'
+            if self._backend.supports_function('runQBytecodeShots'):
+                return 'runQBytecodeShots'
+        if (experiment['sample_final_state'] and
+                self._backend.supports_function('runQScriptSample')):
+            return 'runQScriptSample'
+        if self._backend.supports_function('runQScriptShots'):
+            return 'runQScriptShots'
+        return 'runQScript'
+
+    def _get_shots_per_round(
+        self,
+        experiment: dict,
+        function_name: str,
+        shot_seed: int
+    ) -> int:
+        r"""
+        Get the number of shots run between two updates of the partial
+        results, enough to keep all the calls in flight busy.
+
+        Args:
+            experiment: The encoded circuit.
+            function_name: The name of the entry point.
+            shot_seed: The random seed used to estimate the gas of a shot.
+
+        Returns:
+            The number of shots in a round.
+        """
+        if self.job_json.get('shots_per_round') is not None:
+            return max(1, int(self.job_json['shots_per_round']))
+        shots_per_round = max(
+            1,
+            int(self.job_json.get('max_inflight_calls', 1))
+        )
+        if (self.job_json.get('rpc_batch_size') and
+                get_endpoint_uri(self.job_handle.w3) is not None):
+            shots_per_round *= self.job_json['rpc_batch_size']
+        if function_name != 'runQScript':
+            shots_per_round *= self._get_shots_per_call(
+                experiment,
+                function_name,
+                shot_seed
+            )
+        return shots_per_round
+
+    def _get_random_seed(self, index: int) -> np.random.RandomState:
+        r"""
+        Get the random generator of an experiment from the random seed
+        of the job, the first experiment uses the seed of the job.
+
+        Args:
+            index: The index of the circuit in the job.
+
+        Returns:
+            The random generator of the experiment.
+        """
+        return _get_experiment_random_seed(self.job_json['random_seed'], index)
+
+    def _run_experiments(self, experiment: dict, group: list[int]):
+        r"""
+        Run the shots of a group of experiments with the same encoded
+        circuit together, in rounds, updating the partial results
+        after every round until all the shots are done or the early
+        stopping criterion is met for every experiment.
+
+        The shots of every experiment keep the seeds of its own random
+        generator, so the outcomes do not depend on the grouping.
+
+        Args:
+            experiment: The encoded circuit of the group.
+            group: The indexes of the circuits of the group.
+        """
+        # sample locally from the final state when all the
+        # measurements are terminal
+        if (self.job_json.get('execution_mode') == 'local' and
+                experiment['sample_final_state'] and
+                self._backend.supports_function('getStatevector')):
+            weights = self._get_final_weights(experiment)
+            for index in group:
+                self._add_shots_results(
+                    index,
+                    self._sample_weights(
+                        weights,
+                        self._get_random_seed(index)
+                    )
+                )
+                self._checkpoint_experiment(index)
+            return
+        # the seeds of all the shots are drawn before running
+        # them, so every shot gets the same seed no matter how
+        # the shots are grouped in calls of the contract, the
+        # shots done before the job was resumed are skipped
+        remaining_seeds = {
+            index: self._get_random_seed(index).randint(
+                low=0,
+                high=65535,
+                size=self.job_json['shots']
+            ).tolist()[self.experiment_shots[index]:]
+            for index in group
+        }
+        for index in group:
+            if len(remaining_seeds[index]) == 0:
+                del remaining_seeds[index]
+                self._checkpoint_experiment(index)
+        if len(remaining_seeds) == 0:
+            return
+        function_name = self._select_entry_point(experiment)
+        shots_per_round = self._get_shots_per_round(
+            experiment,
+            function_name,
+            next(iter(remaining_seeds.values()))[0]
+        )
+        self._set_estimated_gas(experiment, function_name, group)
+        early_stopping = self.job_json.get('early_stopping')
+        while len(remaining_seeds) > 0:
+            # fill the round with the shots of the experiments in order
+            round_parts = list()
+            round_size = 0
+            for index, shots_seeds in remaining_seeds.items():
+                part_size = min(len(shots_seeds), shots_per_round - round_size)
+                if part_size == 0:
+                    break
+                round_parts.append((index, part_size))
+                round_size += part_size
+            round_seeds = [
+                shot_seed
+                for index, part_size in round_parts
+                for shot_seed in remaining_seeds[index][:part_size]
+            ]
+            round_start = time.perf_counter()
+            INFLIGHT_SHOTS.inc(round_size, backend=self._backend.name)
+            try:
+                if self.job_json.get('cache_path') is not None:
+                    shots_results = self._run_cached_seeds(
+                        experiment,
+                        function_name,
+                        round_seeds
+                    )
+                else:
+                    shots_results = self._run_seeds(
+                        experiment,
+                        function_name,
+                        round_seeds
+                    )
+            finally:
+                INFLIGHT_SHOTS.dec(round_size, backend=self._backend.name)
+            SHOT_DURATION.observe(
+                (time.perf_counter() - round_start) / round_size,
+                backend=self._backend.name
+            )
+            offset = 0
+            for index, part_size in round_parts:
+                self._add_shots_results(
+                    index,
+                    shots_results[offset:offset + part_size]
+                )
+                offset += part_size
+                remaining_seeds[index] = remaining_seeds[index][part_size:]
+                if len(remaining_seeds[index]) == 0:
+                    del remaining_seeds[index]
+                    self._checkpoint_experiment(index)
+                elif early_stopping is not None and early_stopping(
+                    self.partial_counts(index),
+                    self.experiment_shots[index]
+                ):
+                    logger.info(
+                        "Experiment %d of job %s stopped early after "
+                        "%d shots",
+                        index,
+                        self._job_id,
+                        self.experiment_shots[index]
+                    )
+                    self.experiments_metadata[index]['early_stopped'] = True
+                    del remaining_seeds[index]
+                    self._checkpoint_experiment(index)
+
+    def _run_cached_seeds(
+        self,
+        experiment: dict,
+        function_name: str,
+        shots_seeds: list[int]
+    ) -> list[int]:
+        r"""
+        Run the shots that are not in the shot cache and add their
+        outcomes to the cache.
+
+        Args:
+            experiment: The encoded circuit.
+            function_name: The name of the entry point.
+            shots_seeds: The random seeds of the shots.
+
+        Returns:
+            The measurement results of the shots in order.
+        """
+        shot_cache = get_shot_cache(
+            self.job_json['cache_path'],
+            self.job_json.get('cache_max_entries', 1000000)
+        )
+        shots_keys = [
+            ShotCache.make_key(
+                self._backend.contract_code_hash,
+                experiment['num_qubits'],
+                experiment['circuit_str'],
+                shot_seed,
+                self.block_hash
+            )
+            for shot_seed in shots_seeds
+        ]
+        outcomes = shot_cache.get_many(shots_keys)
+        # the shots with the same seed have the same outcome,
+        # so every missing seed runs only once
+        missing_seeds = dict()
+        for shot_seed, shot_key in zip(shots_seeds, shots_keys):
+            if shot_key not in outcomes:
+                missing_seeds[shot_key] = shot_seed
+        logger.debug(
+            "%d shots found in the cache, running %d shots",
+            len(shots_seeds) - len(missing_seeds),
+            len(missing_seeds)
+        )
+        if len(missing_seeds) > 0:
+            missing_outcomes = dict(zip(
+                missing_seeds.keys(),
+                self._run_seeds(
+                    experiment,
+                    function_name,
+                    list(missing_seeds.values())
+                )
+            ))
+            shot_cache.put_many(missing_outcomes)
+            outcomes.update(missing_outcomes)
+        return [outcomes[shot_key] for shot_key in shots_keys]
+
+    def _run_seeds(
+        self,
+        experiment: dict,
+        function_name: str,
+        shots_seeds: list[int]
+    ) -> list[int]:
+        r"""
+        Run the shots on an entry point of the backend contract.
+
+        Args:
+            experiment: The encoded circuit.
+            function_name: The name of the entry point.
+            shots_seeds: The random seeds of the shots.
+
+        Returns:
+            The measurement results of the shots in order.
+        """
+        if function_name != 'runQScript':
+            return self._run_batched_shots(
+                experiment,
+                function_name,
+                shots_seeds
+            )
+        # run the circuit with the contract implementation
+        # of the simulator. The parameters are the number
+        # of qubits, the circuit as a string and the random
+        # seed
+        return self._call_contract(
+            'runQScript',
+            [
+                (
+                    experiment['num_qubits'],
+                    experiment['circuit_str'],
+                    shot_seed
+                )
+                for shot_seed in shots_seeds
+            ]
+        )
+
+    def _add_shots_results(
+        self,
+        index: int,
+        shots_results: list[int],
+        checkpoint: bool = True
+    ):
+        r"""
+        Add the measurement results of shots to the results of an
+        experiment and notify the consumers of the partial results.
+
+        Args:
+            index: The index of the circuit in the job.
+            shots_results: The measurement results of the shots.
+            checkpoint: If the results are saved to the checkpoint
+                store of the job.
+        """
+        num_qubits = self.experiments[index]['num_qubits']
+        # The result is an unsigned integer that represents
+        # the measurement result of the circuit, the bitstrings
+        # are only built when they are read
+        outcomes = np.asarray(shots_results, dtype=_get_outcome_dtype(
+            num_qubits
+        ))
+        if checkpoint and self._checkpoint_store is not None:
+            # the outcomes are saved after every round, so a crash
+            # loses at most the shots of one round
+            self._checkpoint_store.add_shots(
+                self._job_id,
+                index,
+                self.experiment_shots[index],
+                outcomes.tolist()
+            )
+        SHOTS.inc(len(outcomes), backend=self._backend.name)
+        with self._results_condition:
+            start = self.experiment_shots[index]
+            end = start + len(outcomes)
+            experiment_outcomes = self.experiment_outcomes[index]
+            if experiment_outcomes is None:
+                experiment_outcomes = np.empty(
+                    max(end, self.job_json['shots']),
+                    dtype=outcomes.dtype
+                )
+            elif end > len(experiment_outcomes):
+                experiment_outcomes = np.concatenate([
+                    experiment_outcomes,
+                    np.empty(
+                        max(end, 2 * len(experiment_outcomes)) -
+                        len(experiment_outcomes),
+                        dtype=outcomes.dtype
+                    )
+                ])
+            # append the outcomes to the experiment outcomes
+            experiment_outcomes[start:end] = outcomes
+            self.experiment_outcomes[index] = experiment_outcomes
+            self.experiment_shots[index] = end
+            # add the outcomes to the experiment counts
+            if num_qubits <= MAX_TABLE_QUBITS:
+                if self._outcomes_counts[index] is None:
+                    self._outcomes_counts[index] = np.zeros(
+                        2**num_qubits,
+                        dtype=np.int64
+                    )
+                self._outcomes_counts[index] += np.bincount(
+                    outcomes,
+                    minlength=2**num_qubits
+                )
+            self._results_condition.notify_all()
+        shots_callback = self.job_json.get('shots_callback')
+        if shots_callback is not None:
+            shots_callback(index, self._format_outcomes(index, outcomes))
+
+    def _checkpoint_experiment(self, index: int):
+        r"""
+        Mark an experiment as done in the checkpoint store of the job.
+
+        Args:
+            index: The index of the circuit in the job.
+        """
+        if self._checkpoint_store is not None:
+            self._checkpoint_store.set_experiment_done(
+                self._job_id,
+                index,
+                self.experiments_metadata[index].get('early_stopped', False)
+            )
+
+    def resume(self, outcomes: dict, done_experiments: dict):
+        r"""
+        Set the outcomes of the shots done before the job stopped, only
+        the missing shots run when the job is submitted.
+
+        Args:
+            outcomes: The outcomes of the consecutive shots done by
+                experiment.
+            done_experiments: The experiments with all their shots done,
+                with their early stop.
+        """
+        self._resumed_outcomes = dict(outcomes)
+        self._resumed_experiments = dict(done_experiments)
+
+    def _restore_experiment(self, index: int) -> bool:
+        r"""
+        Restore the results of an experiment done before the job was
+        resumed.
+
+        Args:
+            index: The index of the circuit in the job.
+
+        Returns:
+            True if all the shots of the experiment are done.
+        """
+        outcomes = self._resumed_outcomes.pop(index, [])
+        if len(outcomes) > 0:
+            self._add_shots_results(index, outcomes, checkpoint=False)
+        if index not in self._resumed_experiments:
+            return False
+        if self._resumed_experiments[index]:
+            self.experiments_metadata[index]['early_stopped'] = True
+        return True
+
+    def submit(self):
+        try:
+            # the rate limit of the job is removed when it is done
+            with rate_limit(
+                get_endpoint_uris(self.job_handle.w3),
+                self.job_json.get('max_requests_per_second')
+            ):
+                self._run()
+        except Exception as error:
+            logger.exception("Job %s failed", self._job_id)
+            self._error = error
+            self.job_status = JobStatus.ERROR
+        finally:
+            self._set_timing_metadata()
+            with self._results_condition:
+                self._done_event.set()
+                self._results_condition.notify_all()
+
+    def _get_circuits_first_indexes(self) -> list[int]:
+        r"""
+        Get the index of the first identical circuit of every circuit
+        of the job, the identical circuits are encoded once.
+
+        Returns:
+            The index of the first identical circuit of every circuit.
+        """
+        first_indexes = dict()
+        return [
+            first_indexes.setdefault(_get_circuit_key(circuit), index)
+            for index, circuit in enumerate(self.circuits)
+        ]
+
+    def _encode_circuit(
+        self,
+        circuit,
+        register_circuit: bool,
+        timings: dict
+    ) -> dict:
+        r"""
+        Transpile and encode a circuit for the backend contract and
+        register it, if the circuits are registered.
+
+        Args:
+            circuit: The quantum circuit.
+            register_circuit: If the circuit is registered to run by id.
+            timings: The dict the seconds spent in every step are
+                added to.
+
+        Returns:
+            The encoded circuit, with the id of the registered circuit.
+        """
+        experiment = self._backend.encode_circuit(
+            circuit,
+            self.job_json,
+            timings
+        )
+        if register_circuit:
+            start = time.perf_counter()
+            try:
+                experiment['circuit_id'] = self._backend.register_circuit(
+                    experiment['circuit_code']
+                )
+            except (ValueError, Web3Exception, OSError) as error:
+                # the circuit still runs with its bytecode, when the
+                # registration reverts, times out or can not be sent
+                logger.warning(
+                    "Registration of %s failed, running its bytecode: %s",
+                    circuit.name,
+                    error
+                )
+            timings['register_circuit'] = (
+                timings.get('register_circuit', 0.0) +
+                time.perf_counter() - start
+            )
+        return experiment
+
+    def _run(self):
+        self.job_status = JobStatus.RUNNING
+        self._add_time('queue', time.perf_counter() - self._created_at)
+        circuits_first_indexes = self._get_circuits_first_indexes()
+        # the block is also pinned when the shots are cached or
+        # checkpointed, the outcomes are only valid on the block
+        # they ran on
+        pin_block = (
+            self.job_json.get('block_identifier') is not None or
+            self.job_json.get('cache_path') is not None or
+            self._checkpoint_store is not None
+        )
+        # the circuits registered after the pinned block do not
+        # exist on it, so they only run by id on the latest block
+        register_circuits = (
+            self.job_json.get('register_circuits', False) and
+            not pin_block and
+            self._backend.can_register_circuits()
+        )
+        # the circuits are transpiled and encoded on another thread,
+        # while the shots of the previous circuits run on the chain
+        with ThreadPoolExecutor(max_workers=1) as encoder:
+            self._encoding_timings = [
+                dict() for _ in sorted(set(circuits_first_indexes))
+            ]
+            encodings = {
+                index: encoder.submit(
+                    self._encode_circuit,
+                    self.circuits[index],
+                    register_circuits,
+                    encoding_timings
+                )
+                for index, encoding_timings in zip(
+                    sorted(set(circuits_first_indexes)),
+                    self._encoding_timings
+                )
+            }
+            if pin_block:
+                self._pin_block()
+            if self._checkpoint_store is not None:
+                self._checkpoint_store.save_job(
+                    self._job_id,
+                    self._backend.name,
+                    self.job_handle.address,
+                    self.job_json,
+                    self.circuits
+                )
+            for index, encoding in encodings.items():
+                if self.experiments[index] is not None:
+                    continue
+                experiment = encoding.result()
+                # the next circuits already encoded to the same
+                # circuit string run with the shots of this one
+                group_first_indexes = [index] + [
+                    next_index
+                    for next_index, next_encoding in encodings.items()
+                    if (next_index > index and
+                        self.experiments[next_index] is None and
+                        next_encoding.done() and
+                        next_encoding.exception() is None and
+                        next_encoding.result() == experiment)
+                ]
+                group = [
+                    circuit_index
+                    for circuit_index, first_index in enumerate(
+                        circuits_first_indexes
+                    )
+                    if first_index in group_first_indexes
+                ]
+                for circuit_index in group:
+                    self.experiments[circuit_index] = experiment
+                # the experiments done before the job was resumed
+                # do not run again
+                group = [
+                    circuit_index
+                    for circuit_index in group
+                    if not self._restore_experiment(circuit_index)
+                ]
+                if len(group) == 0:
+                    continue
+                if len(group) > 1:
+                    logger.debug(
+                        "Running the identical circuits %s together",
+                        group
+                    )
+                self._run_experiments(experiment, group)
         # set the job status to done
         # after all the shots are done
         self.job_status = JobStatus.DONE
+
+
+def _get_circuit_arguments(experiment: dict, function_name: str) -> tuple:
+    r"""
+    Get the arguments of an entry point of the backend contract
+    before the random seeds, the id for the registered circuits,
+    the bytecode for the bytecode entry points and the number of
+    qubits and the string otherwise.
+
+    Args:
+        experiment: The encoded circuit.
+        function_name: The name of the entry point.
+
+    Returns:
+        The arguments of the circuit.
+    """
+    if function_name in BY_ID_FUNCTIONS:
+        return (experiment['circuit_id'],)
+    if function_name in BYTECODE_FUNCTIONS:
+        return (experiment['circuit_code'],)
+    return (experiment['num_qubits'], experiment['circuit_str'])
+
+
+def _get_experiment_random_seed(
+    random_seed: int,
+    index: int
+) -> np.random.RandomState:
+    r"""
+    Get the random generator of an experiment from the random seed of
+    its job, the first experiment uses the seed of the job.
+
+    Args:
+        random_seed: The random seed of the job.
+        index: The index of the circuit in the job.
+
+    Returns:
+        The random generator of the experiment.
+    """
+    seed_sequence = np.random.SeedSequence(random_seed)
+    if index > 0:
+        seed_sequence = np.random.SeedSequence(
+            random_seed,
+            spawn_key=(index,)
+        )
+    return np.random.RandomState(np.random.MT19937(seed_sequence))
+
+
+def _get_shots_per_gas(one_shot_gas: int, two_shots_gas: int) -> int:
+    r"""
+    Get the number of shots that fit in the gas of one call.
+
+    Args:
+        one_shot_gas: The gas of a call with one shot.
+        two_shots_gas: The gas of a call with two shots.
+
+    Returns:
+        The number of shots in a call.
+    """
+    # the state buffers are reused by the shots of a call so
+    # the gas grows linearly with the number of shots
+    shot_gas = max(1, two_shots_gas - one_shot_gas)
+    return max(
+        1,
+        min(
+            MAX_SHOTS_PER_CALL,
+            (CALL_GAS - one_shot_gas) // shot_gas + 1
+        )
+    )
+
+
+def _is_revert(error: Exception) -> bool:
+    r"""
+    Check if an error of a call is a revert of the contract.
+
+    Args:
+        error: The error of the call.
+
+    Returns:
+        True if the call reverted.
+    """
+    if isinstance(error, ContractLogicError):
+        return True
+    return (isinstance(error, RPCError) and
+            (error.code == 3 or 'revert' in str(error).lower()))
+
+
+def _get_outcome_dtype(num_qubits: int) -> np.dtype:
+    r"""
+    Get the smallest unsigned integer type of the outcomes of a circuit.
+
+    Args:
+        num_qubits: The number of qubits of the circuit.
+
+    Returns:
+        The type of the outcomes.
+    """
+    if num_qubits <= 16:
+        return np.dtype(np.uint16)
+    if num_qubits <= 32:
+        return np.dtype(np.uint32)
+    if num_qubits <= 64:
+        return np.dtype(np.uint64)
+    return np.dtype(object)
+
+
+def _format_outcome(
+    outcome: int,
+    num_qubits: int,
+    qubits: tuple[int, ...] = None,
+    circuit_num_qubits: int = None
+) -> str:
+    r"""
+    Convert an outcome to a bitstring.
+
+    Args:
+        outcome: The outcome of a shot.
+        num_qubits: The number of qubits of the circuit.
+        qubits: The index in the circuit of every qubit of the outcome,
+            if the circuit was compacted.
+        circuit_num_qubits: The number of qubits of the bitstring, if
+            the circuit was compacted.
+
+    Returns:
+        The measurement result of the shot.
+    """
+    # convert the outcome to binary and pad it with zeros to the
+    # number of qubits. Also revers the order of the bits to match
+    # the qiskit convention
+    bitstring = format(int(outcome), 'b').zfill(num_qubits)[::-1]
+    if qubits is None or circuit_num_qubits == num_qubits:
+        return bitstring
+    # the qubit i is the character circuit_num_qubits - 1 - i
+    bits = ['0'] * circuit_num_qubits
+    for index, qubit in enumerate(qubits):
+        bits[circuit_num_qubits - 1 - qubit] = (
+            bitstring[num_qubits - 1 - index]
+        )
+    return "".join(bits)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_bitstrings(
+    num_qubits: int,
+    qubits: tuple[int, ...] = None,
+    circuit_num_qubits: int = None
+) -> np.ndarray:
+    r"""
+    Get the lookup table of the bitstrings of all the outcomes of a
+    circuit, built once for every number of qubits and layout of the
+    compacted qubits.
+
+    Args:
+        num_qubits: The number of qubits of the circuit.
+        qubits: The index in the circuit of every qubit of the outcome,
+            if the circuit was compacted.
+        circuit_num_qubits: The number of qubits of the bitstrings, if
+            the circuit was compacted.
+
+    Returns:
+        The bitstring of every outcome.
+    """
+    return np.array([
+        _format_outcome(outcome, num_qubits, qubits, circuit_num_qubits)
+        for outcome in range(2**num_qubits)
+    ])
+
+
+def _get_circuit_key(circuit) -> tuple:
+    r"""
+    Get a hashable key of the instructions of a circuit, equal for
+    identical circuits.
+
+    Args:
+        circuit: The quantum circuit.
+
+    Returns:
+        The key of the circuit.
+    """
+    return (
+        circuit.num_qubits,
+        circuit.num_clbits,
+        tuple(
+            (
+                instruction.operation.name,
+                tuple(str(param) for param in instruction.operation.params),
+                str(getattr(instruction.operation, 'condition', None)),
+                tuple(
+                    circuit.find_bit(qubit).index
+                    for qubit in instruction.qubits
+                ),
+                tuple(
+                    circuit.find_bit(clbit).index
+                    for clbit in instruction.clbits
+                )
+            )
+            for instruction in circuit.data
+        )
+    )
+
+
+def confidence_interval_stopping(
+    bitstrings: list[str],
+    max_width: float,
+    z: float = 1.96,
+    min_shots: int = 100
+) -> Callable[[dict[str, int], int], bool]:
+    r"""
+    Make an early stopping criterion that stops the shots of a job once
+    the normal approximation confidence intervals of the probabilities
+    of the target outcomes are narrow enough.
+
+    Args:
+        bitstrings: The target outcomes.
+        max_width: The maximum width of the confidence intervals.
+        z: The z score of the confidence level, 1.96 for 95%.
+        min_shots: The minimum number of shots before stopping.
+
+    Returns:
+        The early stopping criterion, called with the partial counts
+        and the number of shots done.
+    """
+    def early_stopping(counts: dict[str, int], shots: int) -> bool:
+        if shots < min_shots:
+            return False
+        for bitstring in bitstrings:
+            probability = counts.get(bitstring, 0) / shots
+            width = 2 * z * math.sqrt(probability * (1 - probability) / shots)
+            if width > max_width:
+                return False
+        return True
+    return early_stopping
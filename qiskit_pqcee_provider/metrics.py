@@ -0,0 +1,423 @@
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Callable
+import bisect
+import logging
+import math
+import threading
+
+logger = logging.getLogger(__name__)
+
+# the default upper bounds of the buckets of the histograms, in seconds
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+
+def _get_labels_key(labels: dict) -> tuple:
+    r"""
+    Get the hashable key of the labels of a metric.
+
+    Args:
+        labels: The value of every label.
+
+    Returns:
+        The sorted label items.
+    """
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class Metric:
+    r"""
+    A metric of the registry, with one value for every set of labels.
+    """
+
+    type_name = None
+
+    def __init__(self, name: str, documentation: str):
+        r"""
+        Args:
+            name: The name of the metric.
+            documentation: The description of the metric.
+        """
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        self._values = dict()
+
+    def samples(self) -> list[tuple[dict, object]]:
+        r"""
+        Get a copy of the values of the metric.
+
+        Returns:
+            The labels and the value of every set of labels.
+        """
+        with self._lock:
+            return [
+                (dict(labels_key), self._copy_value(value))
+                for labels_key, value in self._values.items()
+            ]
+
+    def _copy_value(self, value):
+        return value
+
+    def clear(self):
+        r"""
+        Delete all the values of the metric.
+        """
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    r"""
+    A metric that only goes up, as the number of requests.
+    """
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        r"""
+        Increment the counter.
+
+        Args:
+            amount: The increment, not negative.
+            labels: The labels of the value.
+        """
+        if amount < 0:
+            raise ValueError("A counter can only be incremented")
+        labels_key = _get_labels_key(labels)
+        with self._lock:
+            self._values[labels_key] = (
+                self._values.get(labels_key, 0) + amount
+            )
+
+
+class Gauge(Metric):
+    r"""
+    A metric that goes up and down, as the number of queued jobs.
+    """
+
+    type_name = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        r"""
+        Increment the gauge.
+
+        Args:
+            amount: The increment.
+            labels: The labels of the value.
+        """
+        labels_key = _get_labels_key(labels)
+        with self._lock:
+            self._values[labels_key] = (
+                self._values.get(labels_key, 0) + amount
+            )
+
+    def dec(self, amount: float = 1, **labels):
+        r"""
+        Decrement the gauge.
+
+        Args:
+            amount: The decrement.
+            labels: The labels of the value.
+        """
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        r"""
+        Set the gauge.
+
+        Args:
+            value: The value.
+            labels: The labels of the value.
+        """
+        with self._lock:
+            self._values[_get_labels_key(labels)] = value
+
+
+class Histogram(Metric):
+    r"""
+    A metric counting the observed values in buckets, as the latency
+    of the requests.
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: tuple = DEFAULT_BUCKETS
+    ):
+        r"""
+        Args:
+            name: The name of the metric.
+            documentation: The description of the metric.
+            buckets: The increasing upper bounds of the buckets.
+        """
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        r"""
+        Observe a value.
+
+        Args:
+            value: The observed value.
+            labels: The labels of the value.
+        """
+        labels_key = _get_labels_key(labels)
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if labels_key not in self._values:
+                # the last bucket is +Inf
+                self._values[labels_key] = dict(
+                    buckets=[0] * (len(self.buckets) + 1),
+                    count=0,
+                    sum=0.0
+                )
+            histogram = self._values[labels_key]
+            histogram['buckets'][bucket] += 1
+            histogram['count'] += 1
+            histogram['sum'] += value
+
+    def _copy_value(self, value):
+        # the buckets are cumulative, as in the Prometheus format
+        cumulative = 0
+        buckets = dict()
+        for upper_bound, count in zip(
+            self.buckets + (math.inf,),
+            value['buckets']
+        ):
+            cumulative += count
+            buckets[upper_bound] = cumulative
+        return dict(buckets=buckets, count=value['count'], sum=value['sum'])
+
+
+class MetricsRegistry:
+    r"""
+    The registry of the metrics of the provider stack, aggregated over
+    all the jobs and the backends of the process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = dict()
+
+    def _get_metric(self, metric_class: type, name: str, *args) -> Metric:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = metric_class(name, *args)
+            metric = self._metrics[name]
+        if not isinstance(metric, metric_class):
+            raise ValueError(
+                "Metric %s is a %s" % (name, metric.type_name)
+            )
+        return metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        r"""
+        Get a counter, registered on the first call.
+
+        Args:
+            name: The name of the counter.
+            documentation: The description of the counter.
+
+        Returns:
+            The counter.
+        """
+        return self._get_metric(Counter, name, documentation)
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        r"""
+        Get a gauge, registered on the first call.
+
+        Args:
+            name: The name of the gauge.
+            documentation: The description of the gauge.
+
+        Returns:
+            The gauge.
+        """
+        return self._get_metric(Gauge, name, documentation)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        buckets: tuple = DEFAULT_BUCKETS
+    ) -> Histogram:
+        r"""
+        Get a histogram, registered on the first call.
+
+        Args:
+            name: The name of the histogram.
+            documentation: The description of the histogram.
+            buckets: The increasing upper bounds of the buckets.
+
+        Returns:
+            The histogram.
+        """
+        return self._get_metric(Histogram, name, documentation, buckets)
+
+    def metrics(self) -> list[Metric]:
+        r"""
+        Get all the registered metrics.
+
+        Returns:
+            The metrics sorted by name.
+        """
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def clear(self):
+        r"""
+        Delete the values of all the metrics, the metrics stay registered.
+        """
+        for metric in self.metrics():
+            metric.clear()
+
+
+# the registry of the process
+_metrics_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    r"""
+    Get the metrics registry of the process, shared by all the
+    providers, backends and jobs.
+
+    Returns:
+        The metrics registry.
+    """
+    return _metrics_registry
+
+
+def export_dict(registry: MetricsRegistry) -> dict:
+    r"""
+    Export a snapshot of the metrics as a dict.
+
+    Args:
+        registry: The metrics registry.
+
+    Returns:
+        The type, the description and the values with their labels of
+        every metric, by name.
+    """
+    return {
+        metric.name: dict(
+            type=metric.type_name,
+            documentation=metric.documentation,
+            values=[
+                dict(labels=labels, value=value)
+                for labels, value in metric.samples()
+            ]
+        )
+        for metric in registry.metrics()
+    }
+
+
+def _format_prometheus_sample(name: str, labels: dict, value) -> str:
+    labels_string = ",".join(
+        '%s="%s"' % (
+            label,
+            str(label_value).replace("\\", "\\\\").replace('"', '\\"')
+        )
+        for label, label_value in labels.items()
+    )
+    if labels_string:
+        name += "{" + labels_string + "}"
+    return "%s %s" % (name, _format_prometheus_value(value))
+
+
+def _format_prometheus_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def export_prometheus(registry: MetricsRegistry) -> str:
+    r"""
+    Export the metrics in the Prometheus text format.
+
+    Args:
+        registry: The metrics registry.
+
+    Returns:
+        The metrics in the Prometheus text format.
+    """
+    lines = list()
+    for metric in registry.metrics():
+        lines.append("# HELP %s %s" % (metric.name, metric.documentation))
+        lines.append("# TYPE %s %s" % (metric.name, metric.type_name))
+        for labels, value in metric.samples():
+            if metric.type_name != "histogram":
+                lines.append(
+                    _format_prometheus_sample(metric.name, labels, value)
+                )
+                continue
+            for upper_bound, count in value['buckets'].items():
+                lines.append(_format_prometheus_sample(
+                    metric.name + "_bucket",
+                    dict(labels, le=_format_prometheus_value(upper_bound)),
+                    count
+                ))
+            lines.append(_format_prometheus_sample(
+                metric.name + "_sum",
+                labels,
+                value['sum']
+            ))
+            lines.append(_format_prometheus_sample(
+                metric.name + "_count",
+                labels,
+                value['count']
+            ))
+    return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(
+    registry: MetricsRegistry,
+    port: int = 0,
+    host: str = "127.0.0.1",
+    exporter: Callable[[MetricsRegistry], str] = export_prometheus
+) -> ThreadingHTTPServer:
+    r"""
+    Serve the metrics on a local HTTP endpoint, from a daemon thread.
+
+    Args:
+        registry: The metrics registry.
+        port: The port of the endpoint, 0 for any free port.
+        host: The host of the endpoint.
+        exporter: The exporter of the metrics to text.
+
+    Returns:
+        The HTTP server, its server_address is the address of the
+        endpoint and shutdown stops it.
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            body = exporter(registry).encode()
+            self.send_response(200)
+            self.send_header(
+                "Content-Type",
+                "text/plain; version=0.0.4; charset=utf-8"
+            )
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(format, *args)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(
+        target=server.serve_forever,
+        name="pqcee-metrics-server",
+        daemon=True
+    ).start()
+    logger.info("Serving the metrics on %s:%d", *server.server_address[:2])
+    return server
@@ -1,8 +1,21 @@
 from qiskit.providers import ProviderV1 as Provider
+from qiskit.providers import JobError
 from qiskit.providers.providerutils import filter_backends
 
 from .backend import BlockchainBackend
+from .checkpoint import get_checkpoint_store
+from .job import BlockcahinJob
+from .metrics import MetricsRegistry
+from .metrics import export_dict
+from .metrics import get_metrics_registry
+from .metrics import start_metrics_server
+from .rpc import EndpointPool
+from .rpc import PooledHTTPProvider
 
+from http.server import ThreadingHTTPServer
+from typing import Any, Callable
+import asyncio
+import functools
 import web3
 import pathlib
 from solcx import compile_source
@@ -10,6 +23,24 @@ import configparser
 from web3.middleware import geth_poa_middleware
 
 
+@functools.lru_cache(maxsize=None)
+def get_provider_interface_abi() -> list:
+    r"""
+    Get the abi of the provider interface, compiled once.
+
+    Returns:
+        The abi of the provider smart contract interface.
+    """
+    mod_path = pathlib.Path(__file__).parent.absolute()
+    absolute_path = (
+        mod_path / "contracts" / "QuantumProviderInterface.sol"
+    ).resolve()
+    sc_interface_code = absolute_path.read_text()
+    compiled_sol = compile_source(sc_interface_code, output_values=['abi'])
+    contract_id, contract_interface = compiled_sol.popitem()
+    return contract_interface['abi']
+
+
 class BlockchainProvider(Provider):
     r"""
     Thq quantum provider on the blockchain.
@@ -23,6 +54,19 @@ class BlockchainProvider(Provider):
     r"""
     The provider smart contract.
     """
+    async_web3_provider: web3.AsyncWeb3 = None
+    r"""
+    The async web3 provider for the blockchain.
+    """
+    endpoint_pool: EndpointPool = None
+    r"""
+    The pool of the endpoints of the web3 provider, if any.
+    """
+    metrics: MetricsRegistry = get_metrics_registry()
+    r"""
+    The metrics of the process, aggregated over all the jobs and the
+    backends.
+    """
 
     def __init__(
         self,
@@ -30,7 +74,8 @@ class BlockchainProvider(Provider):
         provider_address: str,
         is_local: bool = False,
         approximation_depth: int = 0,
-        approximation_recursion_degree: int = 0
+        approximation_recursion_degree: int = 0,
+        async_web3_provider: web3.AsyncWeb3 = None
     ):
         r"""
         Args:
@@ -39,18 +84,16 @@ class BlockchainProvider(Provider):
             is_local: If the provider is local or not.
             approximation_depth: The basic approximation depth.
             approximation_recursion_degree: The skd recursion degree.
+            async_web3_provider: The async web3 provider for the
+                blockchain, used by run_async of the backends.
         """
         super().__init__()
         self.web3_provider = web3_provider
+        self.async_web3_provider = async_web3_provider
+        if isinstance(web3_provider.provider, PooledHTTPProvider):
+            self.endpoint_pool = web3_provider.provider.endpoint_pool
         # compile the provider interface for the abi
-        mod_path = pathlib.Path(__file__).parent.absolute()
-        absolute_path = (
-            mod_path / "contracts" / "QuantumProviderInterface.sol"
-        ).resolve()
-        sc_interface_code = absolute_path.read_text()
-        compiled_sol = compile_source(sc_interface_code, output_values=['abi'])
-        contract_id, contract_interface = compiled_sol.popitem()
-        abi = contract_interface['abi']
+        abi = get_provider_interface_abi()
         # connect to provider contract
         self.web3_contract = self.web3_provider.eth.contract(
             address=provider_address,
@@ -67,11 +110,107 @@ class BlockchainProvider(Provider):
                 is_local=is_local,
                 backend_seed=0,
                 approximation_depth=approximation_depth,
-                approximation_recursion_degree=approximation_recursion_degree
+                approximation_recursion_degree=approximation_recursion_degree,
+                async_web3_provider=async_web3_provider
             )
             for backend_address in web3_backends
         ]
 
+    @classmethod
+    def from_endpoints(
+        cls,
+        endpoint_uris: list[str],
+        provider_address: str,
+        is_local: bool = False,
+        approximation_depth: int = 0,
+        approximation_recursion_degree: int = 0,
+        unhealthy_seconds: float = 30.0,
+        hedge_after: float = None
+    ):
+        r"""
+        Create a provider sending its requests to a pool of endpoints
+        of the same chain, balanced by their latency, with failover
+        and optionally hedged.
+
+        Args:
+            endpoint_uris: The uris of the HTTP endpoints.
+            provider_address: The address of the provider smart contract.
+            is_local: If the provider is local or not.
+            approximation_depth: The basic approximation depth.
+            approximation_recursion_degree: The skd recursion degree.
+            unhealthy_seconds: The seconds an endpoint is not used after
+                an error.
+            hedge_after: The seconds after which a slow request is sent
+                again to a second endpoint, None to not hedge.
+
+        Returns:
+            The provider.
+        """
+        web3_provider = web3.Web3(
+            PooledHTTPProvider(
+                EndpointPool(
+                    endpoint_uris,
+                    unhealthy_seconds=unhealthy_seconds,
+                    hedge_after=hedge_after
+                )
+            )
+        )
+        return cls(
+            web3_provider=web3_provider,
+            provider_address=provider_address,
+            is_local=is_local,
+            approximation_depth=approximation_depth,
+            approximation_recursion_degree=approximation_recursion_degree
+        )
+
+    @classmethod
+    async def create_async(
+        cls,
+        async_web3_provider: web3.AsyncWeb3,
+        provider_address: str,
+        is_local: bool = False,
+        approximation_depth: int = 0,
+        approximation_recursion_degree: int = 0
+    ):
+        r"""
+        Create a provider running only with an async web3 provider,
+        fetching the information of all the backends concurrently.
+
+        Args:
+            async_web3_provider: The async web3 provider for the blockchain.
+            provider_address: The address of the provider smart contract.
+            is_local: If the provider is local or not.
+            approximation_depth: The basic approximation depth.
+            approximation_recursion_degree: The skd recursion degree.
+
+        Returns:
+            The provider, its backends run circuits with run_async.
+        """
+        provider = cls.__new__(cls)
+        Provider.__init__(provider)
+        provider.async_web3_provider = async_web3_provider
+        # connect to provider contract
+        web3_contract = async_web3_provider.eth.contract(
+            address=provider_address,
+            abi=get_provider_interface_abi()
+        )
+        provider.web3_contract = web3_contract
+        # getting the backend addresses from the provider contract
+        web3_backends = await web3_contract.functions.getBackends().call()
+        provider._backends = list(await asyncio.gather(*[
+            BlockchainBackend.create_async(
+                provider=provider,
+                async_web3_provider=async_web3_provider,
+                backend_address=backend_address,
+                is_local=is_local,
+                backend_seed=0,
+                approximation_depth=approximation_depth,
+                approximation_recursion_degree=approximation_recursion_degree
+            )
+            for backend_address in web3_backends
+        ]))
+        return provider
+
     def backends(self, name=None, **kwargs):
         backends = self._backends
         if name:
@@ -79,6 +218,88 @@ class BlockchainProvider(Provider):
                 backend for backend in self._backends if backend.name == name]
         return filter_backends(backends, filters=None, **kwargs)
 
+    def get_metrics(
+        self,
+        exporter: Callable[[MetricsRegistry], Any] = export_dict
+    ) -> Any:
+        r"""
+        Export the metrics of the process.
+
+        Args:
+            exporter: The exporter of the metrics, export_dict for a
+                snapshot dict or export_prometheus for the Prometheus
+                text format.
+
+        Returns:
+            The exported metrics.
+        """
+        return exporter(self.metrics)
+
+    def start_metrics_server(
+        self,
+        port: int = 0,
+        host: str = "127.0.0.1"
+    ) -> ThreadingHTTPServer:
+        r"""
+        Serve the metrics of the process in the Prometheus text format
+        on a local HTTP endpoint.
+
+        Args:
+            port: The port of the endpoint, 0 for any free port.
+            host: The host of the endpoint.
+
+        Returns:
+            The HTTP server, shutdown stops it.
+        """
+        return start_metrics_server(self.metrics, port, host)
+
+    def retrieve_job(
+        self,
+        job_id: str,
+        checkpoint_dir: str = None
+    ) -> BlockcahinJob:
+        r"""
+        Retrieve a checkpointed job, after a crash or a restart, and
+        resume it. Only the shots missing from the checkpoint run, with
+        the same seeds and on the same block as the original job.
+
+        Args:
+            job_id: The id of the job.
+            checkpoint_dir: The checkpoint directory of the job, by
+                default the checkpoint_dir options of the backends.
+
+        Returns:
+            The resumed job.
+
+        Raises:
+            JobError: If the job or its backend is not found.
+        """
+        if checkpoint_dir is not None:
+            checkpoint_dirs = [checkpoint_dir]
+        else:
+            checkpoint_dirs = list(dict.fromkeys(
+                backend.options.checkpoint_dir
+                for backend in self._backends
+                if backend.options.checkpoint_dir is not None
+            ))
+        for checkpoint_dir in checkpoint_dirs:
+            checkpoint = get_checkpoint_store(checkpoint_dir).load_job(job_id)
+            if checkpoint is not None:
+                break
+        else:
+            raise JobError("Job %s not found in the checkpoints" % job_id)
+        for backend in self._backends:
+            if (backend.web3_contract is not None and
+                    backend.web3_contract.address ==
+                    checkpoint['backend_address']):
+                return backend.resume_job(job_id, checkpoint)
+        raise JobError(
+            "Backend %s of job %s not found" % (
+                checkpoint['backend_address'],
+                job_id
+            )
+        )
+
 
 class LocalPqceeProvider(BlockchainProvider):
     r"""
@@ -88,12 +309,16 @@ class LocalPqceeProvider(BlockchainProvider):
     def __init__(
         self,
         approximation_depth: int = 0,
-        approximation_recursion_degree: int = 0
+        approximation_recursion_degree: int = 0,
+        deploy_inplace_backend: bool = False
     ):
         """
         Args:
             approximation_depth: The basic approximation depth.
             approximation_recursion_degree: The skd recursion degree.
+            deploy_inplace_backend: If the variant of the simulator
+                updating the amplitudes in place is deployed too, as
+                pqcee_inplace_simulator.
         """
         web3_provider = web3.Web3(web3.Web3.EthereumTesterProvider())
         web3_account = web3_provider.eth.accounts[0]
@@ -132,37 +357,43 @@ class LocalPqceeProvider(BlockchainProvider):
             address=provider_address,
             abi=abi
         )
-        # register the backend smart contract
-        mod_path = pathlib.Path(__file__).parent.absolute()
-        absolute_path = (
-            mod_path / "contracts" / "QuantumBackendContract.sol"
-        ).resolve()
-        sc_backend_code = absolute_path.read_text()
-        compiled_sol = compile_source(
-            sc_backend_code,
-            base_path=base_path,
-            output_values=['abi', 'bin']
-        )
-        # interface
-        contract_id, contract_interface = compiled_sol.popitem()
-        # the contract
-        contract_id, contract_interface = compiled_sol.popitem()
-        abi = contract_interface['abi']
-        bytecode = contract_interface['bin']
-        backend_contract = web3_provider.eth.contract(
-            abi=abi,
-            bytecode=bytecode
-        )
-        # deploy the contract
-        tx_hash = backend_contract.constructor().transact()
-        tx_receipt = web3_provider.eth.wait_for_transaction_receipt(tx_hash)
-        backend_address = tx_receipt.contractAddress
+        # register the backend smart contracts, the simulator and, on
+        # request, its variant updating the amplitudes in place
+        contract_names = ["QuantumBackendContract"]
+        if deploy_inplace_backend:
+            contract_names.append("QuantumBackendInPlaceContract")
+        for contract_name in contract_names:
+            absolute_path = (
+                mod_path / "contracts" / (contract_name + ".sol")
+            ).resolve()
+            sc_backend_code = absolute_path.read_text()
+            compiled_sol = compile_source(
+                sc_backend_code,
+                base_path=base_path,
+                output_values=['abi', 'bin']
+            )
+            # the imported interface and contracts are compiled too
+            contract_interface = compiled_sol['<stdin>:' + contract_name]
+            abi = contract_interface['abi']
+            bytecode = contract_interface['bin']
+            backend_contract = web3_provider.eth.contract(
+                abi=abi,
+                bytecode=bytecode
+            )
+            # deploy the contract
+            tx_hash = backend_contract.constructor().transact()
+            tx_receipt = web3_provider.eth.wait_for_transaction_receipt(
+                tx_hash
+            )
+            backend_address = tx_receipt.contractAddress
 
-        # register the backend adress with the local provider
-        tx_hash = (
-            provider_contract.functions.addBackend(backend_address).transact()
-        )
-        tx_receipt = web3_provider.eth.wait_for_transaction_receipt(tx_hash)
+            # register the backend adress with the local provider
+            tx_hash = provider_contract.functions.addBackend(
+                backend_address
+            ).transact()
+            tx_receipt = web3_provider.eth.wait_for_transaction_receipt(
+                tx_hash
+            )
 
         super().__init__(
             web3_provider=web3_provider,
@@ -206,10 +437,17 @@ class PqceeProvider(BlockchainProvider):
             raise Exception("No mumbai in config file")
 
         # working connection on web3 https://rpc-mumbai.maticvigil.com/
+        # more endpoints of the chain can be listed in the config file
+        endpoint_uris = [
+            endpoint_uri.strip()
+            for endpoint_uri in config['mumbai'].get(
+                'endpoint_uris',
+                'https://rpc-mumbai.maticvigil.com/'
+            ).split(',')
+            if endpoint_uri.strip()
+        ]
         web3_provider = web3.Web3(
-            web3.Web3.HTTPProvider(
-                endpoint_uri='https://rpc-mumbai.maticvigil.com/'
-            )
+            PooledHTTPProvider(EndpointPool(endpoint_uris))
         )
         # setup poa
         web3_provider.middleware_onion.inject(geth_poa_middleware, layer=0)
@@ -221,3 +459,7 @@ class PqceeProvider(BlockchainProvider):
             approximation_depth=approximation_depth,
             approximation_recursion_degree=approximation_recursion_degree
         )
+        # the shots are sent in parallel and in JSON-RPC batches to
+        # hide the latency of the remote endpoint
+        for backend in self._backends:
+            backend.set_options(max_inflight_calls=8, rpc_batch_size=16)
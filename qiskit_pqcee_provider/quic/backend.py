@@ -33,6 +33,128 @@ def get_SolovayKitaev_pass_manager(
     )])
 
 
+# the gates of the contract acting differently on the real and the
+# imaginary amplitudes, and the gates mixing the real and the imaginary
+# amplitudes. The gates of the two kinds do not commute even on
+# different qubits
+QUIC_REAL_GATES = ("H",)
+QUIC_PHASE_GATES = ("Y", "S", "s", "P", "p", "T", "t")
+
+
+# the version of the QuiC bytecode, the first byte of the bytecode
+QUIC_BYTECODE_VERSION = 1
+# the number of qubits is one byte of the bytecode
+QUIC_BYTECODE_MAX_QUBITS = 255
+
+
+def get_quic_bytecode_mask_size(num_qubits: int) -> int:
+    r"""
+    Get the number of bytes of the control masks of the QuiC bytecode.
+
+    Args:
+        num_qubits: The number of qubits of the bytecode.
+
+    Returns:
+        The number of bytes of a control mask, at least one.
+    """
+    return max(1, (num_qubits + 7) // 8)
+
+
+def pack_quic_layers(
+    gates: list[tuple[list[int], str]],
+    num_qubits: int
+) -> list[str]:
+    r"""
+    Schedule the gates of a circuit in as few QuiC layers as possible.
+    The single qubit gates on different qubits share layers, as soon as
+    their qubit is free, so the number of layers follows the depth of
+    the circuit instead of its number of gates. A controlled gate keeps
+    its own layer, because the contract controls all the gates of a
+    layer by all its control qubits. The gates that do not commute with
+    the integer amplitudes of the contract keep their order.
+
+    Args:
+        gates: The qubit indexes and the QuiC representation of every
+            gate in order, None for a barrier.
+        num_qubits: The number of qubits of the layers.
+
+    Returns:
+        The layers.
+    """
+    layers: list[list[str]] = []
+    # if every layer holds only single qubit gates
+    shared_layers: list[bool] = []
+    # the index of the first layer after the last gate of every qubit,
+    # all the layers from it are free on the qubit
+    frontiers = [0] * num_qubits
+    # the index of the first layer after the last real gate and after
+    # the last phase gate
+    real_frontier = 0
+    phase_frontier = 0
+    for gate_qubits, quic_representation in gates:
+        if quic_representation == "m":
+            # the measurements of the contract do not commute with the
+            # gates on the other qubits, nothing moves across them
+            layer = ["I"] * num_qubits
+            layer[gate_qubits[0]] = quic_representation
+            layers.append(layer)
+            shared_layers.append(False)
+            frontiers = [len(layers)] * num_qubits
+            real_frontier = phase_frontier = len(layers)
+            continue
+        earliest = max([frontiers[qubit] for qubit in gate_qubits] + [0])
+        if quic_representation is None:
+            # no gate moves across a barrier
+            for qubit in gate_qubits:
+                frontiers[qubit] = earliest
+            continue
+        # the target of a controlled gate is its last character
+        is_real = quic_representation[-1] in QUIC_REAL_GATES
+        is_phase = quic_representation[-1] in QUIC_PHASE_GATES
+        if is_real:
+            earliest = max(earliest, phase_frontier)
+        if is_phase:
+            earliest = max(earliest, real_frontier)
+        if len(gate_qubits) == 1:
+            # the first shared layer from the earliest one
+            layer_index = next(
+                (
+                    index
+                    for index in range(earliest, len(layers))
+                    if shared_layers[index]
+                ),
+                len(layers)
+            )
+            if layer_index == len(layers):
+                layers.append(["I"] * num_qubits)
+                shared_layers.append(True)
+            layers[layer_index][gate_qubits[0]] = quic_representation
+        else:
+            layer_index = earliest
+            layer = ["I"] * num_qubits
+            for qubit_no, qubit in enumerate(gate_qubits):
+                layer[qubit] = quic_representation[qubit_no]
+            # the layers after the gate do not act on its qubits and
+            # commute with it, the gate runs before them
+            layers.insert(layer_index, layer)
+            shared_layers.insert(layer_index, False)
+            frontiers = [
+                frontier + 1 if frontier > layer_index else frontier
+                for frontier in frontiers
+            ]
+            if real_frontier > layer_index:
+                real_frontier += 1
+            if phase_frontier > layer_index:
+                phase_frontier += 1
+        for qubit in gate_qubits:
+            frontiers[qubit] = layer_index + 1
+        if is_real:
+            real_frontier = max(real_frontier, layer_index + 1)
+        if is_phase:
+            phase_frontier = max(phase_frontier, layer_index + 1)
+    return ["".join(layer) for layer in layers]
+
+
 class QuiCBackend(Backend):
     def __init__(
         self,
@@ -153,21 +275,105 @@ class QuiCBackend(Backend):
         circuit = pass_manager.run(circuit)
         return circuit
 
-    def get_quic_circuit_string(
+    def has_only_terminal_measurements(
         self,
         circuit: qiskit.QuantumCircuit
-    ) -> str:
+    ) -> bool:
         r"""
-        Convert a circuit to a string.
+        Verify that all the measurements of a circuit are terminal,
+        no gate acts on a qubit after it was measured.
 
         Args:
-            circuit: The circuit to convert.
+            circuit: The circuit to verify.
 
         Returns:
-            The circuit as a string.
+            True if all the measurements are at the end of the circuit.
         """
-        circuit = self.transpile_circuit(circuit)
+        measured_qubits = set()
+        for gate in circuit.data:
+            gate_name = gate.operation.name
+            if gate_name == "barrier":
+                continue
+            # classically controlled gates depend on a measurement
+            if getattr(gate.operation, "condition", None) is not None:
+                return False
+            gate_qubits = [
+                circuit.find_bit(qubit).index for qubit in gate.qubits
+            ]
+            if gate_name == "measure":
+                measured_qubits.update(gate_qubits)
+            elif measured_qubits.intersection(gate_qubits):
+                return False
+        return True
 
+    def compact_qubits(
+        self,
+        circuit: qiskit.QuantumCircuit
+    ) -> tuple[qiskit.QuantumCircuit, tuple[int, ...]]:
+        r"""
+        Remove the idle qubits of a transpiled circuit, the qubits
+        with gates are renumbered in order from 0. The contract
+        simulates 2^n amplitudes, so every idle qubit below the last
+        qubit with a gate doubles the cost of a shot.
+
+        Args:
+            circuit: The transpiled circuit, without measurements.
+
+        Returns:
+            The circuit on the qubits with gates and the index in the
+            circuit of every qubit of the compacted circuit.
+        """
+        qubits = tuple(sorted({
+            circuit.find_bit(qubit).index
+            for gate in circuit.data
+            if gate.operation.name != "barrier"
+            for qubit in gate.qubits
+        }))
+        circuit_num_qubits, _ = self._get_quic_gates(circuit)
+        if len(qubits) == 0 or qubits == tuple(range(circuit_num_qubits)):
+            return circuit, tuple(range(circuit_num_qubits))
+        compacted_indexes = {
+            qubit: index for index, qubit in enumerate(qubits)
+        }
+        compacted_circuit = qiskit.QuantumCircuit(
+            len(qubits),
+            name=circuit.name
+        )
+        for gate in circuit.data:
+            gate_qubits = [
+                compacted_indexes[circuit.find_bit(qubit).index]
+                for qubit in gate.qubits
+                if circuit.find_bit(qubit).index in compacted_indexes
+            ]
+            # the barriers only keep their qubits with gates
+            if len(gate_qubits) == 0:
+                continue
+            if gate.operation.name == "barrier":
+                compacted_circuit.barrier(gate_qubits)
+            else:
+                compacted_circuit.append(gate.operation, gate_qubits)
+        logger.debug(
+            "Compacted the qubits %s of %s",
+            qubits,
+            circuit.name
+        )
+        return compacted_circuit, qubits
+
+    def _get_quic_gates(
+        self,
+        circuit: qiskit.QuantumCircuit
+    ) -> tuple[int, list[tuple[list[int], str]]]:
+        r"""
+        Get the QuiC representation of the gates of a transpiled circuit.
+
+        Args:
+            circuit: The transpiled circuit.
+
+        Returns:
+            The number of qubits, up to the last qubit with a gate, and
+            the qubit indexes and the QuiC representation of every gate
+            in order, None for a barrier.
+        """
         # compute the maximum num qubits
         circuit_num_qubits = max(
             [
@@ -175,38 +381,138 @@ class QuiCBackend(Backend):
                 for gate in circuit.data
                 for qubit in gate.qubits
             ] + [0]) + 1
-        circuit_string: str = ""
-        circuit_string_list: list[str] = []
+        gates: list[tuple[list[int], str]] = []
         for gate in circuit.data:
             # get gate name
             gate_name = gate.operation.name
-            # get the number of qubits
-            gate_num_qubits = gate.operation.num_qubits
             # get gate qubits
-            gate_qubits = gate.qubits
-            # string to add
-            # initialise with identity gates
-            gate_string_list = ["I" for _ in range(circuit_num_qubits)]
-
+            gate_qubits = [
+                circuit.find_bit(qubit).index for qubit in gate.qubits
+            ]
             if gate_name == "barrier":
+                gates.append((gate_qubits, None))
                 continue
-
             quic_gate = QuiCGate.from_qiskit_name(gate_name)
             # get the quic representation
-            quic_representation = quic_gate.get_quic_representation()
-            # modify the gate string list
-            for qubit_no in range(gate_num_qubits):
-                index = circuit.find_bit(gate_qubits[qubit_no]).index
-                gate_string_list[index] = quic_representation[qubit_no]
-            # join the list to get the gate string
-            gate_string = "".join(gate_string_list)
-            # add the gate string to the circuit string list
-            circuit_string_list.append(gate_string)
+            gates.append((gate_qubits, quic_gate.get_quic_representation()))
+        return circuit_num_qubits, gates
+
+    def get_quic_circuit_string(
+        self,
+        circuit: qiskit.QuantumCircuit,
+        transpile: bool = True,
+        pack_layers: bool = True
+    ) -> str:
+        r"""
+        Convert a circuit to a string.
+
+        Args:
+            circuit: The circuit to convert.
+            transpile: If the circuit is transpiled first, False for a
+                circuit already returned by transpile_circuit.
+            pack_layers: If the single qubit gates on different qubits
+                share layers, otherwise every gate has its own layer.
+
+        Returns:
+            The circuit as a string.
+        """
+        if transpile:
+            circuit = self.transpile_circuit(circuit)
+        circuit_num_qubits, gates = self._get_quic_gates(circuit)
+        circuit_string: str = ""
+        if pack_layers:
+            circuit_string_list = pack_quic_layers(gates, circuit_num_qubits)
+        else:
+            circuit_string_list = []
+            for gate_qubits, quic_representation in gates:
+                if quic_representation is None:
+                    continue
+                # initialise with identity gates
+                gate_string_list = ["I" for _ in range(circuit_num_qubits)]
+                for qubit_no, index in enumerate(gate_qubits):
+                    gate_string_list[index] = quic_representation[qubit_no]
+                # add the gate string to the circuit string list
+                circuit_string_list.append("".join(gate_string_list))
         # join the circuit string list to get the circuit string
         circuit_string = ",".join(circuit_string_list)
         logger.debug(circuit_string)
         return circuit_string + "."
 
+    def get_quic_circuit_bytecode(
+        self,
+        circuit: qiskit.QuantumCircuit,
+        transpile: bool = True
+    ) -> bytes:
+        r"""
+        Convert a circuit to the QuiC bytecode.
+
+        The bytecode starts with the version and the number of qubits,
+        one byte each, followed by one instruction for every gate: the
+        QuiC name of the target gate as the opcode byte, the bit of the
+        target qubit in the state index and the control mask, big endian
+        in the smallest number of bytes for the qubits. The qubit i of
+        the circuit is the bit num_qubits - 1 - i, as in the layers of
+        the QuiC string, so the outcomes are the same.
+
+        Args:
+            circuit: The circuit to convert.
+            transpile: If the circuit is transpiled first, False for a
+                circuit already returned by transpile_circuit.
+
+        Returns:
+            The circuit as bytecode.
+
+        Raises:
+            ValueError: If the circuit has too many qubits.
+        """
+        if transpile:
+            circuit = self.transpile_circuit(circuit)
+        circuit_num_qubits, gates = self._get_quic_gates(circuit)
+        if circuit_num_qubits > QUIC_BYTECODE_MAX_QUBITS:
+            raise ValueError(
+                "The bytecode supports at most %d qubits" %
+                QUIC_BYTECODE_MAX_QUBITS
+            )
+        mask_size = get_quic_bytecode_mask_size(circuit_num_qubits)
+        circuit_code = bytearray([QUIC_BYTECODE_VERSION, circuit_num_qubits])
+        for gate_qubits, quic_representation in gates:
+            if quic_representation is None:
+                continue
+            control_mask = 0
+            for qubit, quic_name in zip(gate_qubits, quic_representation):
+                bit = circuit_num_qubits - 1 - qubit
+                if quic_name == "C":
+                    control_mask |= 1 << bit
+                else:
+                    opcode = quic_name
+                    target_bit = bit
+            circuit_code.append(ord(opcode))
+            circuit_code.append(target_bit)
+            circuit_code += control_mask.to_bytes(mask_size, 'big')
+        return bytes(circuit_code)
+
+    @staticmethod
+    def get_quic_string_num_qubits(quic_string: str) -> int:
+        r"""
+        Get the number of qubits of a circuit string, the length of
+        its first layer.
+
+        Args:
+            quic_string: The circuit string.
+
+        Returns:
+            The number of qubits.
+
+        Raises:
+            ValueError: If the circuit string has no layer.
+        """
+        first_index = quic_string.find(",")
+        if first_index == -1:
+            first_index = quic_string.find(".")
+        if first_index <= 0:
+            raise ValueError("Invalid circuit string")
+        return first_index
+
     def get_quantum_circuit_from_quic_string(
         self,
         quic_string: str,
@@ -297,6 +603,78 @@ class QuiCBackend(Backend):
             circuit.measure(qr, cr)
         return circuit
 
+    def get_quantum_circuit_from_quic_bytecode(
+        self,
+        circuit_code: bytes,
+        add_measurements: bool = False
+    ) -> qiskit.QuantumCircuit:
+        r"""
+        Convert the QuiC bytecode to a circuit.
+
+        Args:
+            circuit_code: The bytecode to convert.
+            add_measurements: Add measurements to the circuit.
+
+        Returns:
+            The qiskit Quantum circuit.
+
+        Raises:
+            ValueError: If the bytecode is not valid.
+        """
+        if len(circuit_code) < 2 or circuit_code[0] != QUIC_BYTECODE_VERSION:
+            raise ValueError("Unsupported QuiC bytecode version.")
+        num_qubits = circuit_code[1]
+        instruction_size = 2 + get_quic_bytecode_mask_size(num_qubits)
+        if (len(circuit_code) - 2) % instruction_size != 0:
+            raise ValueError("QuiC bytecode is truncated.")
+        # Create Quantum Registers
+        qr = qiskit.QuantumRegister(num_qubits, 'q')
+        # Create Classical Registers
+        cr = qiskit.ClassicalRegister(num_qubits, 'c')
+        # Create a Quantum Circuit
+        circuit = qiskit.QuantumCircuit(
+            qr,
+            cr,
+            name="QuIC Circuit"
+        )
+        for index in range(2, len(circuit_code), instruction_size):
+            quic_name = chr(circuit_code[index])
+            target_bit = circuit_code[index + 1]
+            control_mask = int.from_bytes(
+                circuit_code[index + 2:index + instruction_size],
+                'big'
+            )
+            if target_bit >= num_qubits or control_mask >> num_qubits:
+                raise ValueError(
+                    f"{circuit_code[index:index + instruction_size].hex()}: "
+                    "QuIC instruction qubits are not correct."
+                )
+            # the bit i of the state index is the qubit num_qubits - 1 - i
+            control_qubits = [
+                num_qubits - 1 - bit
+                for bit in reversed(range(num_qubits))
+                if control_mask & (1 << bit)
+            ]
+            target_qubit = num_qubits - 1 - target_bit
+            qiskit_gate = QuiCGate.from_quic_name(
+                "C" * len(control_qubits) + quic_name
+            ).get_qiskit_instruction()
+            if qiskit_gate.name == "measure":
+                circuit.append(
+                    qiskit_gate,
+                    [qr[target_qubit]],
+                    [cr[target_qubit]]
+                )
+            else:
+                circuit.append(
+                    qiskit_gate,
+                    [qr[qubit] for qubit in control_qubits] +
+                    [qr[target_qubit]]
+                )
+        # add the measurements
+        if add_measurements:
+            circuit.measure(qr, cr)
+        return circuit
 
     def run_quic_script(
         self,
@@ -0,0 +1,777 @@
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from typing import Any, Awaitable, Callable
+import asyncio
+import contextlib
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+
+import aiohttp
+import requests
+import web3
+
+from .metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+RETRIES = get_metrics_registry().counter(
+    "pqcee_rpc_retries_total",
+    "The requests sent again after a transient error."
+)
+
+
+class RPCError(Exception):
+    r"""
+    An error returned by the endpoint for a JSON-RPC request.
+    """
+
+    def __init__(self, error: Any):
+        r"""
+        Args:
+            error: The error object of the JSON-RPC response.
+        """
+        if isinstance(error, dict):
+            message = error.get('message', str(error))
+            self.code = error.get('code')
+        else:
+            message = str(error)
+            self.code = None
+        super().__init__(message)
+        self.error = error
+
+
+# the http sessions are not shared between threads
+_sessions = threading.local()
+# the ids of the JSON-RPC requests
+_request_ids = itertools.count()
+
+
+def _get_session() -> requests.Session:
+    if not hasattr(_sessions, 'session'):
+        _sessions.session = requests.Session()
+    return _sessions.session
+
+
+def _check_rate(rate: float):
+    if not rate > 0:
+        raise ValueError(
+            "The rate must be more than 0 requests per second, not %s" %
+            rate
+        )
+
+
+class TokenBucket:
+    r"""
+    A token bucket limiting the rate of the requests sent to an
+    endpoint, with bursts of up to one second of requests.
+    """
+
+    def __init__(self, rate: float):
+        r"""
+        Args:
+            rate: The requests per second.
+
+        Raises:
+            ValueError: If the rate is not positive.
+        """
+        _check_rate(rate)
+        self.rate = rate
+        self.tokens = max(1.0, rate)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate: float):
+        _check_rate(rate)
+        with self._lock:
+            self.rate = rate
+
+    def _take(self, tokens: int) -> float:
+        r"""
+        Take tokens from the bucket if the bucket has enough tokens.
+
+        Args:
+            tokens: The number of requests.
+
+        Returns:
+            0 if the tokens are taken, else the seconds to wait before
+            the bucket has enough tokens.
+        """
+        with self._lock:
+            now = time.monotonic()
+            capacity = max(1.0, self.rate)
+            self.tokens = min(
+                capacity,
+                self.tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            # a batch larger than the bucket waits for a full
+            # bucket and leaves a debt to the next requests
+            needed = min(tokens, capacity)
+            if self.tokens >= needed:
+                self.tokens -= tokens
+                return 0.0
+            return (needed - self.tokens) / self.rate
+
+    def acquire(self, tokens: int = 1):
+        r"""
+        Take tokens from the bucket, waiting until the bucket has
+        enough tokens.
+
+        Args:
+            tokens: The number of requests, a JSON-RPC batch takes one
+                token for every request in the batch.
+        """
+        wait_time = self._take(tokens)
+        while wait_time > 0:
+            time.sleep(wait_time)
+            wait_time = self._take(tokens)
+
+    async def acquire_async(self, tokens: int = 1):
+        r"""
+        Take tokens from the bucket, waiting on the event loop until
+        the bucket has enough tokens.
+
+        Args:
+            tokens: The number of requests.
+        """
+        wait_time = self._take(tokens)
+        while wait_time > 0:
+            await asyncio.sleep(wait_time)
+            wait_time = self._take(tokens)
+
+
+# the rate limiters of the endpoints, by endpoint uri
+_rate_limiters: dict[str, TokenBucket] = dict()
+# the rate set for the process and the rates of the running jobs,
+# by endpoint uri
+_process_rates: dict[str, float] = dict()
+_jobs_rates: dict[str, list[float]] = dict()
+_rate_limiters_lock = threading.Lock()
+
+
+def _update_rate_limiter(endpoint_uri: str):
+    r"""
+    Set the rate limiter of an endpoint to the lowest of its rates,
+    called with the lock of the rate limiters.
+    """
+    rates = list(_jobs_rates.get(endpoint_uri, []))
+    if endpoint_uri in _process_rates:
+        rates.append(_process_rates[endpoint_uri])
+    if len(rates) == 0:
+        _rate_limiters.pop(endpoint_uri, None)
+    elif endpoint_uri in _rate_limiters:
+        _rate_limiters[endpoint_uri].set_rate(min(rates))
+    else:
+        _rate_limiters[endpoint_uri] = TokenBucket(min(rates))
+
+
+def set_rate_limit(endpoint_uri: str, rate: float):
+    r"""
+    Limit the rate of the requests sent to an endpoint by this process.
+
+    Args:
+        endpoint_uri: The uri of the endpoint.
+        rate: The requests per second, None to remove the limit.
+    """
+    if rate is not None:
+        _check_rate(rate)
+    with _rate_limiters_lock:
+        if rate is None:
+            _process_rates.pop(endpoint_uri, None)
+        else:
+            _process_rates[endpoint_uri] = rate
+        _update_rate_limiter(endpoint_uri)
+
+
+@contextlib.contextmanager
+def rate_limit(endpoint_uris: list[str], rate: float):
+    r"""
+    Limit the rate of the requests sent to endpoints while the context
+    is active, as while a job runs. The lowest rate of the active
+    contexts and of set_rate_limit applies to an endpoint, the limit
+    of the context is removed when it exits.
+
+    Args:
+        endpoint_uris: The uris of the endpoints.
+        rate: The requests per second, None to not limit the rate.
+    """
+    if rate is None:
+        yield
+        return
+    _check_rate(rate)
+    with _rate_limiters_lock:
+        for endpoint_uri in endpoint_uris:
+            _jobs_rates.setdefault(endpoint_uri, []).append(rate)
+            _update_rate_limiter(endpoint_uri)
+    try:
+        yield
+    finally:
+        with _rate_limiters_lock:
+            for endpoint_uri in endpoint_uris:
+                _jobs_rates[endpoint_uri].remove(rate)
+                if len(_jobs_rates[endpoint_uri]) == 0:
+                    del _jobs_rates[endpoint_uri]
+                _update_rate_limiter(endpoint_uri)
+
+
+def _acquire_rate_limit(endpoint_uri: str, tokens: int = 1):
+    rate_limiter = _rate_limiters.get(endpoint_uri)
+    if rate_limiter is not None:
+        rate_limiter.acquire(tokens)
+
+
+async def _acquire_rate_limit_async(endpoint_uri: str, tokens: int = 1):
+    rate_limiter = _rate_limiters.get(endpoint_uri)
+    if rate_limiter is not None:
+        await rate_limiter.acquire_async(tokens)
+
+
+def is_transient_error(error: Exception) -> bool:
+    r"""
+    Check if an error of a request can be solved by sending the
+    request again.
+
+    Args:
+        error: The error of the request.
+
+    Returns:
+        True for the connection errors, the timeouts, the throttling
+        and the server errors of the endpoint.
+    """
+    if isinstance(error, requests.HTTPError):
+        status_code = getattr(error.response, 'status_code', None)
+        return status_code is None or status_code == 429 or status_code >= 500
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    # the errors of the async web3 provider
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status == 429 or error.status >= 500
+    if isinstance(error, (aiohttp.ClientConnectionError, TimeoutError)):
+        return True
+    # web3 raises the errors of the JSON-RPC responses as ValueError
+    if (type(error) is ValueError and len(error.args) > 0 and
+            isinstance(error.args[0], dict)):
+        return is_transient_error(RPCError(error.args[0]))
+    if isinstance(error, RPCError):
+        message = str(error).lower()
+        # the limit exceeded error of EIP-1474 and the messages
+        # of the throttling public endpoints
+        return (
+            error.code in (-32005, 429) or
+            'rate limit' in message or
+            'too many requests' in message
+        )
+    return False
+
+
+def call_with_retries(
+    call: Callable[[], Any],
+    max_retries: int = 3,
+    backoff: float = 0.5,
+    max_backoff: float = 30.0
+) -> Any:
+    r"""
+    Call a function, calling it again after the transient errors with
+    a jittered exponential backoff.
+
+    Args:
+        call: The function sending the requests.
+        max_retries: The maximum number of retries.
+        backoff: The seconds of the backoff of the first retry.
+        max_backoff: The maximum seconds of a backoff.
+
+    Returns:
+        The result of the function.
+    """
+    attempt = 0
+    while True:
+        try:
+            return call()
+        except Exception as error:
+            if attempt >= max_retries or not is_transient_error(error):
+                raise
+            wait_time = _get_retry_wait(
+                error,
+                attempt,
+                max_retries,
+                backoff,
+                max_backoff
+            )
+            attempt += 1
+            time.sleep(wait_time)
+
+
+async def call_with_retries_async(
+    call: Callable[[], Awaitable[Any]],
+    max_retries: int = 3,
+    backoff: float = 0.5,
+    max_backoff: float = 30.0
+) -> Any:
+    r"""
+    Await a coroutine function, awaiting it again after the transient
+    errors with a jittered exponential backoff.
+
+    Args:
+        call: The coroutine function sending the requests.
+        max_retries: The maximum number of retries.
+        backoff: The seconds of the backoff of the first retry.
+        max_backoff: The maximum seconds of a backoff.
+
+    Returns:
+        The result of the coroutine.
+    """
+    attempt = 0
+    while True:
+        try:
+            return await call()
+        except Exception as error:
+            if attempt >= max_retries or not is_transient_error(error):
+                raise
+            wait_time = _get_retry_wait(
+                error,
+                attempt,
+                max_retries,
+                backoff,
+                max_backoff
+            )
+            attempt += 1
+            await asyncio.sleep(wait_time)
+
+
+def _get_retry_wait(
+    error: Exception,
+    attempt: int,
+    max_retries: int,
+    backoff: float,
+    max_backoff: float
+) -> float:
+    r"""
+    Get the seconds to wait before the retry of a failed request and
+    count the retry.
+    """
+    # full jitter, the retries of the concurrent calls
+    # are spread instead of hitting the endpoint together
+    wait_time = random.uniform(
+        0,
+        min(max_backoff, backoff * 2 ** attempt)
+    )
+    RETRIES.inc()
+    logger.warning(
+        "Request failed, retry %d of %d in %.2f s: %s",
+        attempt + 1,
+        max_retries,
+        wait_time,
+        error
+    )
+    return wait_time
+
+
+class Endpoint:
+    r"""
+    An HTTP JSON-RPC endpoint of an endpoint pool, with its observed
+    latency and health.
+    """
+
+    def __init__(self, endpoint_uri: str):
+        r"""
+        Args:
+            endpoint_uri: The uri of the endpoint.
+        """
+        self.endpoint_uri = endpoint_uri
+        # the moving average of the latency of the requests, None
+        # until the first request is done
+        self.latency = None
+        # the endpoint is not used until this time after an error
+        self.unhealthy_until = 0.0
+        self.inflight_requests = 0
+        self.requests_count = 0
+        self.errors_count = 0
+
+    def is_healthy(self, now: float) -> bool:
+        r"""
+        If the endpoint can be used at a time of the monotonic clock.
+        """
+        return now >= self.unhealthy_until
+
+    def score(self) -> float:
+        r"""
+        The expected wait of a new request on the endpoint, the
+        endpoints without latency are tried first.
+        """
+        if self.latency is None:
+            return 0.0
+        return self.latency * (self.inflight_requests + 1)
+
+
+class EndpointPool:
+    r"""
+    A pool of HTTP JSON-RPC endpoints of the same chain. The requests go
+    to the endpoint with the lowest expected wait, fail over to the next
+    endpoint on errors and can be hedged on a second endpoint when
+    they are slow.
+    """
+
+    def __init__(
+        self,
+        endpoint_uris: list[str],
+        request_kwargs: dict = None,
+        unhealthy_seconds: float = 30.0,
+        hedge_after: float = None,
+        latency_smoothing: float = 0.2
+    ):
+        r"""
+        Args:
+            endpoint_uris: The uris of the endpoints.
+            request_kwargs: The keyword arguments of the HTTP requests.
+            unhealthy_seconds: The seconds an endpoint is not used after
+                an error.
+            hedge_after: The seconds after which a request still running
+                is sent again to a second endpoint, None to not hedge.
+            latency_smoothing: The weight of the last request in the
+                moving average of the latency.
+        """
+        if len(endpoint_uris) == 0:
+            raise ValueError("The endpoint pool needs an endpoint")
+        self.endpoints = [
+            Endpoint(endpoint_uri) for endpoint_uri in endpoint_uris
+        ]
+        self.request_kwargs = request_kwargs or {'timeout': 10}
+        self.unhealthy_seconds = unhealthy_seconds
+        self.hedge_after = hedge_after
+        self.latency_smoothing = latency_smoothing
+        self._lock = threading.Lock()
+        self._hedge_executor = None
+
+    def _select(self, excluded: list[Endpoint]) -> Endpoint:
+        r"""
+        Select the endpoint for a request and add it to the excluded
+        endpoints, the unhealthy endpoints are only used when all the
+        endpoints are unhealthy.
+        """
+        with self._lock:
+            now = time.monotonic()
+            candidates = [
+                endpoint
+                for endpoint in self.endpoints
+                if endpoint not in excluded
+            ]
+            if len(candidates) == 0:
+                return None
+            healthy_candidates = [
+                endpoint for endpoint in candidates
+                if endpoint.is_healthy(now)
+            ]
+            candidates = healthy_candidates or candidates
+            # random order between the endpoints with the same score
+            random.shuffle(candidates)
+            endpoint = min(candidates, key=Endpoint.score)
+            excluded.append(endpoint)
+            endpoint.inflight_requests += 1
+            endpoint.requests_count += 1
+            return endpoint
+
+    def _post_endpoint(
+        self,
+        endpoint: Endpoint,
+        data: bytes,
+        tokens: int
+    ) -> bytes:
+        r"""
+        Post a request to an endpoint and update its latency and
+        health.
+        """
+        _acquire_rate_limit(endpoint.endpoint_uri, tokens)
+        start_time = time.monotonic()
+        try:
+            response = _get_session().post(
+                endpoint.endpoint_uri,
+                data=data,
+                headers={'Content-Type': 'application/json'},
+                **self.request_kwargs
+            )
+            response.raise_for_status()
+        except requests.RequestException:
+            with self._lock:
+                endpoint.inflight_requests -= 1
+                endpoint.errors_count += 1
+                endpoint.unhealthy_until = (
+                    time.monotonic() + self.unhealthy_seconds
+                )
+            raise
+        latency = time.monotonic() - start_time
+        with self._lock:
+            endpoint.inflight_requests -= 1
+            if endpoint.latency is None:
+                endpoint.latency = latency
+            else:
+                endpoint.latency += self.latency_smoothing * (
+                    latency - endpoint.latency
+                )
+        return response.content
+
+    def _post_failover(
+        self,
+        data: bytes,
+        tokens: int,
+        excluded: list[Endpoint]
+    ) -> bytes:
+        r"""
+        Post a request to the endpoints in turn until one answers.
+        """
+        error = requests.ConnectionError("No endpoint left in the pool")
+        while True:
+            endpoint = self._select(excluded)
+            if endpoint is None:
+                raise error
+            try:
+                return self._post_endpoint(endpoint, data, tokens)
+            except requests.RequestException as endpoint_error:
+                logger.warning(
+                    "Endpoint %s failed: %s",
+                    endpoint.endpoint_uri,
+                    endpoint_error
+                )
+                error = endpoint_error
+
+    def post(self, data: bytes, tokens: int = 1) -> bytes:
+        r"""
+        Post a JSON-RPC request to the endpoints of the pool.
+
+        Args:
+            data: The encoded JSON-RPC request or batch.
+            tokens: The number of requests in the data.
+
+        Returns:
+            The raw response of the first endpoint that answers.
+
+        Raises:
+            requests.RequestException: If all the endpoints fail.
+        """
+        if self.hedge_after is None or len(self.endpoints) == 1:
+            return self._post_failover(data, tokens, list())
+        with self._lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=32,
+                    thread_name_prefix="pqcee-hedge"
+                )
+        # the endpoints tried by the request and by its hedge
+        excluded = list()
+        futures = [
+            self._hedge_executor.submit(
+                self._post_failover,
+                data,
+                tokens,
+                excluded
+            )
+        ]
+        done, _ = wait(futures, timeout=self.hedge_after)
+        if len(done) == 0:
+            logger.debug("Hedging a request after %s s", self.hedge_after)
+            futures.append(
+                self._hedge_executor.submit(
+                    self._post_failover,
+                    data,
+                    tokens,
+                    excluded
+                )
+            )
+        error = None
+        pending = set(futures)
+        while len(pending) > 0:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def stats(self) -> list[dict]:
+        r"""
+        Get the statistics of the endpoints of the pool.
+
+        Returns:
+            The uri, latency, health and counts of every endpoint.
+        """
+        with self._lock:
+            now = time.monotonic()
+            return [
+                dict(
+                    endpoint_uri=endpoint.endpoint_uri,
+                    latency=endpoint.latency,
+                    healthy=endpoint.is_healthy(now),
+                    inflight_requests=endpoint.inflight_requests,
+                    requests_count=endpoint.requests_count,
+                    errors_count=endpoint.errors_count
+                )
+                for endpoint in self.endpoints
+            ]
+
+
+class PooledHTTPProvider(web3.HTTPProvider):
+    r"""
+    A web3 HTTP provider sending the requests to an endpoint pool.
+    """
+
+    def __init__(self, endpoint_pool: EndpointPool):
+        r"""
+        Args:
+            endpoint_pool: The pool of the endpoints of the chain.
+        """
+        super().__init__(
+            endpoint_uri=endpoint_pool.endpoints[0].endpoint_uri,
+            request_kwargs=endpoint_pool.request_kwargs
+        )
+        self.endpoint_pool = endpoint_pool
+
+    def make_request(self, method, params):
+        request_data = self.encode_rpc_request(method, params)
+        return self.decode_rpc_response(self.endpoint_pool.post(request_data))
+
+
+def _post(provider: web3.HTTPProvider, payload: Any) -> Any:
+    r"""
+    Post a JSON-RPC payload to the endpoint of an HTTP provider, or to
+    its endpoint pool.
+    """
+    tokens = len(payload) if isinstance(payload, list) else 1
+    if isinstance(provider, PooledHTTPProvider):
+        return json.loads(provider.endpoint_pool.post(
+            json.dumps(payload).encode(),
+            tokens
+        ))
+    _acquire_rate_limit(provider.endpoint_uri, tokens)
+    response = _get_session().post(
+        provider.endpoint_uri,
+        json=payload,
+        **provider.get_request_kwargs()
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def get_endpoint_uris(web3_provider: web3.Web3) -> list[str]:
+    r"""
+    Get the uris of all the HTTP endpoints behind a web3 provider.
+
+    Args:
+        web3_provider: The web3 or async web3 provider for the
+            blockchain.
+
+    Returns:
+        The endpoint uris, empty if the provider is not an HTTP provider.
+    """
+    provider = web3_provider.provider
+    if isinstance(provider, PooledHTTPProvider):
+        return [
+            endpoint.endpoint_uri
+            for endpoint in provider.endpoint_pool.endpoints
+        ]
+    if isinstance(provider, (web3.HTTPProvider, web3.AsyncHTTPProvider)):
+        return [provider.endpoint_uri]
+    return []
+
+
+def get_endpoint_uri(web3_provider: web3.Web3) -> str:
+    r"""
+    Get the uri of the HTTP endpoint behind a web3 provider.
+
+    Args:
+        web3_provider: The web3 provider for the blockchain.
+
+    Returns:
+        The endpoint uri or None if the provider is not an HTTP provider.
+    """
+    provider = web3_provider.provider
+    if isinstance(provider, web3.HTTPProvider):
+        return provider.endpoint_uri
+    return None
+
+
+def make_request(
+    web3_provider: web3.Web3,
+    method: str,
+    params: list
+) -> Any:
+    r"""
+    Send one raw JSON-RPC request to the HTTP endpoint of the web3
+    provider, without the middlewares of web3.
+
+    Args:
+        web3_provider: The web3 provider for the blockchain.
+        method: The JSON-RPC method.
+        params: The params of the method.
+
+    Returns:
+        The result of the request.
+
+    Raises:
+        RPCError: If the endpoint returns an error.
+    """
+    element = _post(
+        web3_provider.provider,
+        {
+            'jsonrpc': '2.0',
+            'id': next(_request_ids),
+            'method': method,
+            'params': params
+        }
+    )
+    if 'error' in element:
+        raise RPCError(element['error'])
+    return element.get('result')
+
+
+def make_batch_request(
+    web3_provider: web3.Web3,
+    rpc_requests: list[tuple[str, list]]
+) -> list[Any]:
+    r"""
+    Send many JSON-RPC requests in one batch to the HTTP endpoint
+    of the web3 provider.
+
+    Args:
+        web3_provider: The web3 provider for the blockchain.
+        rpc_requests: The method and the params of every request.
+
+    Returns:
+        The result of every request in order, or a RPCError for
+        the requests that failed.
+
+    Raises:
+        RPCError: If the endpoint does not answer with a batch.
+    """
+    provider = web3_provider.provider
+    request_ids = [next(_request_ids) for _ in rpc_requests]
+    payload = [
+        {
+            'jsonrpc': '2.0',
+            'id': request_id,
+            'method': method,
+            'params': params
+        }
+        for request_id, (method, params) in zip(request_ids, rpc_requests)
+    ]
+    responses = _post(provider, payload)
+    # an endpoint without batch support answers with one error
+    if not isinstance(responses, list):
+        raise RPCError(responses.get('error', responses))
+    # the responses of a batch can come in any order
+    responses_by_id = {
+        element.get('id'): element for element in responses
+    }
+    results = list()
+    for request_id in request_ids:
+        element = responses_by_id.get(request_id)
+        if element is None:
+            results.append(RPCError("Missing response in batch"))
+        elif 'error' in element:
+            results.append(RPCError(element['error']))
+        else:
+            results.append(element.get('result'))
+    return results
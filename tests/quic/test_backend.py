@@ -153,4 +153,75 @@ def test_run_quic_script(simple_quic_backend):
     quic_script = simple_quic_backend.get_quic_circuit_string(qc)
     job = simple_quic_backend.run_quic_script(quic_script, shots=10)
     result = job.result()
-    assert result.get_counts() == {'11': 10}
\ No newline at end of file
+    assert result.get_counts() == {'11': 10}
+
+
+def test_has_only_terminal_measurements(simple_quic_backend):
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    assert simple_quic_backend.has_only_terminal_measurements(qc)
+    qc.x(1)
+    assert not simple_quic_backend.has_only_terminal_measurements(qc)
+
+
+def test_pack_quic_layers(simple_quic_backend):
+    qc = qiskit.QuantumCircuit(3)
+    qc.x(0)
+    qc.z(1)
+    qc.x(2)
+    qc.cx(0, 1)
+    qc.z(2)
+    packed_string = simple_quic_backend.get_quic_circuit_string(
+        qc, transpile=False
+    )
+    unpacked_string = simple_quic_backend.get_quic_circuit_string(
+        qc, transpile=False, pack_layers=False
+    )
+    assert packed_string.count(",") < unpacked_string.count(",")
+    assert Operator(qc).equiv(Operator(
+        simple_quic_backend.get_quantum_circuit_from_quic_string(packed_string)
+    ))
+    # h does not share a layer with the phase gates in the contract
+    qc = qiskit.QuantumCircuit(2)
+    qc.h(0)
+    qc.t(1)
+    assert simple_quic_backend.get_quic_circuit_string(
+        qc, transpile=False
+    ).count(",") == 1
+
+def test_quic_bytecode(simple_quic_backend):
+    qc = qiskit.QuantumCircuit(3)
+    qc.h(0)
+    qc.ccx(0, 1, 2)
+    qc.t(2)
+    circuit_code = simple_quic_backend.get_quic_circuit_bytecode(
+        qc, transpile=False
+    )
+    # the version, the qubits and 3 bytes for every gate
+    assert circuit_code == bytes([1, 3]) + b"H\x02\x00N\x00\x06T\x00\x00"
+    assert Operator(qc).equiv(Operator(
+        simple_quic_backend.get_quantum_circuit_from_quic_bytecode(
+            circuit_code
+        )
+    ))
+    with pytest.raises(ValueError):
+        simple_quic_backend.get_quantum_circuit_from_quic_bytecode(
+            circuit_code[:-1]
+        )
+
+def test_compact_qubits(simple_quic_backend):
+    qc = qiskit.QuantumCircuit(8)
+    qc.h(1)
+    qc.barrier()
+    qc.cx(1, 6)
+    compacted_circuit, qubits = simple_quic_backend.compact_qubits(qc)
+    assert qubits == (1, 6)
+    assert simple_quic_backend.get_quic_circuit_string(
+        compacted_circuit, transpile=False
+    ) == "HI,CN."
+    qc = qiskit.QuantumCircuit(2)
+    qc.h(0)
+    qc.cx(0, 1)
+    assert simple_quic_backend.compact_qubits(qc) == (qc, (0, 1))
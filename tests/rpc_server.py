@@ -0,0 +1,106 @@
+import http.server
+import json
+import threading
+import time
+
+import web3
+from web3._utils.encoding import Web3JsonEncoder
+
+
+class RPCStandInServer:
+    r"""
+    A local HTTP JSON-RPC endpoint, single and batch requests, backed
+    by the eth-tester chain of a web3 provider. The endpoint can inject
+    latency and failures.
+    """
+
+    def __init__(self, web3_provider: web3.Web3):
+        r"""
+        Args:
+            web3_provider: The web3 provider of an eth-tester chain.
+        """
+        self.request_func = web3_provider.provider.request_func(
+            web3_provider, []
+        )
+        self.requests_count = 0
+        self.batches_count = 0
+        # the seconds added to every HTTP request
+        self.latency = 0.0
+        # the number of the next HTTP requests answered with an error
+        self.failures_count = 0
+        self.http_requests_count = 0
+        self.lock = threading.Lock()
+        self.server = http.server.ThreadingHTTPServer(
+            ('127.0.0.1', 0),
+            self._handler_class()
+        )
+        self.thread = threading.Thread(
+            target=self.server.serve_forever,
+            daemon=True
+        )
+
+    @property
+    def endpoint_uri(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handle(self, request: dict) -> dict:
+        # eth-tester is not thread safe
+        with self.lock:
+            self.requests_count += 1
+            try:
+                response = self.request_func(
+                    request['method'],
+                    request.get('params', [])
+                )
+            except Exception as error:
+                response = {
+                    'error': {'code': -32000, 'message': str(error)}
+                }
+        response = dict(response)
+        response['jsonrpc'] = '2.0'
+        response['id'] = request.get('id')
+        return response
+
+    def _handler_class(self):
+        stand_in = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers['Content-Length'])
+                payload = json.loads(self.rfile.read(length))
+                with stand_in.lock:
+                    stand_in.http_requests_count += 1
+                    failure = stand_in.failures_count > 0
+                    if failure:
+                        stand_in.failures_count -= 1
+                time.sleep(stand_in.latency)
+                if failure:
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if isinstance(payload, list):
+                    stand_in.batches_count += 1
+                    response = [stand_in.handle(element) for element in payload]
+                else:
+                    response = stand_in.handle(payload)
+                body = json.dumps(response, cls=Web3JsonEncoder).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,90 @@
+import pytest
+
+import qiskit_pqcee_provider as qpp
+
+import asyncio
+import qiskit
+import web3
+from web3.providers.eth_tester import AsyncEthereumTesterProvider
+
+from .rpc_server import RPCStandInServer
+
+
+@pytest.fixture
+def local_pqcee_provider():
+    return qpp.LocalPqceeProvider(
+        approximation_depth=0,
+        approximation_recursion_degree=0
+    )
+
+
+@pytest.fixture
+def async_web3_provider(local_pqcee_provider):
+    # the async provider runs on the chain of the local provider
+    async_provider = AsyncEthereumTesterProvider()
+    async_provider.ethereum_tester = (
+        local_pqcee_provider.web3_provider.provider.ethereum_tester
+    )
+    return web3.AsyncWeb3(async_provider)
+
+
+def test_run_async_pqcee_backend(local_pqcee_provider, async_web3_provider):
+    circuits = list()
+    for index in range(2):
+        qc = qiskit.QuantumCircuit(2, 2, name="circuit_%d" % index)
+        if index == 0:
+            qc.x(0)
+        qc.cx(0, 1)
+        qc.measure([0, 1], [0, 1])
+        circuits.append(qc)
+
+    async def run():
+        async_provider = await qpp.BlockchainProvider.create_async(
+            async_web3_provider=async_web3_provider,
+            provider_address=local_pqcee_provider.web3_contract.address
+        )
+        backend = async_provider.get_backend('pqcee_simulator')
+        with pytest.raises(ValueError):
+            backend.run(circuits)
+        job = backend.run_async(
+            circuits,
+            shots=10,
+            max_shots_per_call=2,
+            max_inflight_calls=4
+        )
+        # the job runs on this loop, so it can only be awaited
+        with pytest.raises(qiskit.providers.JobError):
+            job.result()
+        return await job
+
+    result = asyncio.run(run())
+    assert result.get_counts() == [{'11': 10}, {'00': 10}]
+
+
+def test_run_async_retries_pqcee_backend(local_pqcee_provider):
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.x(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+
+    async def run(endpoint_uri: str):
+        async_provider = await qpp.BlockchainProvider.create_async(
+            async_web3_provider=web3.AsyncWeb3(
+                web3.AsyncHTTPProvider(endpoint_uri)
+            ),
+            provider_address=local_pqcee_provider.web3_contract.address
+        )
+        backend = async_provider.get_backend('pqcee_simulator')
+        rpc_stand_in.failures_count = 2
+        return await backend.run_async(
+            qc,
+            shots=3,
+            max_shots_per_call=1,
+            retry_backoff=0.01,
+            max_requests_per_second=100
+        )
+
+    with RPCStandInServer(local_pqcee_provider.web3_provider) as rpc_stand_in:
+        result = asyncio.run(run(rpc_stand_in.endpoint_uri))
+    # the shots are sent again after the errors of the endpoint
+    assert result.get_counts() == {'11': 3}
@@ -0,0 +1,52 @@
+import pytest
+
+import qiskit_pqcee_provider as qpp
+from qiskit_pqcee_provider.cache import ShotCache
+
+import numpy as np
+import qiskit
+
+@pytest.fixture
+def local_pqcee_backend():
+    return qpp.LocalPqceeProvider(
+        approximation_depth=0,
+        approximation_recursion_degree=0
+    ).get_backend('pqcee_simulator')
+
+def test_shot_cache_eviction(tmp_path):
+    shot_cache = ShotCache(tmp_path / "shots.db", max_entries=2)
+    keys = [
+        ShotCache.make_key(b"code", 2, "HI,CN.", seed, b"block")
+        for seed in range(3)
+    ]
+    shot_cache.put_many({keys[0]: 0, keys[1]: 3})
+    assert shot_cache.get_many([keys[0], keys[2]]) == {keys[0]: 0}
+    # the second key is the least recently used
+    shot_cache.put_many({keys[2]: 1})
+    assert shot_cache.get_many(keys) == {keys[0]: 0, keys[2]: 1}
+    assert shot_cache.stats() == dict(
+        hits=3,
+        misses=2,
+        evictions=1,
+        entries=2
+    )
+
+def test_run_cached_local_pqcee_backend(local_pqcee_backend, tmp_path):
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    cache_path = str(tmp_path / "shots.db")
+    block_number = local_pqcee_backend.web3_contract.w3.eth.block_number
+    counts = list()
+    for _ in range(2):
+        # the two jobs draw the same seeds
+        local_pqcee_backend.state_seed = np.random.RandomState(
+            np.random.MT19937(np.random.SeedSequence(0))
+        )
+        job = local_pqcee_backend.run(qc, shots=20, cache_path=cache_path)
+        counts.append(job.result().get_counts())
+        assert job.job_json['block_identifier'] == block_number
+    assert counts[0] == counts[1]
+    shot_cache = qpp.cache.get_shot_cache(cache_path)
+    assert shot_cache.stats()['hits'] == 20
@@ -0,0 +1,77 @@
+import pytest
+
+import qiskit_pqcee_provider as qpp
+from qiskit_pqcee_provider.checkpoint import CheckpointStore
+from qiskit.providers import JobError
+
+import numpy as np
+import qiskit
+
+@pytest.fixture
+def local_pqcee_provider():
+    return qpp.LocalPqceeProvider(
+        approximation_depth=0,
+        approximation_recursion_degree=0
+    )
+
+def test_checkpoint_store(tmp_path):
+    qc = qiskit.QuantumCircuit(1, 1)
+    qc.h(0)
+    qc.measure(0, 0)
+    checkpoint_store = CheckpointStore(tmp_path)
+    assert checkpoint_store.load_job("job") is None
+    checkpoint_store.save_job(
+        "job",
+        "backend",
+        "0x00",
+        dict(shots=6, random_seed=3, shots_callback=print),
+        [qc, qc]
+    )
+    checkpoint_store.add_shots("job", 0, 0, [0, 1, 1])
+    # the shots after a missing shot run again
+    checkpoint_store.add_shots("job", 1, 1, [1])
+    checkpoint_store.add_shots("job", 0, 3, [0, 0, 1])
+    checkpoint_store.set_experiment_done("job", 0)
+    checkpoint = checkpoint_store.load_job("job")
+    assert checkpoint['job_json'] == dict(shots=6, random_seed=3)
+    assert checkpoint['circuits'] == [qc, qc]
+    assert checkpoint['outcomes'] == {0: [0, 1, 1, 0, 0, 1], 1: []}
+    assert checkpoint['done_experiments'] == {0: False}
+
+def test_retrieve_job(local_pqcee_provider, tmp_path):
+    local_pqcee_backend = local_pqcee_provider.get_backend('pqcee_simulator')
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+
+    def crash(index, shots_results):
+        raise RuntimeError("crash")
+
+    memories = list()
+    for shots_callback in (None, crash):
+        # the two jobs draw the same seeds
+        local_pqcee_backend.state_seed = np.random.RandomState(
+            np.random.MT19937(np.random.SeedSequence(0))
+        )
+        job = local_pqcee_backend.run(
+            qc,
+            shots=20,
+            shots_per_round=5,
+            checkpoint_dir=str(tmp_path),
+            shots_callback=shots_callback
+        )
+        if shots_callback is None:
+            job.result()
+        else:
+            with pytest.raises(JobError):
+                job.result()
+        memories.append(job.experiment_results[0])
+    assert len(memories[1]) == 5
+    resumed_job = local_pqcee_provider.retrieve_job(job.job_id())
+    assert resumed_job.job_id() == job.job_id()
+    assert sum(resumed_job.result().get_counts().values()) == 20
+    # the resumed shots keep their seeds
+    assert resumed_job.experiment_results[0] == memories[0]
+    with pytest.raises(JobError):
+        local_pqcee_provider.retrieve_job("unknown", str(tmp_path))
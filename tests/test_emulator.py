@@ -0,0 +1,121 @@
+import pytest
+
+import qiskit_pqcee_provider as qpp
+from qiskit_pqcee_provider.emulator import run_qscript, QScriptEmulator
+
+import qiskit
+
+# scripts covering every gate handler of the backend contract,
+# the T rescaling and the mid-circuit measurement
+CONFORMANCE_SCRIPTS = [
+    (2, "XI,CN."),
+    (2, "HI,CN."),
+    (2, "HY,ZH,PI,Ip."),
+    (3, "HHH,TIt,HIH,CCN,ITT,HHH."),
+    (2, "HI,CT,IH,Ct,HH."),
+    (2, "HH,mI,HT,Im,HH."),
+    (3, "HYH,CIP,IHm,CpI,tHH,mmm."),
+]
+
+
+@pytest.fixture
+def local_pqcee_backend():
+    return qpp.LocalPqceeProvider(
+        approximation_depth=0,
+        approximation_recursion_degree=0
+    ).get_backend('pqcee_simulator')
+
+
+@pytest.mark.parametrize("num_qubits, script", CONFORMANCE_SCRIPTS)
+def test_emulator_conformance(local_pqcee_backend, num_qubits, script):
+    # the calls run on the latest block
+    block = local_pqcee_backend.web3_contract.w3.eth.get_block('latest')
+    seeds = list(range(0, 65535, 4099))
+    contract_functions = local_pqcee_backend.web3_contract.functions
+    contract_results = [
+        contract_functions.runQScript(num_qubits, script, seed).call()
+        for seed in seeds
+    ]
+    emulator_results = run_qscript(
+        num_qubits,
+        script,
+        seeds,
+        block.number,
+        block.timestamp
+    ).tolist()
+    assert emulator_results == contract_results
+
+
+@pytest.mark.parametrize("num_qubits, script", CONFORMANCE_SCRIPTS[:5])
+def test_emulator_statevector_conformance(
+    local_pqcee_backend,
+    num_qubits,
+    script
+):
+    contract_state = (
+        local_pqcee_backend.web3_contract.functions.getStatevector(
+            num_qubits, script, 0
+        ).call()
+    )
+    emulator_state = QScriptEmulator(num_qubits, script).get_statevector()
+    assert list(emulator_state) == list(contract_state)
+
+
+def test_emulator_statevector():
+    real_state, imaginary_state = QScriptEmulator(
+        2, "HI,CN."
+    ).get_statevector()
+    assert real_state == [1, 0, 0, 1]
+    assert imaginary_state == [0, 0, 0, 0]
+
+
+def test_run_emulator_backend():
+    backend = qpp.PqceeEmulatorBackend()
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.x(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    job = backend.run(qc, shots=100000)
+    result = job.result()
+    assert result.get_counts() == {'11': 100000}
+
+
+def test_run_emulator_backend_circuits():
+    backend = qpp.PqceeEmulatorBackend()
+    circuits = list()
+    for index in range(2):
+        qc = qiskit.QuantumCircuit(2, 2, name="circuit_%d" % index)
+        if index == 0:
+            qc.x(0)
+        qc.cx(0, 1)
+        qc.measure([0, 1], [0, 1])
+        circuits.append(qc)
+    result = backend.run(circuits, shots=100).result()
+    assert result.get_counts() == [{'11': 100}, {'00': 100}]
+    assert result.get_counts(circuits[1]) == {'00': 100}
+
+
+def test_run_emulator_backend_conformance(local_pqcee_backend):
+    # every circuit of a job gets the seeds of its own experiment
+    circuits = list()
+    for index in range(3):
+        qc = qiskit.QuantumCircuit(2, 2, name="circuit_%d" % index)
+        qc.h(0)
+        qc.h(1)
+        qc.measure(0, 0)
+        qc.cx(0, 1)
+        qc.measure([0, 1], [0, 1])
+        circuits.append(qc)
+    block = local_pqcee_backend.web3_contract.w3.eth.get_block('latest')
+    contract_counts = local_pqcee_backend.run(
+        circuits,
+        shots=20,
+        register_circuits=False
+    ).result().get_counts()
+    emulator_counts = qpp.PqceeEmulatorBackend().run(
+        circuits,
+        shots=20,
+        block_number=block.number,
+        block_timestamp=block.timestamp
+    ).result().get_counts()
+    assert emulator_counts == contract_counts
@@ -0,0 +1,33 @@
+from qiskit.providers.jobstatus import JobStatus
+from qiskit_pqcee_provider.executor import JobExecutor
+
+import threading
+
+
+class BlockedJob:
+    def __init__(self, event):
+        self.event = event
+        self.job_status = None
+
+    def submit(self):
+        self.job_status = JobStatus.RUNNING
+        self.event.wait()
+        self.job_status = JobStatus.DONE
+
+
+def test_job_executor():
+    event = threading.Event()
+    job_executor = JobExecutor(max_workers=2, max_queued_jobs=4)
+    jobs = [BlockedJob(event) for _ in range(5)]
+    for job in jobs:
+        job_executor.submit(job)
+    # two jobs run and the other ones wait for a worker
+    while job_executor.inflight_jobs < 2:
+        event.wait(0.01)
+    assert job_executor.queue_depth == 3
+    assert job_executor.workers == 2
+    assert [job.job_status for job in jobs].count(JobStatus.QUEUED) == 3
+    event.set()
+    job_executor.join()
+    assert all(job.job_status is JobStatus.DONE for job in jobs)
+    assert job_executor.inflight_jobs == 0
@@ -1,8 +1,16 @@
 import pytest
 
 import qiskit_pqcee_provider as qpp
+from qiskit_pqcee_provider.job import confidence_interval_stopping
 
+from concurrent.futures import ThreadPoolExecutor
+from eth_utils import keccak
+import numpy as np
 import qiskit
+from qiskit.providers import JobError
+from qiskit.providers.jobstatus import JobStatus
+from web3.exceptions import TimeExhausted
+import threading
 
 @pytest.fixture
 def local_pqcee_backend():
@@ -18,4 +26,422 @@ def test_run_local_pqcee_backend(local_pqcee_backend):
     qc.measure([0, 1], [0, 1])
     job = local_pqcee_backend.run(qc, shots=10)
     result = job.result()
-    assert result.get_counts() == {'11': 10}
\ No newline at end of file
+    assert result.get_counts() == {'11': 10}
+
+def test_run_shots_local_pqcee_backend(local_pqcee_backend):
+    assert local_pqcee_backend.supports_function('runQScriptShots')
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    quic_string = local_pqcee_backend.get_quic_circuit_string(qc)
+    seeds = [1, 2, 3, 4, 5]
+    contract_functions = local_pqcee_backend.web3_contract.functions
+    batched_results = contract_functions.runQScriptShots(
+        2, quic_string, seeds
+    ).call()
+    single_results = [
+        contract_functions.runQScript(2, quic_string, seed).call()
+        for seed in seeds
+    ]
+    assert batched_results == single_results
+
+
+def test_run_chunked_local_pqcee_backend(local_pqcee_backend):
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.x(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    job = local_pqcee_backend.run(qc, shots=10, max_shots_per_call=3)
+    result = job.result()
+    assert result.get_counts() == {'11': 10}
+
+
+def test_run_sample_local_pqcee_backend(local_pqcee_backend):
+    assert local_pqcee_backend.supports_function('runQScriptSample')
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    quic_string = local_pqcee_backend.get_quic_circuit_string(qc)
+    seeds = [1, 2, 3, 4, 5]
+    contract_functions = local_pqcee_backend.web3_contract.functions
+    sampled_results = contract_functions.runQScriptSample(
+        2, quic_string, seeds
+    ).call()
+    single_results = [
+        contract_functions.runQScript(2, quic_string, seed).call()
+        for seed in seeds
+    ]
+    assert sampled_results == single_results
+
+
+def test_run_bytecode_local_pqcee_backend(local_pqcee_backend):
+    assert local_pqcee_backend.supports_function('runQBytecodeShots')
+    qc = qiskit.QuantumCircuit(3, 3)
+    qc.h(0)
+    qc.t(1)
+    qc.cx(0, 1)
+    qc.ccx(0, 1, 2)
+    qc.measure(1, 1)
+    qc.h(2)
+    qc.measure([0, 1, 2], [0, 1, 2])
+    quic_string = local_pqcee_backend.get_quic_circuit_string(qc)
+    circuit_code = local_pqcee_backend.get_quic_circuit_bytecode(qc)
+    seeds = [1, 2, 3, 4, 5]
+    contract_functions = local_pqcee_backend.web3_contract.functions
+    bytecode_results = contract_functions.runQBytecodeShots(
+        circuit_code, seeds
+    ).call()
+    string_results = contract_functions.runQScriptShots(
+        3, quic_string, seeds
+    ).call()
+    assert bytecode_results == string_results
+    assert contract_functions.runQBytecodeShots(
+        circuit_code, seeds
+    ).estimate_gas() < contract_functions.runQScriptShots(
+        3, quic_string, seeds
+    ).estimate_gas()
+    with pytest.raises(Exception):
+        contract_functions.runQBytecodeSample(circuit_code, seeds).call()
+
+
+def test_run_by_id_local_pqcee_backend(local_pqcee_backend):
+    assert local_pqcee_backend.can_register_circuits()
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    circuit_code = local_pqcee_backend.get_quic_circuit_bytecode(qc)
+    circuit_id = local_pqcee_backend.register_circuit(circuit_code)
+    contract_functions = local_pqcee_backend.web3_contract.functions
+    assert contract_functions.isCircuitRegistered(circuit_id).call()
+    seeds = [1, 2, 3, 4, 5]
+    assert contract_functions.runByIdShots(
+        circuit_id, seeds
+    ).call() == contract_functions.runQBytecodeShots(
+        circuit_code, seeds
+    ).call()
+    # the jobs of the same circuit reuse the registered id
+    counts = list()
+    for register_circuits in (True, False):
+        local_pqcee_backend.state_seed = np.random.RandomState(
+            np.random.MT19937(np.random.SeedSequence(0))
+        )
+        counts.append(local_pqcee_backend.run(
+            qc,
+            shots=10,
+            register_circuits=register_circuits
+        ).result().get_counts())
+    assert local_pqcee_backend.circuit_ids == {
+        keccak(circuit_code): circuit_id
+    }
+    assert counts[0] == counts[1]
+
+
+
+def test_register_circuit_once_local_pqcee_backend(local_pqcee_backend):
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    circuit_code = local_pqcee_backend.get_quic_circuit_bytecode(qc)
+    send_circuit_registration = local_pqcee_backend._send_circuit_registration
+    sending = threading.Event()
+    sent = threading.Event()
+    sent_codes = list()
+
+    def wait_for_receipt(circuit_code):
+        sent_codes.append(circuit_code)
+        sending.set()
+        assert sent.wait(10)
+        return send_circuit_registration(circuit_code)
+
+    local_pqcee_backend._send_circuit_registration = wait_for_receipt
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        circuit_ids = [
+            executor.submit(local_pqcee_backend.register_circuit, circuit_code)
+            for _ in range(3)
+        ]
+        assert sending.wait(10)
+        # the ids can be looked up while the receipt is awaited
+        assert local_pqcee_backend._circuit_ids_lock.acquire(timeout=10)
+        local_pqcee_backend._circuit_ids_lock.release()
+        sent.set()
+        circuit_ids = [circuit_id.result() for circuit_id in circuit_ids]
+    assert sent_codes == [circuit_code]
+    assert len(set(circuit_ids)) == 1
+
+
+def test_register_circuit_timeout_local_pqcee_backend(local_pqcee_backend):
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.x(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+
+    def time_out(circuit_code):
+        raise TimeExhausted("The receipt was not found")
+
+    # the circuit runs with its bytecode when the registration times out
+    local_pqcee_backend._send_circuit_registration = time_out
+    result = local_pqcee_backend.run(
+        qc,
+        shots=10,
+        register_circuits=True
+    ).result()
+    assert result.get_counts() == {'11': 10}
+    assert local_pqcee_backend.circuit_ids == dict()
+
+def test_run_compact_qubits_local_pqcee_backend(local_pqcee_backend):
+    qc = qiskit.QuantumCircuit(4, 4)
+    qc.x(0)
+    qc.cx(0, 3)
+    qc.measure([0, 1, 2, 3], [0, 1, 2, 3])
+    experiment = local_pqcee_backend.encode_circuit(
+        qc,
+        local_pqcee_backend._get_run_options(dict())
+    )
+    # only the 2 qubits with gates run on the contract
+    assert experiment['num_qubits'] == 2
+    assert experiment['qubits'] == (0, 3)
+    job = local_pqcee_backend.run(qc, shots=10, memory=True)
+    result = job.result()
+    assert result.get_counts() == {'1001': 10}
+    assert result.get_memory() == ['1001'] * 10
+
+
+def test_run_inplace_local_pqcee_backend():
+    local_pqcee_provider = qpp.LocalPqceeProvider(
+        approximation_depth=0,
+        approximation_recursion_degree=0,
+        deploy_inplace_backend=True
+    )
+    local_pqcee_backend = local_pqcee_provider.get_backend('pqcee_simulator')
+    inplace_backend = local_pqcee_provider.get_backend(
+        'pqcee_inplace_simulator'
+    )
+    qc = qiskit.QuantumCircuit(3, 3)
+    qc.h(0)
+    qc.t(1)
+    qc.y(2)
+    qc.cx(0, 1)
+    qc.ccx(0, 1, 2)
+    qc.measure(1, 1)
+    qc.h(2)
+    qc.z(0)
+    qc.measure([0, 1, 2], [0, 1, 2])
+    quic_string = local_pqcee_backend.get_quic_circuit_string(qc)
+    circuit_code = local_pqcee_backend.get_quic_circuit_bytecode(qc)
+    seeds = [1, 2, 3, 4, 5]
+    contract_functions = local_pqcee_backend.web3_contract.functions
+    inplace_functions = inplace_backend.web3_contract.functions
+    # the same integer amplitudes and so the same outcomes
+    for seed in seeds:
+        for script in (quic_string, "HHP,mtN,CCp,IYT."):
+            assert inplace_functions.getStatevector(
+                3, script, seed
+            ).call() == contract_functions.getStatevector(
+                3, script, seed
+            ).call()
+    assert inplace_functions.runQBytecodeShots(
+        circuit_code, seeds
+    ).call() == contract_functions.runQBytecodeShots(
+        circuit_code, seeds
+    ).call()
+    assert inplace_functions.runQScriptShots(
+        3, quic_string, seeds
+    ).estimate_gas() < contract_functions.runQScriptShots(
+        3, quic_string, seeds
+    ).estimate_gas()
+
+
+def test_get_statevector_local_pqcee_backend(local_pqcee_backend):
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.x(0)
+    qc.cx(0, 1)
+    quic_string = local_pqcee_backend.get_quic_circuit_string(qc)
+    real_state, imaginary_state = (
+        local_pqcee_backend.web3_contract.functions.getStatevector(
+            2, quic_string, 0
+        ).call()
+    )
+    assert real_state == [0, 0, 0, 1]
+    assert imaginary_state == [0, 0, 0, 0]
+
+
+def test_run_local_sampling_local_pqcee_backend(local_pqcee_backend):
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    job = local_pqcee_backend.run(
+        qc,
+        shots=100000,
+        execution_mode="local"
+    )
+    counts = job.result().get_counts()
+    assert set(counts) == {'00', '11'}
+    assert sum(counts.values()) == 100000
+
+
+def test_run_shots_limit_local_pqcee_backend(local_pqcee_backend):
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.h(0)
+    qc.measure(0, 0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    # only the local execution mode runs more than 4096 shots
+    with pytest.raises(ValueError):
+        local_pqcee_backend.run(qc, shots=100000)
+    with pytest.raises(ValueError):
+        local_pqcee_backend.set_options(shots=100000)
+    local_pqcee_backend.set_options(shots=100000, execution_mode="local")
+    with pytest.raises(ValueError):
+        local_pqcee_backend.set_options(execution_mode="contract")
+    # the mid-circuit measurement runs every shot on the contract
+    job = local_pqcee_backend.run(qc)
+    with pytest.raises(JobError):
+        job.result(timeout=60)
+
+
+def test_run_concurrent_local_pqcee_backend(local_pqcee_backend):
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.x(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    job = local_pqcee_backend.run(
+        qc,
+        shots=12,
+        max_shots_per_call=1,
+        max_inflight_calls=4
+    )
+    result = job.result()
+    assert result.get_counts() == {'11': 12}
+
+
+def test_run_pinned_block_local_pqcee_backend(local_pqcee_backend):
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    w3 = local_pqcee_backend.web3_contract.w3
+    block_number = w3.eth.block_number
+    results = list()
+    for _ in range(2):
+        # the two jobs draw the same seeds
+        local_pqcee_backend.state_seed = np.random.RandomState(
+            np.random.MT19937(np.random.SeedSequence(0))
+        )
+        job = local_pqcee_backend.run(
+            qc,
+            shots=20,
+            block_identifier=block_number
+        )
+        results.append(job.result())
+        # the randomness of the next block is different
+        w3.provider.ethereum_tester.mine_blocks(1)
+    assert results[0].get_counts() == results[1].get_counts()
+    assert results[0].metadata['block_number'] == block_number
+    assert (
+        results[0].metadata['block_hash'] ==
+        '0x' + bytes(w3.eth.get_block(block_number)['hash']).hex()
+    )
+
+
+def test_run_error_local_pqcee_backend(local_pqcee_backend):
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.x(0)
+    qc.measure([0, 1], [0, 1])
+
+    def shots_callback(index, shots_results):
+        raise ValueError("Failed shots callback")
+
+    job = local_pqcee_backend.run(qc, shots=1, shots_callback=shots_callback)
+    with pytest.raises(JobError):
+        job.result(timeout=60)
+    assert job.status() is JobStatus.ERROR
+
+
+def test_run_early_stopping_local_pqcee_backend(local_pqcee_backend):
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.x(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    rounds_results = list()
+    job = local_pqcee_backend.run(
+        qc,
+        shots=100,
+        shots_per_round=10,
+        shots_callback=lambda index, shots_results: rounds_results.append(
+            shots_results
+        ),
+        early_stopping=confidence_interval_stopping(
+            ['11'],
+            max_width=0.1,
+            min_shots=20
+        )
+    )
+    assert list(job.iter_shots(timeout=60)) == ['11'] * 20
+    result = job.result()
+    assert result.get_counts() == {'11': 20}
+    assert result.results[0].metadata['early_stopped']
+    assert rounds_results == [['11'] * 10] * 2
+    assert job.partial_counts() == {'11': 20}
+
+
+def test_run_circuits_local_pqcee_backend(local_pqcee_backend):
+    circuits = list()
+    for index in range(3):
+        qc = qiskit.QuantumCircuit(2, 2, name="circuit_%d" % index)
+        if index != 1:
+            qc.x(0)
+        qc.cx(0, 1)
+        qc.measure([0, 1], [0, 1])
+        circuits.append(qc)
+    job = local_pqcee_backend.run(circuits, shots=10)
+    result = job.result()
+    assert result.get_counts() == [{'11': 10}, {'00': 10}, {'11': 10}]
+    assert result.get_counts(circuits[1]) == {'00': 10}
+    # the identical circuits are encoded and run together
+    assert job.experiments[0] is job.experiments[2]
+
+def test_run_memory_local_pqcee_backend(local_pqcee_backend):
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    job = local_pqcee_backend.run(qc, shots=20)
+    result = job.result()
+    # the memory of the shots is only in the result when requested
+    assert 'memory' not in result.data()
+    assert job.experiment_outcomes[0].dtype == np.uint16
+    job = local_pqcee_backend.run(qc, shots=20, memory=True)
+    memory = job.result().get_memory()
+    assert len(memory) == 20
+    assert set(memory) <= {'00', '11'}
+    assert job.result().get_counts() == {
+        bitstring: memory.count(bitstring) for bitstring in set(memory)
+    }
+
+def test_run_timing_local_pqcee_backend(local_pqcee_backend):
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    result = local_pqcee_backend.run(qc, shots=10).result()
+    timing = result.metadata['timing']
+    for name in (
+        'queue',
+        'transpile_circuit',
+        'get_quic_circuit_string',
+        'decode',
+        'rpc_latency_p50',
+        'rpc_latency_p95',
+        'rpc_latency_max',
+        'total'
+    ):
+        assert timing[name] >= 0
+    assert timing['rpc_requests'] > 0
+    assert timing['rpc_latency_p50'] <= timing['rpc_latency_max']
+    # the gas is estimated to batch the shots
+    assert result.results[0].metadata['estimated_gas'] > 0
@@ -0,0 +1,72 @@
+import pytest
+
+import qiskit_pqcee_provider as qpp
+from qiskit_pqcee_provider.metrics import MetricsRegistry
+from qiskit_pqcee_provider.metrics import export_dict
+from qiskit_pqcee_provider.metrics import export_prometheus
+from qiskit_pqcee_provider.metrics import start_metrics_server
+
+import qiskit
+import requests
+
+@pytest.fixture
+def local_pqcee_provider():
+    return qpp.LocalPqceeProvider(
+        approximation_depth=0,
+        approximation_recursion_degree=0
+    )
+
+def test_metrics_registry():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "The requests.").inc(backend="a")
+    registry.counter("requests_total", "The requests.").inc(2, backend="a")
+    registry.gauge("queued", "The queued jobs.").inc(3)
+    registry.gauge("queued", "The queued jobs.").dec()
+    latency = registry.histogram("latency", "The latency.", (0.1, 1.0))
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(2.0)
+    with pytest.raises(ValueError):
+        registry.gauge("requests_total", "The requests.")
+    snapshot = export_dict(registry)
+    assert snapshot['requests_total']['values'] == [
+        dict(labels=dict(backend="a"), value=3)
+    ]
+    assert snapshot['queued']['values'][0]['value'] == 2
+    assert snapshot['latency']['values'][0]['value']['count'] == 3
+    text = export_prometheus(registry)
+    assert '# TYPE latency histogram' in text
+    assert 'latency_bucket{le="0.1"} 1' in text
+    assert 'latency_bucket{le="1.0"} 2' in text
+    assert 'latency_bucket{le="+Inf"} 3' in text
+    assert 'requests_total{backend="a"} 3' in text
+
+def test_metrics_server():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "The requests.").inc()
+    server = start_metrics_server(registry)
+    try:
+        host, port = server.server_address[:2]
+        response = requests.get("http://%s:%d/metrics" % (host, port))
+        assert response.status_code == 200
+        assert response.text == export_prometheus(registry)
+    finally:
+        server.shutdown()
+
+def test_provider_metrics_local_pqcee(local_pqcee_provider):
+    local_pqcee_backend = local_pqcee_provider.get_backend('pqcee_simulator')
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    local_pqcee_provider.metrics.clear()
+    local_pqcee_backend.run(qc, shots=10).result()
+    metrics = local_pqcee_provider.get_metrics()
+    assert metrics['pqcee_shots_total']['values'] == [
+        dict(labels=dict(backend=local_pqcee_backend.name), value=10)
+    ]
+    assert metrics['pqcee_rpc_requests_total']['values'][0]['value'] > 0
+    assert metrics['pqcee_transpile_seconds']['values'][0]['labels'] == (
+        dict(num_qubits='2')
+    )
+    assert metrics['pqcee_inflight_shots']['values'][0]['value'] == 0
@@ -0,0 +1,202 @@
+import pytest
+
+import qiskit_pqcee_provider as qpp
+from qiskit_pqcee_provider.rpc import RPCError, make_batch_request
+from qiskit_pqcee_provider.rpc import EndpointPool, PooledHTTPProvider
+from qiskit_pqcee_provider.rpc import TokenBucket, call_with_retries
+from qiskit_pqcee_provider.rpc import _rate_limiters, rate_limit
+from qiskit_pqcee_provider.rpc import call_with_retries_async
+from qiskit_pqcee_provider.rpc import set_rate_limit
+
+import asyncio
+import qiskit
+import time
+import web3
+
+from .rpc_server import RPCStandInServer
+
+
+@pytest.fixture
+def local_pqcee_provider():
+    return qpp.LocalPqceeProvider(
+        approximation_depth=0,
+        approximation_recursion_degree=0
+    )
+
+
+@pytest.fixture
+def rpc_stand_in(local_pqcee_provider):
+    with RPCStandInServer(local_pqcee_provider.web3_provider) as stand_in:
+        yield stand_in
+
+
+@pytest.fixture
+def http_pqcee_backend(local_pqcee_provider, rpc_stand_in):
+    web3_provider = web3.Web3(
+        web3.Web3.HTTPProvider(endpoint_uri=rpc_stand_in.endpoint_uri)
+    )
+    return qpp.BlockchainProvider(
+        web3_provider=web3_provider,
+        provider_address=local_pqcee_provider.web3_contract.address
+    ).get_backend('pqcee_simulator')
+
+
+def test_make_batch_request(http_pqcee_backend, rpc_stand_in):
+    results = make_batch_request(
+        http_pqcee_backend.web3_contract.w3,
+        [('eth_blockNumber', []), ('eth_unknownMethod', [])]
+    )
+    assert rpc_stand_in.batches_count == 1
+    assert not isinstance(results[0], RPCError)
+    assert isinstance(results[1], RPCError)
+
+
+def test_run_batch_http_pqcee_backend(http_pqcee_backend, rpc_stand_in):
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.x(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    job = http_pqcee_backend.run(
+        qc,
+        shots=12,
+        max_shots_per_call=1,
+        rpc_batch_size=4
+    )
+    result = job.result()
+    assert result.get_counts() == {'11': 12}
+    assert rpc_stand_in.batches_count == 3
+
+
+def test_run_raw_http_pqcee_backend(http_pqcee_backend, rpc_stand_in):
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.x(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    requests_count = rpc_stand_in.requests_count
+    job = http_pqcee_backend.run(qc, shots=5, max_shots_per_call=1)
+    result = job.result()
+    assert result.get_counts() == {'11': 5}
+    assert rpc_stand_in.requests_count - requests_count == 5
+    assert rpc_stand_in.batches_count == 0
+
+
+@pytest.fixture
+def rpc_stand_ins(local_pqcee_provider):
+    with RPCStandInServer(local_pqcee_provider.web3_provider) as first, \
+            RPCStandInServer(local_pqcee_provider.web3_provider) as second:
+        yield first, second
+
+
+def test_endpoint_pool_failover(local_pqcee_provider, rpc_stand_ins):
+    first, second = rpc_stand_ins
+    first.failures_count = 1000
+    pool_provider = qpp.BlockchainProvider.from_endpoints(
+        [first.endpoint_uri, second.endpoint_uri],
+        provider_address=local_pqcee_provider.web3_contract.address
+    )
+    backend = pool_provider.get_backend('pqcee_simulator')
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.x(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    result = backend.run(qc, shots=5, max_shots_per_call=1).result()
+    assert result.get_counts() == {'11': 5}
+    # the failing endpoint is not used after its first error
+    assert first.http_requests_count == 1
+    endpoints_stats = pool_provider.endpoint_pool.stats()
+    assert not endpoints_stats[0]['healthy']
+    assert endpoints_stats[1]['healthy']
+
+
+def test_endpoint_pool_hedging(local_pqcee_provider, rpc_stand_ins):
+    first, second = rpc_stand_ins
+    endpoint_pool = EndpointPool(
+        [first.endpoint_uri, second.endpoint_uri],
+        hedge_after=0.05
+    )
+    w3 = web3.Web3(PooledHTTPProvider(endpoint_pool))
+    # the first endpoint is the fastest one until it slows down
+    endpoint_pool.endpoints[1].latency = 1.0
+    first.latency = 2.0
+    start_time = time.monotonic()
+    block_number = local_pqcee_provider.web3_provider.eth.block_number
+    assert w3.eth.block_number == block_number
+    assert time.monotonic() - start_time < 1.0
+    assert second.http_requests_count == 1
+
+
+def test_run_retries_http_pqcee_backend(http_pqcee_backend, rpc_stand_in):
+    qc = qiskit.QuantumCircuit(2, 2)
+    qc.x(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    http_requests_count = rpc_stand_in.http_requests_count
+    rpc_stand_in.failures_count = 2
+    job = http_pqcee_backend.run(
+        qc,
+        shots=3,
+        max_shots_per_call=1,
+        retry_backoff=0.01,
+        max_requests_per_second=100
+    )
+    assert job.result().get_counts() == {'11': 3}
+    assert rpc_stand_in.http_requests_count - http_requests_count == 5
+
+
+def test_call_with_retries():
+    errors = [RPCError({'code': -32005, 'message': 'limit exceeded'})]
+
+    def call():
+        if len(errors) > 0:
+            raise errors.pop()
+        return 'result'
+
+    assert call_with_retries(call, backoff=0.01) == 'result'
+    with pytest.raises(RPCError):
+        errors.append(RPCError({'code': 3, 'message': 'execution reverted'}))
+        call_with_retries(call, backoff=0.01)
+
+
+def test_call_with_retries_async():
+    errors = [RPCError({'code': 429, 'message': 'too many requests'})]
+
+    async def call():
+        if len(errors) > 0:
+            raise errors.pop()
+        return 'result'
+
+    assert asyncio.run(call_with_retries_async(call, backoff=0.01)) == (
+        'result'
+    )
+    with pytest.raises(ValueError):
+        errors.append(ValueError({'code': 3, 'message': 'reverted'}))
+        asyncio.run(call_with_retries_async(call, backoff=0.01))
+
+
+def test_token_bucket():
+    token_bucket = TokenBucket(rate=50)
+    start_time = time.monotonic()
+    for _ in range(75):
+        token_bucket.acquire()
+    # the first second of requests is a burst
+    assert 0.4 < time.monotonic() - start_time < 1.0
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+    with pytest.raises(ValueError):
+        token_bucket.set_rate(-1)
+
+
+def test_rate_limit():
+    endpoint_uri = "http://127.0.0.1:1/rate_limit"
+    with rate_limit([endpoint_uri], 50):
+        with rate_limit([endpoint_uri], 10):
+            assert _rate_limiters[endpoint_uri].rate == 10
+        assert _rate_limiters[endpoint_uri].rate == 50
+    # the limit of the jobs is removed when they are done
+    assert endpoint_uri not in _rate_limiters
+    set_rate_limit(endpoint_uri, 20)
+    with rate_limit([endpoint_uri], 30):
+        assert _rate_limiters[endpoint_uri].rate == 20
+    assert _rate_limiters[endpoint_uri].rate == 20
+    set_rate_limit(endpoint_uri, None)
+    assert endpoint_uri not in _rate_limiters